@@ -1,5 +1,5 @@
 from django.contrib import admin
-from items.models import Item, Combo
+from items.models import Item, Combo, StockMovement
 
 admin.site.register([Item])
 
@@ -26,4 +26,18 @@ class ComboAdmin(admin.ModelAdmin):
         return f'₦{obj.calculate_rate():,.2f}'
     calculated_rate_display.short_description = 'Calculated Price (5% Off)'
 
-admin.site.register(Combo, ComboAdmin)
\ No newline at end of file
+admin.site.register(Combo, ComboAdmin)
+
+
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'item', 'combo', 'kind', 'previous_stock', 'new_stock', 'change', 'changed_by')
+    list_filter = ('kind',)
+    list_select_related = ('item', 'combo', 'changed_by')
+
+    # The log is append-only
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
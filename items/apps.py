@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ItemsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "items"
+
+    def ready(self):
+        import items.signals
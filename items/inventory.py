@@ -0,0 +1,414 @@
+# items/inventory.py
+
+import csv
+import io
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Max, Sum
+from django.utils import timezone
+
+from items.models import Item, Combo, StockMovement, InventorySnapshot
+
+logger = logging.getLogger(__name__)
+
+# Sales velocity used for stock-out projections is averaged over this many days
+SALES_WINDOW_DAYS = 14
+
+# Item movements older than this are dropped once a snapshot has absorbed
+# them; restore_sales can't put back stock for orders older than this
+LEDGER_RETENTION_DAYS = 90
+
+# Columns of the stocktake CSV (download via orders:stock_sheet, re-upload on update_stock)
+STOCK_SHEET_COLUMNS = ['type', 'id', 'name', 'stock']
+
+
+class StockSheetError(ValueError):
+    """Raised when an uploaded stocktake CSV cannot be read at all."""
+
+
+def parse_stock_post(data):
+    """
+    Pull the item_<id> / combo_<id> fields out of the update_stock form.
+    Returns ({item_id: stock}, {combo_id: stock}, errors). Blank or
+    negative values are skipped.
+    """
+    item_counts, combo_counts, errors = {}, {}, []
+
+    for key, value in data.items():
+        if key.startswith('item_'):
+            target = item_counts
+        elif key.startswith('combo_'):
+            target = combo_counts
+        else:
+            continue
+
+        try:
+            obj_id = int(key.split('_', 1)[1])
+            new_stock = int(value)
+        except (ValueError, TypeError):
+            if value not in ('', None):
+                errors.append(f"Invalid stock value '{value}' for {key}")
+            continue
+
+        if new_stock >= 0:
+            target[obj_id] = new_stock
+
+    return item_counts, combo_counts, errors
+
+
+def parse_stock_csv(uploaded_file):
+    """
+    Read a stocktake CSV with a header row of type,id,name,stock.
+    'type' defaults to item; rows without an id are matched on name.
+    Returns ({item_id: stock}, {combo_id: stock}, errors).
+    """
+    try:
+        text = uploaded_file.read().decode('utf-8-sig')
+    except UnicodeDecodeError:
+        raise StockSheetError('The stock sheet must be a UTF-8 CSV file.')
+
+    reader = csv.DictReader(io.StringIO(text))
+    if not reader.fieldnames or 'stock' not in [f.strip().lower() for f in reader.fieldnames]:
+        raise StockSheetError("The stock sheet needs a 'stock' column.")
+
+    rows, errors = [], []
+    needs_names = False
+    for line_no, raw in enumerate(reader, start=2):
+        if None in raw:
+            # DictReader files cells past the header under None, e.g. an unquoted comma in a name
+            errors.append(f"Line {line_no}: too many fields (quote names that contain commas)")
+            continue
+        row = {(k or '').strip().lower(): (v or '').strip() for k, v in raw.items()}
+        rows.append((line_no, row))
+        if not row.get('id'):
+            needs_names = True
+
+    # Only hit the database for name lookups if the sheet actually needs them
+    item_names, combo_names = {}, {}
+    if needs_names:
+        item_names = {name.lower(): pk for pk, name in Item.objects.values_list('id', 'name')}
+        combo_names = {name.lower(): pk for pk, name in Combo.objects.values_list('id', 'name')}
+
+    item_counts, combo_counts = {}, {}
+    for line_no, row in rows:
+        kind = (row.get('type') or 'item').lower()
+        if kind not in ('item', 'combo'):
+            errors.append(f"Line {line_no}: unknown type '{row.get('type')}'")
+            continue
+
+        try:
+            new_stock = int(row.get('stock', ''))
+        except ValueError:
+            errors.append(f"Line {line_no}: invalid stock '{row.get('stock')}'")
+            continue
+        if new_stock < 0:
+            errors.append(f"Line {line_no}: stock cannot be negative")
+            continue
+
+        if row.get('id'):
+            try:
+                obj_id = int(row['id'])
+            except ValueError:
+                errors.append(f"Line {line_no}: invalid id '{row['id']}'")
+                continue
+        else:
+            names = combo_names if kind == 'combo' else item_names
+            obj_id = names.get(row.get('name', '').lower())
+            if obj_id is None:
+                errors.append(f"Line {line_no}: no {kind} named '{row.get('name')}'")
+                continue
+
+        if kind == 'combo':
+            combo_counts[obj_id] = new_stock
+        else:
+            item_counts[obj_id] = new_stock
+
+    return item_counts, combo_counts, errors
+
+
+def write_stock_sheet(output):
+    """Write the current catalog stock as a stocktake CSV to `output`."""
+    writer = csv.writer(output)
+    writer.writerow(STOCK_SHEET_COLUMNS)
+    for pk, name, stock in Item.objects.order_by('category', 'name').values_list('id', 'name', 'stock'):
+        writer.writerow(['item', pk, name, stock])
+    for pk, name, stock in Combo.objects.order_by('name').values_list('id', 'name', 'stock'):
+        writer.writerow(['combo', pk, name, stock])
+
+
+def _diff(model, counts):
+    """
+    Compare requested counts with stored stock; returns [(id, old, new)].
+    Locks the rows, so call it inside the transaction that writes them.
+    """
+    if not counts:
+        return []
+    current = model.objects.select_for_update().filter(id__in=counts.keys()).values_list('id', 'stock')
+    return [(pk, old, counts[pk]) for pk, old in current if counts[pk] != old]
+
+
+def apply_stock_counts(item_counts, combo_counts, user=None, kind=StockMovement.ADJUSTMENT):
+    """
+    Write new stock levels for many items/combos at once.
+
+    Only rows whose stock actually changed are written, with a single
+    bulk_update(['stock']) per model, so Item.save()/Combo.save() (and their
+    image processing / rate recalculation) are never triggered. Every change
+    is recorded as a StockMovement; manual increases are logged as restocks.
+    Returns (items_updated, combos_updated).
+    """
+    changed_by = user if user is not None and user.is_authenticated else None
+
+    def movement_kind(old, new):
+        if kind == StockMovement.ADJUSTMENT and new > old:
+            return StockMovement.RESTOCK
+        return kind
+
+    with transaction.atomic():
+        # Read the stored stock under the row locks, so a sale finalized
+        # meanwhile can't slip between the diff and the write
+        item_changes = _diff(Item, item_counts)
+        combo_changes = _diff(Combo, combo_counts)
+        if not item_changes and not combo_changes:
+            return 0, 0
+
+        movements = [
+            StockMovement(item_id=pk, kind=movement_kind(old, new), previous_stock=old, new_stock=new,
+                          change=new - old, changed_by=changed_by)
+            for pk, old, new in item_changes
+        ] + [
+            StockMovement(combo_id=pk, kind=movement_kind(old, new), previous_stock=old, new_stock=new,
+                          change=new - old, changed_by=changed_by)
+            for pk, old, new in combo_changes
+        ]
+
+        if item_changes:
+            Item.objects.bulk_update([Item(id=pk, stock=new) for pk, _, new in item_changes], ['stock'])
+        if combo_changes:
+            Combo.objects.bulk_update([Combo(id=pk, stock=new) for pk, _, new in combo_changes], ['stock'])
+        StockMovement.objects.bulk_create(movements)
+
+    return len(item_changes), len(combo_changes)
+
+
+def record_sales(order, ordered_items):
+    """
+    Deduct stock for a finalized order and log each deduction as a SALE.
+
+    Combos deduct from their component items. Quantities are summed per
+    item and written with a conditional F() update, so stock never goes
+    negative and Item.save() is not called. Returns the item ids that did
+    not have enough stock.
+    """
+    deductions = defaultdict(int)
+    for oitem in ordered_items:
+        if oitem.item_id:
+            deductions[oitem.item_id] += oitem.quantity
+        elif oitem.combo_id:
+            combo = oitem.combo
+            for component_id in (combo.item1_id, combo.item2_id, combo.item3_id, combo.item4_id, combo.item5_id):
+                if component_id:
+                    deductions[component_id] += oitem.quantity
+        else:
+            logger.warning('OrderedItem %s has no item or combo; no stock deducted', oitem.id)
+
+    if not deductions:
+        return []
+
+    short = []
+    movements = []
+    with transaction.atomic():
+        current = dict(
+            Item.objects.select_for_update()
+            .filter(id__in=deductions.keys())
+            .values_list('id', 'stock')
+        )
+        for item_id, quantity in deductions.items():
+            old = current.get(item_id)
+            if old is None:
+                continue
+            updated = Item.objects.filter(id=item_id, stock__gte=quantity).update(stock=F('stock') - quantity)
+            if not updated:
+                logger.warning('Insufficient stock for item %s (order %s)', item_id, order.id)
+                short.append(item_id)
+                continue
+            movements.append(StockMovement(
+                item_id=item_id, order=order, kind=StockMovement.SALE,
+                previous_stock=old, new_stock=old - quantity, change=-quantity,
+            ))
+        StockMovement.objects.bulk_create(movements)
+
+    return short
+
+
+
+def restore_sales(order_ids):
+    """
+    Put back the stock record_sales took for cancelled orders and log it
+    as RETURN movements. Each order's SALE rows are reversed once; orders
+    that already have a RETURN are skipped. Returns the units restored.
+    """
+    with transaction.atomic():
+        returned = StockMovement.objects.filter(order_id__in=order_ids, kind=StockMovement.RETURN)
+        sold = defaultdict(int)
+        for order_id, item_id, change in (
+            StockMovement.objects.filter(order_id__in=order_ids, kind=StockMovement.SALE, item__isnull=False)
+            .exclude(order_id__in=returned.values('order_id'))
+            .values_list('order_id', 'item_id', 'change')
+        ):
+            sold[(order_id, item_id)] -= change
+        if not sold:
+            return 0
+
+        current = dict(
+            Item.objects.select_for_update()
+            .filter(id__in={item_id for _, item_id in sold})
+            .values_list('id', 'stock')
+        )
+        movements = []
+        for (order_id, item_id), quantity in sorted(sold.items()):
+            old = current.get(item_id)
+            if old is None or quantity <= 0:
+                continue
+            Item.objects.filter(id=item_id).update(stock=F('stock') + quantity)
+            current[item_id] = old + quantity
+            movements.append(StockMovement(
+                item_id=item_id, order_id=order_id, kind=StockMovement.RETURN,
+                previous_stock=old, new_stock=old + quantity, change=quantity,
+            ))
+        StockMovement.objects.bulk_create(movements)
+
+    return sum(movement.change for movement in movements)
+
+def compact_ledger(window_days=SALES_WINDOW_DAYS, now=None, retention_days=LEDGER_RETENTION_DAYS, keep=30):
+    """
+    Fold the ledger into one new InventorySnapshot per item.
+
+    Each snapshot carries the previous snapshot's balance forward plus the
+    movements recorded since, and the units sold over the last
+    `window_days`. Uses three grouped queries regardless of ledger size.
+    In the same transaction, item movements the new snapshots absorbed that
+    are older than `retention_days` are deleted, along with all but the
+    latest `keep` compactions, so neither table grows without bound.
+    Returns (snapshots, discrepancies, pruned) where discrepancies lists
+    (item, ledger_balance, item.stock) for items whose stored stock does not
+    match the ledger and pruned is (movements, snapshots) deleted.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        return _compact_ledger(window_days, now, max(retention_days, window_days), max(keep, 1))
+
+
+def _compact_ledger(window_days, now, retention_days, keep):
+    last_movement_id = StockMovement.objects.aggregate(last=Max('id'))['last'] or 0
+
+    previous = latest_snapshots()
+    min_since = min((snap.last_movement_id for snap in previous.values()), default=0)
+
+    # Sum of changes per item since the oldest previous snapshot; filtered
+    # per item below using each snapshot's own last_movement_id
+    changes = defaultdict(int)
+    if previous:
+        for item_id, movement_id, change in (
+            StockMovement.objects.filter(item__isnull=False, id__gt=min_since, id__lte=last_movement_id)
+            .values_list('item_id', 'id', 'change')
+            .iterator()
+        ):
+            snap = previous.get(item_id)
+            if snap is not None and movement_id > snap.last_movement_id:
+                changes[item_id] += change
+
+    sold = dict(
+        StockMovement.objects.filter(
+            kind=StockMovement.SALE,
+            item__isnull=False,
+            created_at__gte=now - timedelta(days=window_days),
+            id__lte=last_movement_id,
+        )
+        .values_list('item_id')
+        .annotate(units=-Sum('change'))
+        .values_list('item_id', 'units')
+    )
+
+    snapshots = []
+    discrepancies = []
+    for item in Item.objects.only('id', 'name', 'stock'):
+        snap = previous.get(item.id)
+        # Items without a snapshot start from their stored stock
+        balance = snap.balance + changes[item.id] if snap else item.stock
+        if balance != item.stock:
+            discrepancies.append((item, balance, item.stock))
+        snapshots.append(InventorySnapshot(
+            item=item,
+            balance=balance,
+            last_movement_id=last_movement_id,
+            units_sold=sold.get(item.id) or 0,
+            window_days=window_days,
+            taken_at=now,
+        ))
+
+    InventorySnapshot.objects.bulk_create(snapshots)
+
+    # Combo movements aren't snapshotted, so only item rows are dropped
+    movements, _ = StockMovement.objects.filter(
+        item__isnull=False,
+        id__lte=last_movement_id,
+        created_at__lt=now - timedelta(days=retention_days),
+    ).delete()
+    runs = list(
+        InventorySnapshot.objects.values_list('taken_at', flat=True)
+        .distinct().order_by('-taken_at')[:keep]
+    )
+    old_snapshots, _ = InventorySnapshot.objects.filter(taken_at__lt=runs[-1]).delete()
+    return snapshots, discrepancies, (movements, old_snapshots)
+
+
+def latest_snapshots():
+    """Return {item_id: InventorySnapshot} for the most recent compaction."""
+    latest = InventorySnapshot.objects.aggregate(taken=Max('taken_at'))['taken']
+    if latest is None:
+        return {}
+    return {snap.item_id: snap for snap in InventorySnapshot.objects.filter(taken_at=latest)}
+
+
+def stockout_projections(items, now=None):
+    """
+    Estimate days until each item runs out, as {item_id: days or None}.
+
+    Velocity comes from the latest snapshot's sales window, topped up with
+    sales logged since that snapshot (one grouped query on the ledger).
+    None means no recent sales, so no stock-out is projected.
+    """
+    now = now or timezone.now()
+    snapshots = latest_snapshots()
+
+    if snapshots:
+        any_snapshot = next(iter(snapshots.values()))
+        since_id, since_time = any_snapshot.last_movement_id, any_snapshot.taken_at
+        window_days = any_snapshot.window_days
+    else:
+        since_id, since_time = 0, now - timedelta(days=SALES_WINDOW_DAYS)
+        window_days = 0
+
+    recent = dict(
+        StockMovement.objects.filter(kind=StockMovement.SALE, item__isnull=False, id__gt=since_id, created_at__gte=since_time)
+        .values_list('item_id')
+        .annotate(units=-Sum('change'))
+        .values_list('item_id', 'units')
+    )
+    elapsed_days = max((now - since_time).total_seconds() / 86400, 0)
+    total_days = window_days + elapsed_days
+
+    projections = {}
+    for item in items:
+        snap = snapshots.get(item.id)
+        units = (snap.units_sold if snap else 0) + (recent.get(item.id) or 0)
+        if units <= 0 or total_days <= 0:
+            projections[item.id] = None
+            continue
+        daily = units / total_days
+        projections[item.id] = round(max(item.stock, 0) / daily, 1)
+    return projections
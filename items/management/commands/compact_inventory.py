@@ -0,0 +1,32 @@
+# management/commands/compact_inventory.py
+from django.core.management.base import BaseCommand
+
+from items.inventory import LEDGER_RETENTION_DAYS, SALES_WINDOW_DAYS, compact_ledger
+
+
+class Command(BaseCommand):
+    help = "Compact the stock movement ledger into per-item inventory snapshots (run daily)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--window-days', type=int, default=SALES_WINDOW_DAYS,
+                            help='Days of sales used for the velocity stored on each snapshot.')
+        parser.add_argument('--keep', type=int, default=30,
+                            help='Number of most recent compactions to keep (older snapshots are deleted).')
+        parser.add_argument('--retention-days', type=int, default=LEDGER_RETENTION_DAYS,
+                            help='Days of compacted stock movements to keep (older ones are deleted).')
+
+    def handle(self, *args, **options):
+        snapshots, discrepancies, (movements, old_snapshots) = compact_ledger(
+            window_days=options['window_days'],
+            retention_days=options['retention_days'],
+            keep=options['keep'],
+        )
+        self.stdout.write(f"Wrote {len(snapshots)} inventory snapshots.")
+
+        for item, ledger_balance, stock in discrepancies:
+            self.stdout.write(self.style.WARNING(
+                f"Discrepancy: {item.name} ledger={ledger_balance} stock={stock}"
+            ))
+
+        if movements or old_snapshots:
+            self.stdout.write(f"Pruned {movements} old stock movements and {old_snapshots} old snapshots.")
@@ -0,0 +1,12 @@
+# management/commands/recompute_ratings.py
+from django.core.management.base import BaseCommand
+
+from orders.ratings import recompute_item_ratings
+
+
+class Command(BaseCommand):
+    help = "Rebuild item rating averages and counts from the stored order line ratings (repairs drift)."
+
+    def handle(self, *args, **options):
+        changed = recompute_item_ratings()
+        self.stdout.write(self.style.SUCCESS(f"Recomputed ratings; {changed} items were out of date."))
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0002_item_thumbnail_alter_item_image'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('ADJ', 'Manual Adjustment'), ('CNT', 'Stocktake Count')], default='ADJ', max_length=3)),
+                ('previous_stock', models.IntegerField()),
+                ('new_stock', models.IntegerField()),
+                ('change', models.IntegerField(help_text='new_stock - previous_stock')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('changed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('combo', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='items.combo')),
+                ('item', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='items.item')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
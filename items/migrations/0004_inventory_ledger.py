@@ -0,0 +1,80 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:11
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("items", "0003_stockmovement"),
+        ("orders", "0004_order_total_price"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="InventorySnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("balance", models.IntegerField()),
+                ("last_movement_id", models.BigIntegerField(default=0)),
+                ("units_sold", models.IntegerField(default=0)),
+                ("window_days", models.PositiveIntegerField(default=14)),
+                ("taken_at", models.DateTimeField(db_index=True)),
+            ],
+            options={
+                "ordering": ["-taken_at"],
+                "get_latest_by": "taken_at",
+            },
+        ),
+        migrations.AddField(
+            model_name="stockmovement",
+            name="order",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="stock_movements",
+                to="orders.order",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="stockmovement",
+            name="kind",
+            field=models.CharField(
+                choices=[
+                    ("ADJ", "Manual Adjustment"),
+                    ("CNT", "Stocktake Count"),
+                    ("RST", "Restock"),
+                    ("SAL", "Sale"),
+                ],
+                default="ADJ",
+                max_length=3,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="stockmovement",
+            index=models.Index(
+                fields=["kind", "created_at"], name="stockmove_kind_created_idx"
+            ),
+        ),
+        migrations.AddField(
+            model_name="inventorysnapshot",
+            name="item",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="inventory_snapshots",
+                to="items.item",
+            ),
+        ),
+    ]
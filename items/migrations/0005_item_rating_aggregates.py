@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("items", "0004_inventory_ledger"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="item",
+            name="rating_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="item",
+            name="rating_total",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# FULLTEXT indexes for MENU_SEARCH_BACKEND = 'fulltext' (items/search.py).
+# Only MySQL has them; on other databases this migration does nothing and
+# search uses the in-memory index.
+
+from django.db import migrations
+
+INDEXES = [
+    ("items_item", "items_item_search_ft"),
+    ("items_combo", "items_combo_search_ft"),
+]
+
+
+def add_fulltext_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "mysql":
+        return
+    for table, name in INDEXES:
+        schema_editor.execute(f"CREATE FULLTEXT INDEX {name} ON {table} (name, description)")
+
+
+def drop_fulltext_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "mysql":
+        return
+    for table, name in INDEXES:
+        schema_editor.execute(f"DROP INDEX {name} ON {table}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("items", "0005_item_rating_aggregates"),
+    ]
+
+    operations = [
+        migrations.RunPython(add_fulltext_indexes, drop_fulltext_indexes),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("items", "0006_menu_fulltext"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="stockmovement",
+            name="kind",
+            field=models.CharField(
+                choices=[
+                    ("ADJ", "Manual Adjustment"),
+                    ("CNT", "Stocktake Count"),
+                    ("RST", "Restock"),
+                    ("SAL", "Sale"),
+                    ("RTN", "Cancelled Sale"),
+                ],
+                default="ADJ",
+                max_length=3,
+            ),
+        ),
+    ]
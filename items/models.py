@@ -1,4 +1,5 @@
 from django.db import models
+from django.conf import settings
 from PIL import Image
 from decimal import Decimal
 from django_resized import ResizedImageField
@@ -13,6 +14,9 @@ class Item(models.Model):
     is_non_veg = models.BooleanField(default=False)    
     stock = models.IntegerField(default=10)
     rating = models.DecimalField(max_digits=2, decimal_places=1, default=5)
+    # Sum and number of customer ratings behind `rating` (orders/ratings.py)
+    rating_total = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
     image = models.ImageField(verbose_name="Feature Image", upload_to="item_pics", default="media/default_item.png")
     price = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))
     #non_availablity_time = models.DateTimeField(null=True, blank=True)
@@ -116,3 +120,73 @@ class Combo(models.Model):
     def __str__(self):
         return self.name
 # Create your models here.
+
+
+class StockMovement(models.Model):
+    """
+    Append-only ledger of every change made to Item.stock / Combo.stock
+    (sales, manual adjustments, restocks and stocktakes). One row per
+    changed Item or Combo. Item.stock stays the live balance; the ledger is
+    compacted into InventorySnapshot rows by `manage.py compact_inventory`,
+    which then drops item rows older than the retention window.
+    """
+    ADJUSTMENT = 'ADJ'
+    STOCKTAKE = 'CNT'
+    RESTOCK = 'RST'
+    SALE = 'SAL'
+    RETURN = 'RTN'
+    KINDS = [
+        (ADJUSTMENT, 'Manual Adjustment'),
+        (STOCKTAKE, 'Stocktake Count'),
+        (RESTOCK, 'Restock'),
+        (SALE, 'Sale'),
+        (RETURN, 'Cancelled Sale'),
+    ]
+
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, null=True, blank=True, related_name='stock_movements')
+    combo = models.ForeignKey(Combo, on_delete=models.CASCADE, null=True, blank=True, related_name='stock_movements')
+    kind = models.CharField(max_length=3, choices=KINDS, default=ADJUSTMENT)
+    previous_stock = models.IntegerField()
+    new_stock = models.IntegerField()
+    change = models.IntegerField(help_text="new_stock - previous_stock")
+    changed_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    order = models.ForeignKey('orders.Order', on_delete=models.SET_NULL, null=True, blank=True, related_name='stock_movements')
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['kind', 'created_at'], name='stockmove_kind_created_idx'),
+        ]
+
+    def __str__(self):
+        target = self.item or self.combo
+        return f"{target}: {self.previous_stock} -> {self.new_stock} ({self.get_kind_display()})"
+
+
+class InventorySnapshot(models.Model):
+    """
+    Compacted view of the StockMovement ledger for one Item.
+
+    `balance` is the ledger balance up to and including `last_movement_id`,
+    and `units_sold` the sales over the `window_days` before `taken_at`, so
+    the current balance and sales velocity can be read without scanning the
+    whole ledger (or OrderedItem history).
+    """
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='inventory_snapshots')
+    balance = models.IntegerField()
+    last_movement_id = models.BigIntegerField(default=0)
+    units_sold = models.IntegerField(default=0)
+    window_days = models.PositiveIntegerField(default=14)
+    taken_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        ordering = ['-taken_at']
+        get_latest_by = 'taken_at'
+
+    def __str__(self):
+        return f"{self.item} @ {self.taken_at:%Y-%m-%d %H:%M}: {self.balance}"
+
+    @property
+    def daily_sales(self):
+        return self.units_sold / self.window_days if self.window_days else 0
@@ -0,0 +1,226 @@
+# items/search.py
+
+import re
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models.expressions import RawSQL
+
+from items.models import Item, Combo
+from juiceville.cache import bump_version, current_version
+
+# 'index' searches the in-memory inverted index; 'fulltext' asks MySQL's
+# FULLTEXT indexes (migration 0006) for the text match instead
+SEARCH_BACKEND = getattr(settings, 'MENU_SEARCH_BACKEND', 'index')
+
+# A word in the name counts this much more than one in the description
+NAME_WEIGHT = 3
+DESCRIPTION_WEIGHT = 1
+
+VERSION_KEY = 'menu_search_version'
+
+# Each worker rebuilds its index at least this often, even if an
+# invalidation never reached the shared cache
+REBUILD_SECONDS = getattr(settings, 'MENU_SEARCH_REBUILD_SECONDS', 600)
+
+_WORD = re.compile(r'\w+')
+_COMBO_ITEMS = ('item1_id', 'item2_id', 'item3_id', 'item4_id', 'item5_id')
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def tokenize(text):
+    return _WORD.findall((text or '').lower())
+
+
+def invalidate_search_index():
+    """
+    Bump the index version (once the current transaction commits) so every
+    process rebuilds its copy on the next search.
+    """
+    transaction.on_commit(lambda: bump_version(VERSION_KEY))
+
+
+class MenuIndex:
+    """
+    Inverted index over item and combo names/descriptions. Documents are
+    keyed ('item', id) / ('combo', id); `records` holds what the search
+    results and facets need, so a search reads nothing else but live stock.
+    """
+
+    def __init__(self, version):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.records = {}
+        self.postings = {}  # token -> {key: weight}
+
+    def add(self, key, record, name, description):
+        self.records[key] = record
+        for weight, text in ((DESCRIPTION_WEIGHT, description), (NAME_WEIGHT, name)):
+            for token in tokenize(text):
+                docs = self.postings.setdefault(token, {})
+                docs[key] = max(docs.get(key, 0), weight)
+
+    def freeze(self):
+        self.vocabulary = sorted(self.postings)
+
+    def is_current(self, version):
+        return self.version == version and time.monotonic() - self.built_at < REBUILD_SECONDS
+
+    def match(self, terms):
+        """
+        {key: score} of documents containing every term; a term matches any
+        word it is a prefix of, so "man" finds "mango" as the customer types.
+        """
+        scores = None
+        for term in terms:
+            term_scores = {}
+            start = bisect_left(self.vocabulary, term)
+            for token in self.vocabulary[start:]:
+                if not token.startswith(term):
+                    break
+                for key, weight in self.postings[token].items():
+                    term_scores[key] = max(term_scores.get(key, 0), weight)
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {key: score + term_scores[key] for key, score in scores.items() if key in term_scores}
+            if not scores:
+                return {}
+        return scores or {}
+
+
+def build_index(version=0):
+    index = MenuIndex(version)
+
+    items = {
+        row['id']: row
+        for row in Item.objects.values('id', 'name', 'description', 'category', 'rate', 'is_non_veg', 'thumbnail')
+    }
+    for row in items.values():
+        index.add(('item', row['id']), {
+            'kind': 'item',
+            'id': row['id'],
+            'name': row['name'],
+            'category': row['category'],
+            'description': row['description'],
+            'rate': row['rate'],
+            'is_non_veg': row['is_non_veg'],
+            'image': row['thumbnail'],
+            'components': (row['id'],),
+        }, row['name'], row['description'])
+
+    for row in Combo.objects.values('id', 'name', 'description', 'rate', 'image', *_COMBO_ITEMS):
+        components = tuple(row[field] for field in _COMBO_ITEMS if row[field])
+        index.add(('combo', row['id']), {
+            'kind': 'combo',
+            'id': row['id'],
+            'name': row['name'],
+            'category': None,
+            'description': row['description'],
+            'rate': row['rate'],
+            # A combo is non-veg if anything in it is
+            'is_non_veg': any(items[item_id]['is_non_veg'] for item_id in components if item_id in items),
+            'image': row['image'],
+            'components': components,
+        }, row['name'], row['description'])
+
+    index.freeze()
+    return index
+
+
+def get_index():
+    """
+    This process's index, rebuilt when an Item or Combo has changed since
+    it was built, and after REBUILD_SECONDS regardless.
+    """
+    global _index
+    version = current_version(VERSION_KEY)
+    index = _index
+    if index is None or not index.is_current(version):
+        with _index_lock:
+            if _index is None or not _index.is_current(version):
+                _index = build_index(version)
+            index = _index
+    return index
+
+
+def _fulltext_match(terms):
+    """Same contract as MenuIndex.match, answered by MySQL FULLTEXT in boolean mode."""
+    against = ' '.join(f'+{term}*' for term in terms)
+    match = RawSQL('MATCH(name, description) AGAINST (%s IN BOOLEAN MODE)', (against,))
+    scores = {}
+    for kind, model in (('item', Item), ('combo', Combo)):
+        for pk, score in model.objects.annotate(score=match).filter(score__gt=0).values_list('id', 'score'):
+            scores[(kind, pk)] = score
+    return scores
+
+
+def _live_stock(records):
+    """Current stock of every item behind `records`, in one query (stock changes without save())."""
+    item_ids = {item_id for record in records for item_id in record['components']}
+    if not item_ids:
+        return {}
+    return dict(Item.objects.filter(id__in=item_ids).values_list('id', 'stock'))
+
+
+def search_menu(query='', categories=(), non_veg=None, min_price=None, max_price=None,
+                in_stock=None, kind=None):
+    """
+    Search the menu and narrow it by facets. Returns (results, facets).
+
+    `results` are record dicts (best match first, then by name) with a live
+    'stock'/'available'; an empty query lists everything. Each facet counts
+    the matches that pass every *other* filter, so picking a category still
+    shows how many hits the other categories have.
+    """
+    index = get_index()
+    terms = tokenize(query)
+    if not terms:
+        scores = dict.fromkeys(index.records, 0)
+    elif SEARCH_BACKEND == 'fulltext' and connection.vendor == 'mysql':
+        scores = _fulltext_match(terms)
+    else:
+        scores = index.match(terms)
+
+    records = [index.records[key] for key in scores if key in index.records]
+    stock = _live_stock(records)
+    matches = []
+    for record in records:
+        levels = [stock.get(item_id, 0) for item_id in record['components']]
+        available = min(levels) if levels else 0
+        matches.append(dict(record, score=scores[(record['kind'], record['id'])], stock=available, available=available > 0))
+
+    filters = {
+        'kind': (lambda r: r['kind'] == kind) if kind else None,
+        'category': (lambda r: r['category'] in categories) if categories else None,
+        'non_veg': (lambda r: r['is_non_veg'] == non_veg) if non_veg is not None else None,
+        'in_stock': (lambda r: r['available'] == in_stock) if in_stock is not None else None,
+        'price': (
+            lambda r: (min_price is None or r['rate'] >= min_price) and (max_price is None or r['rate'] <= max_price)
+        ) if min_price is not None or max_price is not None else None,
+    }
+    filters = {name: test for name, test in filters.items() if test is not None}
+
+    def passing(*skip):
+        tests = [test for name, test in filters.items() if name not in skip]
+        return [r for r in matches if all(test(r) for test in tests)]
+
+    facets = {'category': {}, 'non_veg': {'true': 0, 'false': 0}, 'in_stock': {'true': 0, 'false': 0}}
+    for record in passing('category'):
+        if record['category']:
+            facets['category'][record['category']] = facets['category'].get(record['category'], 0) + 1
+    for record in passing('non_veg'):
+        facets['non_veg']['true' if record['is_non_veg'] else 'false'] += 1
+    for record in passing('in_stock'):
+        facets['in_stock']['true' if record['available'] else 'false'] += 1
+    prices = [record['rate'] for record in passing('price')]
+    facets['price'] = {'min': min(prices, default=None), 'max': max(prices, default=None)}
+
+    results = passing()
+    results.sort(key=lambda r: (-r['score'], r['name'].lower()))
+    return results, facets
@@ -0,0 +1,15 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Item, Combo
+from .search import invalidate_search_index
+
+@receiver(post_save, sender=Item)
+@receiver(post_delete, sender=Item)
+@receiver(post_save, sender=Combo)
+@receiver(post_delete, sender=Combo)
+def menu_changed_handler(sender, instance, **kwargs):
+    # Stock is read live at search time, so queryset .update()s of stock
+    # don't need this; anything that bulk-updates names or prices must
+    # call invalidate_search_index() itself
+    invalidate_search_index()
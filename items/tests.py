@@ -1,3 +1,157 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase
+from django.utils import timezone
+
+from items.inventory import StockSheetError, apply_stock_counts, compact_ledger, parse_stock_csv, record_sales
+from items.models import InventorySnapshot, Item, StockMovement
+from items.search import invalidate_search_index, search_menu
+from orders.models import Order, OrderedItem
+from users.models import Customer
+
+
+def make_items(*names, stock=10):
+    # bulk_create skips Item.save(), which needs an image on disk
+    return Item.objects.bulk_create([
+        Item(name=name, category='FD', description=name, rate=Decimal('500.00'), stock=stock) for name in names
+    ])
+
+
+def sheet(text):
+    return SimpleUploadedFile('stock.csv', text.encode('utf-8'), content_type='text/csv')
+
+
+class StockSheetTests(TestCase):
+
+    def setUp(self):
+        self.pie, self.juice = make_items('Chicken Pie', 'Orange Juice')
+
+    def test_rows_by_id_and_name(self):
+        items, combos, errors = parse_stock_csv(sheet(
+            f'type,id,name,stock\nitem,{self.pie.id},Chicken Pie,4\nitem,,orange juice,7\n'
+        ))
+        self.assertEqual(items, {self.pie.id: 4, self.juice.id: 7})
+        self.assertEqual(combos, {})
+        self.assertEqual(errors, [])
+
+    def test_extra_fields_are_a_row_error(self):
+        # An unquoted comma in the name spills into a fifth column
+        items, combos, errors = parse_stock_csv(sheet(
+            f'type,id,name,stock\nitem,{self.pie.id},Chicken, Pie,5\nitem,{self.juice.id},Orange Juice,3\n'
+        ))
+        self.assertEqual(items, {self.juice.id: 3})
+        self.assertEqual(len(errors), 1)
+        self.assertTrue(errors[0].startswith('Line 2:'))
+
+    def test_bad_values_are_reported(self):
+        items, _, errors = parse_stock_csv(sheet('type,id,name,stock\nitem,,Nothing,1\nitem,x,,2\nitem,1,,-1\nbox,1,,1\n'))
+        self.assertEqual(items, {})
+        self.assertEqual(len(errors), 4)
+
+    def test_missing_stock_column(self):
+        with self.assertRaises(StockSheetError):
+            parse_stock_csv(sheet('type,id,name\nitem,1,Pie\n'))
+
+
+class ApplyStockCountsTests(TestCase):
+
+    def setUp(self):
+        self.pie, self.juice = make_items('Chicken Pie', 'Orange Juice')
+
+    def test_only_changed_rows_are_written_and_logged(self):
+        updated = apply_stock_counts({self.pie.id: 15, self.juice.id: 10}, {}, kind=StockMovement.ADJUSTMENT)
+        self.assertEqual(updated, (1, 0))
+        self.pie.refresh_from_db()
+        self.assertEqual(self.pie.stock, 15)
+        movement = StockMovement.objects.get()
+        self.assertEqual((movement.item_id, movement.kind, movement.change), (self.pie.id, StockMovement.RESTOCK, 5))
+
+    def test_no_changes(self):
+        self.assertEqual(apply_stock_counts({self.pie.id: 10}, {}), (0, 0))
+        self.assertFalse(StockMovement.objects.exists())
+
+
+class RecordSalesTests(TestCase):
+
+    def setUp(self):
+        self.pie, self.juice = make_items('Chicken Pie', 'Orange Juice', stock=3)
+        # bulk_create again skips Customer.save()'s image handling
+        customer, = Customer.objects.bulk_create([Customer(user=User.objects.create_user('buyer'))])
+        self.order = Order.objects.create(customer=customer)
+
+    def lines(self, *pairs):
+        # record_sales only reads item_id/combo_id/quantity off the lines
+        return [OrderedItem(item_id=item_id, quantity=quantity) for item_id, quantity in pairs]
+
+    def test_deducts_and_logs_sales(self):
+        short = record_sales(self.order, self.lines((self.pie.id, 2), (self.pie.id, 1), (self.juice.id, 1)))
+        self.assertEqual(short, [])
+        self.assertEqual(dict(Item.objects.values_list('id', 'stock')), {self.pie.id: 0, self.juice.id: 2})
+        self.assertEqual(StockMovement.objects.filter(kind=StockMovement.SALE).count(), 2)
+
+    def test_short_items_are_left_alone(self):
+        with self.assertLogs('items.inventory', 'WARNING'):
+            short = record_sales(self.order, self.lines((self.pie.id, 5), (self.juice.id, 1)))
+        self.assertEqual(short, [self.pie.id])
+        self.pie.refresh_from_db()
+        self.assertEqual(self.pie.stock, 3)
+
+
+class CompactLedgerTests(TestCase):
+
+    def setUp(self):
+        self.pie, = make_items('Chicken Pie', stock=10)
+        self.now = timezone.now()
+
+    def test_old_movements_and_snapshots_are_pruned(self):
+        compact_ledger(now=self.now - timedelta(days=200), keep=1)
+        apply_stock_counts({self.pie.id: 4}, {})
+        StockMovement.objects.update(created_at=self.now - timedelta(days=100))
+        apply_stock_counts({self.pie.id: 6}, {})
+
+        snapshots, discrepancies, pruned = compact_ledger(now=self.now, keep=1)
+        self.assertEqual(discrepancies, [])
+        self.assertEqual(pruned, (1, 1))
+        self.assertEqual(snapshots[0].balance, 6)
+        self.assertEqual(InventorySnapshot.objects.get().balance, 6)
+        self.assertEqual(list(StockMovement.objects.values_list('change', flat=True)), [2])
+
+        # The next run still balances from the surviving rows
+        apply_stock_counts({self.pie.id: 9}, {})
+        snapshots, discrepancies, _ = compact_ledger(now=self.now + timedelta(days=1), keep=1)
+        self.assertEqual((snapshots[0].balance, discrepancies), (9, []))
+
+
+class MenuSearchTests(TestCase):
+
+    def setUp(self):
+        self.pie, self.juice = make_items('Chicken Pie', 'Orange Juice')
+        Item.objects.filter(id=self.juice.id).update(category='JS', description='Fresh, with a chicken-free promise', stock=0)
+
+    def names(self, results):
+        return [result['name'] for result in results]
+
+    def test_prefix_match_ranks_names_first(self):
+        results, _ = search_menu('chick')
+        self.assertEqual(self.names(results), ['Chicken Pie', 'Orange Juice'])
+        self.assertEqual(self.names(search_menu('chicken pie')[0]), ['Chicken Pie'])
+        self.assertEqual(search_menu('lasagne')[0], [])
+
+    def test_facets_ignore_their_own_filter(self):
+        results, facets = search_menu('', categories=['JS'])
+        self.assertEqual(self.names(results), ['Orange Juice'])
+        self.assertEqual(facets['category'], {'FD': 1, 'JS': 1})
+        self.assertEqual(facets['in_stock'], {'true': 0, 'false': 1})
+
+        results, _ = search_menu('', in_stock=True)
+        self.assertEqual(self.names(results), ['Chicken Pie'])
 
-# Create your tests here.
+    def test_renames_show_up_after_commit(self):
+        search_menu('pie')
+        with self.captureOnCommitCallbacks(execute=True):
+            Item.objects.filter(id=self.pie.id).update(name='Beef Pie')
+            invalidate_search_index()
+        self.assertEqual(self.names(search_menu('beef')[0]), ['Beef Pie'])
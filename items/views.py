@@ -3,40 +3,29 @@ from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required # Required for proper login check
 from django.contrib import messages
 
-from users.models import Staff 
+from users.roles import designation_required
 from items.models import Item, Combo
 from items.forms import ItemForm, ComboForm
 
 from orders.forms import OfferForm
+from orders.carts import open_cart
 from orders.models import Order, OrderedItem
-from users.models import Customer
+from users.customers import get_customer
 
-# --- UTILITY FUNCTION FOR PERMISSION CHECK ---
-def check_mg_md_permission(request):
-    """Fetches Staff object and returns it if designation is 'MD' or 'MG', 
-    or redirects and returns None otherwise."""
-    # Superuser bypasses the designation check
-    if request.user.is_superuser:
-        # Return a placeholder object for superusers to proceed
-        return True 
-
-    # Fetch the staff object for designation check
-    staff = get_object_or_404(Staff, user=request.user)
-    
-    if staff.designation not in ['MD', 'MG']:
-        messages.error(request, 'Access denied. Only Managing Director (MD) and Manager (MG) staff can perform this action.')
-        return redirect('staff_dashboard')
-    return staff
+# --- PERMISSION CHECK ---
+# MD/MG/Superuser only. The designation is resolved once per session by
+# users.roles instead of fetching the Staff row on every request.
+mg_md_required = designation_required(
+    'MD', 'MG',
+    allow_superuser=True,
+    message='Access denied. Only Managing Director (MD) and Manager (MG) staff can perform this action.',
+)
 
 
 @login_required
 @staff_member_required
+@mg_md_required
 def create_item(request):
-    # MD/MG/Superuser ACCESS CHECK
-    check = check_mg_md_permission(request)
-    if check is not True and not isinstance(check, Staff):
-        return check
-
     if request.method == "POST":
         form = ItemForm(request.POST, request.FILES)
         if form.is_valid():
@@ -58,12 +47,8 @@ def create_item(request):
         
 @login_required
 @staff_member_required
+@mg_md_required
 def update_item(request, pk):
-    # MD/MG/Superuser ACCESS CHECK
-    check = check_mg_md_permission(request)
-    if check is not True and not isinstance(check, Staff):
-        return check
-    
     item = get_object_or_404(Item, pk = pk)
     
     if request.method == "POST":
@@ -85,12 +70,8 @@ def update_item(request, pk):
     }
     return render(request, 'items/update_item.html', context)
 
+@mg_md_required
 def create_combo(request):
-    # MD/MG/Superuser ACCESS CHECK
-    check = check_mg_md_permission(request)
-    if check is not True and not isinstance(check, Staff):
-        return check
-    
     if request.method == "POST":
         form = ComboForm(request.POST, request.FILES)
         if form.is_valid():
@@ -107,7 +88,10 @@ def create_combo(request):
     # the form with errors, and a template link is causing the reverse match failure.
 
     else:
-        form = ComboForm()
+        # The MG dashboard's combo suggestions link here with ?item1=..&item2=..
+        form = ComboForm(initial={
+            field: request.GET[field] for field in ('item1', 'item2', 'item3', 'item4', 'item5') if field in request.GET
+        })
         
     context = {
         'form' : form
@@ -116,12 +100,8 @@ def create_combo(request):
 
 @login_required
 @staff_member_required
+@mg_md_required
 def update_combo(request, pk):
-    # MD/MG/Superuser ACCESS CHECK
-    check = check_mg_md_permission(request)
-    if check is not True and not isinstance(check, Staff):
-        return check
-    
     combo = get_object_or_404(Combo, pk = pk)
     
     if request.method == "POST":
@@ -146,12 +126,8 @@ def update_combo(request, pk):
 # but it may be better suited for an orders/views.py file.
 @login_required
 @staff_member_required
+@mg_md_required
 def notify_offers(request):
-    # MD/MG/Superuser ACCESS CHECK
-    check = check_mg_md_permission(request)
-    if check is not True and not isinstance(check, Staff):
-        return check
-
     if request.method=="POST":
         form = OfferForm(request.POST)
         if form.is_valid():
@@ -169,13 +145,10 @@ def notify_offers(request):
 def menu_view(request):
     current_order = None
     if request.user.is_authenticated:
-        try:
-            # FIX: Use 'finalized=False' (or 'delivered=False')
-            # to find the active order (the user's open cart).
-            current_order = Order.objects.get(customer=request.user, finalized=False)
-            
-        except Order.DoesNotExist:
-            pass
+        # The user's open cart, if any (staff accounts have no Customer)
+        customer = get_customer(request)
+        if customer:
+            current_order = open_cart(customer)
         
     context = {
         # ... other context data (menu_items) ...
@@ -0,0 +1,28 @@
+# juiceville/cache.py
+
+# Version counters for in-process caches (staff roles, order fragments, the
+# menu search index, delivery zones). The counter lives in the shared cache
+# (CACHES['default'], a database table), so a bump on one worker reaches
+# every worker.
+
+import time
+
+from django.core.cache import cache
+
+
+def current_version(key):
+    """
+    The current version stored under `key`. A missing key (never bumped, or
+    evicted) is given a fresh, unique version rather than read as 0, so
+    copies built under an older version can never match it again.
+    """
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key):
+    """Give `key` a new version; everything cached under the old one is stale."""
+    cache.set(key, time.time_ns(), None)
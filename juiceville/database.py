@@ -0,0 +1,82 @@
+# juiceville/database.py
+
+# The effective DATABASES['default'] setting, built in one place.
+#
+# Every value can be overridden from the environment:
+#
+#     DATABASE_URL        full URL (e.g. postgres://... on Heroku); replaces
+#                         the PythonAnywhere MySQL settings below
+#     DB_PASSWORD         password for the PythonAnywhere MySQL database
+#     DB_CONN_MAX_AGE     seconds a worker keeps its connection open
+#                         (0 = reconnect on every request)
+#     DB_CONN_HEALTH_CHECKS  '0' to skip the ping before reusing a connection
+#     DB_POOL             '1' to use Django's connection pool instead of
+#                         persistent connections. PostgreSQL + psycopg 3 only;
+#                         refused with ImproperlyConfigured on MySQL
+#
+# django_heroku is told not to touch DATABASES (settings.py), so what this
+# returns is what Django uses.
+#
+# The Procfile serves WSGI with threaded gunicorn workers, whose threads
+# live on between requests and keep their persistent connections. The async
+# payment views still await Paystack there, and do their ORM work on a
+# bounded thread pool that keeps its connections too (orders/concurrency.py).
+# Under an ASGI server every sync view would run on a thread made for its
+# request, so its connection is closed when the request finishes and each
+# page pays a fresh connect; don't serve the site that way on MySQL.
+
+import os
+
+import dj_database_url
+from django.core.exceptions import ImproperlyConfigured
+
+# PythonAnywhere closes MySQL connections idle for 300s; stay under that so
+# a reused connection has normally not been dropped server-side
+DEFAULT_CONN_MAX_AGE = 280
+
+PYTHONANYWHERE_MYSQL = {
+    'ENGINE': 'django.db.backends.mysql',
+    'NAME': 'itishola$juiceville',  # PythonAnywhere database name format
+    'USER': 'itishola',
+    'HOST': 'itishola.mysql.pythonanywhere-services.com',
+    'OPTIONS': {
+        'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
+    },
+}
+
+
+def _env_flag(environ, name, default):
+    return environ.get(name, '1' if default else '0').lower() in ('1', 'true', 'yes', 'on')
+
+
+def database_config(environ=None):
+    """Return the DATABASES['default'] dict for the current environment."""
+    environ = os.environ if environ is None else environ
+
+    if environ.get('DATABASE_URL'):
+        config = dj_database_url.parse(environ['DATABASE_URL'], ssl_require=True)
+    else:
+        config = dict(PYTHONANYWHERE_MYSQL, OPTIONS=dict(PYTHONANYWHERE_MYSQL['OPTIONS']))
+        config['PASSWORD'] = environ.get('DB_PASSWORD', '')
+
+    config['CONN_MAX_AGE'] = int(environ.get('DB_CONN_MAX_AGE', DEFAULT_CONN_MAX_AGE))
+    # Ping a reused connection before the first query of a request, so a
+    # connection the server has dropped is replaced instead of erroring
+    config['CONN_HEALTH_CHECKS'] = _env_flag(environ, 'DB_CONN_HEALTH_CHECKS', True)
+
+    if _env_flag(environ, 'DB_POOL', False):
+        # Fail at startup rather than run a MySQL deploy without the pool it asked for
+        if config['ENGINE'] != 'django.db.backends.postgresql':
+            raise ImproperlyConfigured(
+                f"DB_POOL=1 needs PostgreSQL, but the database engine is {config['ENGINE']}; "
+                "Django has no connection pool for other backends. Unset DB_POOL and tune "
+                "DB_CONN_MAX_AGE instead."
+            )
+        # The pool hands out connections itself; Django refuses CONN_MAX_AGE with it
+        config['OPTIONS'] = dict(config.get('OPTIONS', {}), pool={
+            'min_size': int(environ.get('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(environ.get('DB_POOL_MAX_SIZE', 10)),
+        })
+        config['CONN_MAX_AGE'] = 0
+
+    return config
@@ -14,6 +14,8 @@ import os
 import django_heroku
 from pathlib import Path
 
+from juiceville.database import database_config
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -63,10 +65,12 @@ AUTHENTICATION_BACKENDS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "users.customers.customer_middleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "allauth.account.middleware.AccountMiddleware",
@@ -84,28 +88,38 @@ TEMPLATES = [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "users.context_processors.staff_role",
             ],
         },
     },
 ]
 
 WSGI_APPLICATION = "juiceville.wsgi.application"
+# Not used by the Procfile, which serves WSGI (see juiceville/database.py)
+ASGI_APPLICATION = "juiceville.asgi.application"
 
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Persistent, health-checked connections; see juiceville/database.py for
+# the environment overrides (DATABASE_URL, DB_CONN_MAX_AGE, DB_POOL, ...)
 DATABASES = {
+    'default': database_config(),
+}
+
+# Shared by every worker process: role, order-fragment, search-index and
+# delivery-zone invalidations (juiceville/cache.py) must reach all of them.
+# The table is created by orders migration 0015 (createcachetable).
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
-        'NAME': 'itishola$juiceville',  # PythonAnywhere database name format
-        'USER': 'itishola',
-        'PASSWORD': os.environ.get('DB_PASSWORD', ''),
-        'HOST': 'itishola.mysql.pythonanywhere-services.com',
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'juiceville_cache',
         'OPTIONS': {
-            'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
-        }
-    }
+            # Version counters are never culled before they would be refreshed
+            'MAX_ENTRIES': 20000,
+        },
+    },
 }
 
 # Password validation
@@ -154,6 +168,31 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
+# Hashed + gzip/brotli-compressed static files, served by whitenoise with
+# far-future immutable headers (see juiceville/storage.py)
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "juiceville.storage.StaticStorage"},
+}
+
+# Minified bundles built by collectstatic; load with {% static_bundle %}
+STATIC_BUNDLES = {
+    'orders/bundles/site.css': [
+        'orders/css/bootstrap.min.css',
+        'orders/css/bootstrap-theme.min.css',
+        'orders/css/fontAwesome.css',
+        'orders/css/hero-slider.css',
+        'orders/css/owl-carousel.css',
+        'orders/css/templatemo-style.css',
+        'orders/css/style.css',
+    ],
+    'orders/bundles/site.js': [
+        'orders/js/vendor/bootstrap.min.js',
+        'orders/js/plugins.js',
+        'orders/js/main.js',
+    ],
+}
+
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
 
@@ -204,15 +243,43 @@ ACCOUNT_FORMS = {
     'disconnect': 'allauth.socialaccount.forms.DisconnectForm',
 }
 
-django_heroku.settings(locals())
+# Static files and DATABASES are configured above (django_heroku's
+# STATICFILES_STORAGE is ignored by Django 5, and its DATABASE_URL handling
+# would silently replace the connection settings)
+django_heroku.settings(locals(), staticfiles=False, databases=False)
 
 # Payment Gateway Settings
 PAYSTACK_SECRET_KEY = os.environ.get('PAYSTACK_SECRET_KEY')
 PAYSTACK_PUBLIC_KEY = os.environ.get('PAYSTACK_PUBLIC_KEY')
+PAYSTACK_TIMEOUT = 15  # seconds
+
+# Threads per worker for ORM work in async views (orders/concurrency.py)
+ASYNC_ORM_THREADS = int(os.environ.get('ASYNC_ORM_THREADS', 8))
+
+# Menu search text matching (items/search.py): 'index' (in-memory) or
+# 'fulltext' (MySQL FULLTEXT indexes)
+MENU_SEARCH_BACKEND = os.environ.get('MENU_SEARCH_BACKEND', 'index')
 
 # Default delivery fee for all orders
 DEFAULT_DELIVERY_FEE = 300
 
+# Kitchen scheduling (orders/scheduling.py)
+KITCHEN_SLOT_MINUTES = 30      # length of one preparation/delivery slot
+KITCHEN_SLOT_CAPACITY = 6      # orders per slot when no KitchenCapacity row applies
+PREORDER_LEAD_HOURS = 24       # Pre-Order Cakes must be booked this far ahead
+
+# Delivery ETA estimates (orders/eta.py)
+ETA_DEFAULT_MINUTES = 45       # used until enough deliveries have been recorded
+ETA_HISTORY_DAYS = 30          # deliveries used to learn prep/delivery durations
+ETA_REFRESH_SECONDS = 600      # how often each worker re-learns the durations
+
+# Abandoned carts (orders/carts.py, manage.py purge_carts)
+CART_TTL_HOURS = 48            # unpaid carts untouched this long are purged
+PAYING_CART_TTL_HOURS = 168    # ...or this long if a payment was started but never completed
+
+# Order archival (orders/archive.py, manage.py archive_orders)
+ORDER_ARCHIVE_AFTER_DAYS = 180 # delivered orders older than this move to the archive table
+
 # settings.py
 
 # =================================================================
@@ -283,7 +350,9 @@ PWA_APP_SPLASH_SCREEN = [
 ]
 
 # Service Worker Configuration
-PWA_SERVICE_WORKER_PATH = os.path.join(BASE_DIR, 'orders', 'static', 'orders', 'js', 'serviceworker.js')
+# /serviceworker.js is rendered by orders.views.service_worker from this
+# template (see orders/pwa.py for the precache list)
+PWA_SERVICE_WORKER_PATH = os.path.join(BASE_DIR, 'orders', 'templates', 'orders', 'serviceworker.js')
 
 # Offline page (we'll create this)
 PWA_APP_DIR = 'ltr'
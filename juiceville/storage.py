@@ -0,0 +1,72 @@
+# juiceville/storage.py
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from rcssmin import cssmin
+from rjsmin import jsmin
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+
+class StaticStorage(CompressedManifestStaticFilesStorage):
+    """
+    collectstatic storage: content-hashed filenames, gzip + brotli copies
+    (whitenoise), plus the minified bundles listed in STATIC_BUNDLES.
+
+    Bundles are written into STATIC_ROOT before hashing so they get hashed
+    and compressed like any other file. Templates load them with
+    {% static_bundle %} (orders/templatetags/assets.py).
+    """
+
+    # Templates still reference a few files that don't exist; render the
+    # unhashed URL for those instead of failing the page
+    manifest_strict = False
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._warned = set()
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            for name, sources in getattr(settings, 'STATIC_BUNDLES', {}).items():
+                if self.build_bundle(name, sources, paths):
+                    paths[name] = (self, name)
+        yield from super().post_process(paths, dry_run, **options)
+
+    def build_bundle(self, name, sources, paths):
+        """Concatenate and minify `sources` into `name`. Returns True if written."""
+        minify, separator = (cssmin, '\n') if name.endswith('.css') else (jsmin, ';\n')
+        parts = []
+        for source in sources:
+            if source not in paths:
+                print(f"WARNING: bundle {name}: '{source}' was not collected, skipping")
+                continue
+            storage, path = paths[source]
+            with storage.open(path) as fh:
+                parts.append(minify(fh.read().decode('utf-8')))
+        if not parts:
+            return False
+
+        # Bundles sit one directory below the app folder, like css/ and js/,
+        # so relative url(../fonts/...) references keep resolving
+        if self.exists(name):
+            self.delete(name)
+        self.save(name, ContentFile(separator.join(parts).encode('utf-8')))
+        return True
+
+    def url_converter(self, name, hashed_files, template=None):
+        converter = super().url_converter(name, hashed_files, template)
+
+        def tolerant_converter(matchobj):
+            # Vendor CSS points at a few images we don't ship; keep the
+            # original reference rather than aborting collectstatic
+            try:
+                return converter(matchobj)
+            except ValueError as e:
+                warning = f"WARNING: {name}: {e}"
+                # post_process makes several passes; report each once
+                if warning not in self._warned:
+                    self._warned.add(warning)
+                    print(warning)
+                return matchobj.group(0)
+
+        return tolerant_converter
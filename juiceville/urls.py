@@ -16,8 +16,8 @@ Including another URLconf
 """
 
 from django.contrib import admin
-from django.urls import path, include
-from orders.views import index
+from django.urls import path, re_path, include
+from orders.views import index, service_worker
 
 from django.conf import settings
 from django.conf.urls.static import static
@@ -28,8 +28,11 @@ urlpatterns = [
     path('users/', include('users.urls')),
     path('items/', include('items.urls')),
     path('orders/', include('orders.urls')),
+    path('api/v1/', include('orders.api_urls')),
     
     path('', index, name='index'),
+    # Generated from the static manifest; must come before pwa.urls
+    re_path(r'^serviceworker\.js$', service_worker, name='serviceworker'),
     path('', include('pwa.urls')),
 ]
 
@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django import forms
-from orders.models import Order, OrderedItem, DeliveryLocation, OperatingHours
+from orders.zones import reprice_open_orders
+from orders.models import Order, OrderedItem, DeliveryLocation, OperatingHours, KitchenCapacity, CartPurge, ArchivedOrder, RecommendationSnapshot, ComboSuggestion
 
 admin.site.register([Order, OrderedItem,]) 
 
@@ -8,6 +9,20 @@ admin.site.register([Order, OrderedItem,])
 class DeliveryLocationAdmin(admin.ModelAdmin):
     list_display = ('name', 'fee', 'is_active') 
     list_editable = ('fee', 'is_active') 
+    actions = ['apply_current_fees']
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # Unpaid carts in this zone pick up the new fee straight away
+        if change and 'fee' in form.changed_data:
+            repriced = reprice_open_orders(obj.id)
+            if repriced:
+                self.message_user(request, f"{repriced} open order(s) in {obj.name} now use the new fee.")
+
+    @admin.action(description="Apply current fees to open (unpaid) orders")
+    def apply_current_fees(self, request, queryset):
+        repriced = reprice_open_orders(*queryset.values_list('id', flat=True))
+        self.message_user(request, f"{repriced} open order(s) repriced.")
 
 # Register your models here.
 
@@ -37,4 +52,43 @@ class OperatingHoursAdmin(admin.ModelAdmin):
             'fields': ('opening_time', 'closing_time'),
             'description': 'Set precise opening and closing times.'
         }),
-    )
\ No newline at end of file
+    )
+
+@admin.register(KitchenCapacity)
+class KitchenCapacityAdmin(admin.ModelAdmin):
+    list_display = ('day', 'start_time', 'end_time', 'orders_per_slot')
+    list_editable = ('orders_per_slot',)
+    list_filter = ('day',)
+
+@admin.register(CartPurge)
+class CartPurgeAdmin(admin.ModelAdmin):
+    list_display = ('ran_at', 'carts', 'ordered_items', 'value', 'ttl_hours', 'archived')
+    list_filter = ('archived',)
+    readonly_fields = ('ran_at', 'ttl_hours', 'archived', 'carts', 'ordered_items', 'value')
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(admin.ModelAdmin):
+    list_display = ('id', 'customer', 'placed_at', 'grand_total', 'status', 'archived_at')
+    list_filter = ('status',)
+    search_fields = ('id', 'customer__name', 'payment_reference')
+    date_hierarchy = 'placed_at'
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(RecommendationSnapshot)
+class RecommendationSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('built_at', 'orders', 'items', 'pairs')
+    exclude = ('data',)
+    readonly_fields = ('built_at', 'orders', 'items', 'pairs')
+
+    def has_add_permission(self, request):
+        return False
+
+@admin.register(ComboSuggestion)
+class ComboSuggestionAdmin(admin.ModelAdmin):
+    list_display = ('item_ids', 'orders', 'support', 'lift', 'combo_price', 'projected_revenue', 'existing_combo', 'mined_at')
+    readonly_fields = ('item_ids', 'size', 'orders', 'support', 'lift', 'combo_price', 'projected_revenue', 'existing_combo', 'mined_at')
+
+    def has_add_permission(self, request):
+        return False
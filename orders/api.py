@@ -0,0 +1,386 @@
+# orders/api.py
+#
+# Compact JSON API for the PWA (mounted at /api/v1/). Every response carries
+# an ETag so the service worker can revalidate with If-None-Match and get a
+# bodiless 304, is brotli- (or gzip-) compressed when the client accepts it,
+# and list endpoints take ?fields=a,b,c to trim each record.
+
+import hashlib
+import json
+import re
+from decimal import Decimal, InvalidOperation
+from functools import wraps
+
+import brotli
+from django.core.files.storage import default_storage
+from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, JsonResponse
+from django.middleware.gzip import GZipMiddleware
+from django.utils.decorators import decorator_from_middleware
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.views.decorators.http import require_GET, require_http_methods
+
+from items.constants import CATEGORIES
+from items.models import Item, Combo
+from items.search import search_menu
+from orders.archive import customer_history
+from orders.carts import add_to_cart, open_cart
+from orders.models import Order, OrderedItem, ORDER_STATUSES
+from orders.zones import zone_fee
+from users.customers import get_customer
+
+API_VERSION = 'v1'
+
+HISTORY_PAGE_SIZE = 20
+
+SEARCH_PAGE_SIZE = 24
+
+# Largest number of lines accepted in one cart POST
+MAX_CART_LINES = 50
+
+# Brotli level for responses compressed per request; 11 is too slow here
+BROTLI_QUALITY = 5
+
+re_accepts_brotli = re.compile(r'\bbr\b')
+
+
+# --- Helpers ---
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    GZipMiddleware that answers with brotli instead when the client
+    accepts it; JSON comes out noticeably smaller than with gzip. API
+    responses are never streamed, so streaming is left to gzip.
+    """
+
+    def process_response(self, request, response):
+        if (
+            response.streaming
+            or len(response.content) < 200
+            or response.has_header('Content-Encoding')
+            or not re_accepts_brotli.search(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        ):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        compressed = brotli.compress(response.content, quality=BROTLI_QUALITY)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+
+        # Same weak ETag as gzip_page, so If-None-Match still matches
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = 'br'
+        return response
+
+
+compress_page = decorator_from_middleware(CompressionMiddleware)
+
+
+def api_login_required(view_func):
+    """Like login_required, but answers 401 JSON instead of redirecting to the login page."""
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'success': False, 'error': 'Authentication required'}, status=401)
+        return view_func(request, *args, **kwargs)
+    return _wrapped_view
+
+
+def _requested_fields(request):
+    fields = request.GET.get('fields')
+    return [f.strip() for f in fields.split(',') if f.strip()] if fields else None
+
+
+def select_fields(records, fields):
+    """Trim each record dict to `fields` (all fields when None)."""
+    if not fields:
+        return records
+    return [{key: record[key] for key in fields if key in record} for record in records]
+
+
+def api_response(request, payload, public=False):
+    """
+    Serialize `payload` compactly and answer with an ETag of its content.
+    A matching If-None-Match gets a 304. Public responses (the menu) may be
+    stored by shared caches; everything else is private to the user. Both
+    must be revalidated before reuse.
+    """
+    body = json.dumps(payload, cls=DjangoJSONEncoder, separators=(',', ':'))
+    etag = '"%s"' % hashlib.md5(body.encode()).hexdigest()
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    patch_cache_control(response, no_cache=True, **({'public': True} if public else {'private': True}))
+    if not public:
+        patch_vary_headers(response, ('Cookie',))
+    return response
+
+
+def _media_url(request, name):
+    return request.build_absolute_uri(default_storage.url(name)) if name else None
+
+
+def _flag(value):
+    """'1'/'true' -> True, '0'/'false' -> False, missing -> None (no filter)."""
+    if value in (None, ''):
+        return None
+    return value.lower() in ('1', 'true', 'yes')
+
+
+def _price(value):
+    if value in (None, ''):
+        return None
+    price = Decimal(value)  # InvalidOperation for junk, handled by the caller
+    if not price.is_finite():
+        raise InvalidOperation(value)
+    return price
+
+
+def _customer(request):
+    return get_customer(request)
+
+
+def _line_records(order):
+    return [
+        {
+            'id': line['id'],
+            'item_id': line['item_id'],
+            'combo_id': line['combo_id'],
+            'name': line['item__name'] or line['combo__name'],
+            'quantity': line['quantity'],
+            'price': line['price'],
+        }
+        for line in OrderedItem.objects.filter(order=order).order_by('id').values(
+            'id', 'item_id', 'combo_id', 'item__name', 'combo__name', 'quantity', 'price'
+        )
+    ]
+
+
+def _cart_payload(order, fields=None):
+    if order is None:
+        return {'version': API_VERSION, 'cart': None}
+    return {
+        'version': API_VERSION,
+        'cart': {
+            'id': order.id,
+            'lines': select_fields(_line_records(order), fields),
+            'subtotal': order.subtotal,
+            'delivery_fee': order.delivery_fee,
+            'grand_total': order.grand_total,
+            'used_loyalty_points': order.used_loyalty_points,
+            'delivery_slot': order.delivery_slot,
+        },
+    }
+
+
+# --- Endpoints ---
+
+@compress_page
+@require_GET
+def menu(request):
+    """
+    Items and combos for the menu. ?category=JS limits items to one
+    category; ?fields= applies to both items and combos.
+    """
+    fields = _requested_fields(request)
+
+    items = Item.objects.order_by('category', 'name')
+    if request.GET.get('category'):
+        items = items.filter(category=request.GET['category'])
+
+    item_records = [
+        {
+            'id': row['id'],
+            'name': row['name'],
+            'category': row['category'],
+            'description': row['description'],
+            'rate': row['rate'],
+            'rating': row['rating'],
+            'is_non_veg': row['is_non_veg'],
+            'available': row['stock'] > 0,
+            'thumbnail': _media_url(request, row['thumbnail']),
+        }
+        for row in items.values('id', 'name', 'category', 'description', 'rate', 'rating', 'is_non_veg', 'stock', 'thumbnail')
+    ]
+
+    combo_records = [
+        {
+            'id': row['id'],
+            'name': row['name'],
+            'description': row['description'],
+            'rate': row['rate'],
+            'available': row['stock'] > 0,
+            'image': _media_url(request, row['image']),
+        }
+        for row in Combo.objects.order_by('name').values('id', 'name', 'description', 'rate', 'stock', 'image')
+    ]
+
+    payload = {
+        'version': API_VERSION,
+        'categories': [{'code': code, 'name': name} for code, name in CATEGORIES],
+        'items': select_fields(item_records, fields),
+        'combos': select_fields(combo_records, fields),
+    }
+    return api_response(request, payload, public=True)
+
+
+@compress_page
+@require_GET
+def menu_search(request):
+    """
+    Search items and combos by name/description, a page at a time.
+    ?q=mango&category=JS,DR&non_veg=0&in_stock=1&min_price=500&max_price=3000
+    &kind=item|combo&page=N&fields=... All filters are optional. Facet
+    counts come back with every page so the filters can show totals.
+    """
+    categories = [code for code in request.GET.get('category', '').split(',') if code]
+    try:
+        min_price = _price(request.GET.get('min_price'))
+        max_price = _price(request.GET.get('max_price'))
+    except InvalidOperation:
+        return JsonResponse({'success': False, 'error': 'Invalid price'}, status=400)
+
+    results, facets = search_menu(
+        query=request.GET.get('q', ''),
+        categories=categories,
+        non_veg=_flag(request.GET.get('non_veg')),
+        in_stock=_flag(request.GET.get('in_stock')),
+        min_price=min_price,
+        max_price=max_price,
+        kind=request.GET.get('kind') or None,
+    )
+
+    page = Paginator(results, SEARCH_PAGE_SIZE).get_page(request.GET.get('page'))
+    records = [
+        {
+            'kind': record['kind'],
+            'id': record['id'],
+            'name': record['name'],
+            'category': record['category'],
+            'description': record['description'],
+            'rate': record['rate'],
+            'is_non_veg': record['is_non_veg'],
+            'available': record['available'],
+            'image': _media_url(request, record['image']),
+        }
+        for record in page
+    ]
+
+    payload = {
+        'version': API_VERSION,
+        'query': request.GET.get('q', ''),
+        'count': page.paginator.count,
+        'page': page.number,
+        'pages': page.paginator.num_pages,
+        'results': select_fields(records, _requested_fields(request)),
+        'facets': facets,
+    }
+    return api_response(request, payload, public=True)
+
+
+@compress_page
+@api_login_required
+@require_http_methods(['GET', 'POST'])
+def cart(request):
+    """
+    GET: the customer's open cart (or null).
+    POST: add lines, JSON {"lines": [{"item_id": 1, "quantity": 2}, {"combo_id": 3, "quantity": 1}]}.
+    The service worker replays queued offline additions through POST.
+    """
+    customer = _customer(request)
+    if customer is None:
+        return JsonResponse({'success': False, 'error': 'Customer profile not found'}, status=404)
+
+    if request.method == 'GET':
+        return api_response(request, _cart_payload(open_cart(customer), _requested_fields(request)))
+
+    try:
+        lines = json.loads(request.body or b'{}').get('lines', [])
+    except (ValueError, AttributeError):
+        return JsonResponse({'success': False, 'error': 'Invalid JSON body'}, status=400)
+    if not isinstance(lines, list) or not lines or len(lines) > MAX_CART_LINES:
+        return JsonResponse({'success': False, 'error': f'Send between 1 and {MAX_CART_LINES} lines'}, status=400)
+
+    item_quantities, combo_quantities = {}, {}
+    for line in lines:
+        try:
+            quantity = int(line.get('quantity', 1))
+            if line.get('item_id') is not None:
+                item_quantities[int(line['item_id'])] = item_quantities.get(int(line['item_id']), 0) + quantity
+            elif line.get('combo_id') is not None:
+                combo_quantities[int(line['combo_id'])] = combo_quantities.get(int(line['combo_id']), 0) + quantity
+        except (TypeError, ValueError, AttributeError):
+            return JsonResponse({'success': False, 'error': 'Each line needs an item_id or combo_id and a quantity'}, status=400)
+
+    order = open_cart(customer)
+    if order is None:
+        # Same entry point as the create_order view, minus the HTML redirects
+        if not customer.delivery_location_id:
+            return JsonResponse({'success': False, 'error': 'Please set your delivery region first'}, status=400)
+        order = Order.objects.create(customer=customer, delivery_fee=zone_fee(customer.delivery_location_id))
+
+    items_added, combos_added = add_to_cart(order, item_quantities, combo_quantities)
+    payload = _cart_payload(order)
+    payload.update(success=True, added=items_added + combos_added)
+    return JsonResponse(payload, encoder=DjangoJSONEncoder, json_dumps_params={'separators': (',', ':')})
+
+
+@compress_page
+@api_login_required
+@require_GET
+def order_status(request, pk):
+    """Lifecycle status and timestamps of one of the customer's orders (staff: any order)."""
+    orders = Order.objects.filter(pk=pk)
+    if not request.user.is_staff:
+        orders = orders.filter(customer__user=request.user)
+
+    row = orders.values(
+        'id', 'status', 'placed_at', 'paid_at', 'prepared_at', 'dispatched_at', 'delivered_at', 'cancelled_at',
+        'delivery_slot', 'expected_delivery_time', 'grand_total',
+    ).first()
+    if row is None:
+        return JsonResponse({'success': False, 'error': 'Order not found'}, status=404)
+
+    row['status_display'] = dict(ORDER_STATUSES).get(row['status'], row['status'])
+    fields = _requested_fields(request)
+    return api_response(request, {'version': API_VERSION, 'order': select_fields([row], fields)[0]})
+
+
+@compress_page
+@api_login_required
+@require_GET
+def order_history(request):
+    """The customer's paid orders, newest first, including archived ones. ?page=N."""
+    customer = _customer(request)
+    if customer is None:
+        return JsonResponse({'success': False, 'error': 'Customer profile not found'}, status=404)
+
+    status_labels = dict(ORDER_STATUSES)
+    page = Paginator(customer_history(customer, include_hidden=False), HISTORY_PAGE_SIZE).get_page(request.GET.get('page'))
+    records = [
+        {
+            'id': order.id,
+            'status': order.status,
+            'status_display': status_labels.get(order.status, order.status),
+            'placed_at': order.placed_at,
+            'grand_total': order.grand_total,
+            'archived': getattr(order, 'is_archived', False),
+            'lines': [{'name': line.name, 'quantity': line.quantity, 'price': line.price} for line in order.lines],
+        }
+        for order in page
+    ]
+
+    payload = {
+        'version': API_VERSION,
+        'page': page.number,
+        'pages': page.paginator.num_pages,
+        'orders': select_fields(records, _requested_fields(request)),
+    }
+    return api_response(request, payload)
@@ -0,0 +1,13 @@
+from django.urls import path
+
+from orders import api
+
+app_name = 'api'
+
+urlpatterns = [
+    path('menu/', api.menu, name='menu'),
+    path('menu/search/', api.menu_search, name='menu_search'),
+    path('cart/', api.cart, name='cart'),
+    path('orders/', api.order_history, name='order_history'),
+    path('orders/<int:pk>/status/', api.order_status, name='order_status'),
+]
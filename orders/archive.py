@@ -0,0 +1,172 @@
+# orders/archive.py
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from orders.models import ArchivedOrder, Order, OrderedItem, FINALIZED_STATUSES, STATUS_DELIVERED
+
+ARCHIVE_AFTER_DAYS = getattr(settings, 'ORDER_ARCHIVE_AFTER_DAYS', 180)
+
+# Orders moved per transaction
+ARCHIVE_BATCH_SIZE = 500
+
+
+def archivable_orders(days=ARCHIVE_AFTER_DAYS, now=None):
+    """Delivered orders placed more than `days` ago."""
+    cutoff = (now or timezone.now()) - timedelta(days=days)
+    return Order.objects.filter(status=STATUS_DELIVERED, placed_at__lt=cutoff)
+
+
+def _archive_copy(order, lines):
+    return ArchivedOrder(
+        id=order.id,
+        customer_id=order.customer_id,
+        status=order.status,
+        placed_at=order.placed_at,
+        paid_at=order.paid_at,
+        delivered_at=order.delivered_at,
+        subtotal=order.subtotal,
+        delivery_fee=order.delivery_fee,
+        grand_total=order.grand_total,
+        used_loyalty_points=order.used_loyalty_points,
+        payment_reference=order.payment_reference,
+        hidden_from_customer=order.hidden_from_customer,
+        items=[
+            {
+                'item_id': line.item_id,
+                'combo_id': line.combo_id,
+                'name': line.item.name if line.item_id else line.combo.name if line.combo_id else '',
+                'quantity': line.quantity,
+                'price': str(line.price),
+                'rating': line.rating,
+            }
+            for line in lines
+        ],
+    )
+
+
+def archive_orders(days=ARCHIVE_AFTER_DAYS, batch_size=ARCHIVE_BATCH_SIZE, now=None):
+    """
+    Move archivable orders into ArchivedOrder, `batch_size` at a time.
+    Each batch is copied and then deleted from orders_order and
+    orders_ordereditem in one transaction. Returns the number of orders archived.
+    """
+    now = now or timezone.now()
+    archived = 0
+
+    while True:
+        with transaction.atomic():
+            orders = list(
+                archivable_orders(days, now).select_for_update().order_by('id')[:batch_size]
+            )
+            if not orders:
+                break
+
+            order_ids = [order.id for order in orders]
+            lines = {}
+            for line in OrderedItem.objects.filter(order_id__in=order_ids).for_display():
+                lines.setdefault(line.order_id, []).append(line)
+
+            ArchivedOrder.objects.bulk_create(
+                [_archive_copy(order, lines.get(order.id, [])) for order in orders],
+                ignore_conflicts=True,
+            )
+            OrderedItem.objects.filter(order_id__in=order_ids).delete()
+            Order.objects.filter(id__in=order_ids).delete()
+            archived += len(orders)
+
+    return archived
+
+
+# --- Reading the archive alongside live orders ---
+
+class CustomerHistory:
+    """
+    A customer's paid orders from the live table and the archive, newest
+    first, paged in the database. Paginator only needs count() and slices:
+    a slice pages the UNION of both tables' (id, placed_at) columns, then
+    loads just that page's orders (live ones with their lines).
+    """
+
+    def __init__(self, live, archived):
+        self.live = live
+        self.archived = archived
+
+    def count(self):
+        return self.live.count() + self.archived.count()
+
+    def __len__(self):
+        return self.count()
+
+    def _keys(self):
+        live = self.live.order_by().annotate(
+            sort_at=Coalesce('placed_at', 'created_at'), in_archive=Value(False),
+        ).values_list('id', 'sort_at', 'in_archive')
+        archived = self.archived.order_by().annotate(
+            sort_at=F('placed_at'), in_archive=Value(True),
+        ).values_list('id', 'sort_at', 'in_archive')
+        return live.union(archived, all=True).order_by('-sort_at', '-id')
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        keys = list(self._keys()[index])
+        live = self.live.in_bulk([pk for pk, _, in_archive in keys if not in_archive])
+        archived = self.archived.in_bulk([pk for pk, _, in_archive in keys if in_archive])
+        # An order archived in between the two queries drops off this page
+        orders = ((archived if in_archive else live).get(pk) for pk, _, in_archive in keys)
+        return [order for order in orders if order is not None]
+
+
+def customer_history(customer, include_hidden=True):
+    """
+    A customer's paid orders, newest first, from both the live table and
+    the archive, as a CustomerHistory to hand to Paginator.
+    """
+    live = Order.objects.filter(customer=customer, status__in=FINALIZED_STATUSES).with_lines()
+    archived = ArchivedOrder.objects.filter(customer=customer)
+    if not include_hidden:
+        live = live.filter(hidden_from_customer=False)
+        archived = archived.filter(hidden_from_customer=False)
+    return CustomerHistory(live, archived)
+
+
+def archived_status_rollup(start=None, end=None):
+    """{status: {'n', 'total'}} for archived orders placed in [start, end), like the live GROUP BY."""
+    archived = ArchivedOrder.objects.all()
+    if start is not None:
+        archived = archived.filter(placed_at__gte=start)
+    if end is not None:
+        archived = archived.filter(placed_at__lt=end)
+    return {
+        row['status']: row
+        for row in archived.values('status').annotate(n=Count('id'), total=Sum('grand_total')).order_by()
+    }
+
+
+def merge_rollups(*rollups):
+    """Add up several {status: {'n', 'total'}} rollups."""
+    merged = {}
+    for rollup in rollups:
+        for status, row in rollup.items():
+            current = merged.setdefault(status, {'status': status, 'n': 0, 'total': Decimal('0.00')})
+            current['n'] += row['n']
+            current['total'] += row['total'] or Decimal('0.00')
+    return merged
+
+
+def archived_customer_totals():
+    """{customer_id: {'orders', 'spent', 'first_placed', 'last_placed'}} over the archive, in one query."""
+    return {
+        row['customer_id']: row
+        for row in ArchivedOrder.objects.values('customer_id').annotate(
+            orders=Count('id'), spent=Sum('grand_total'),
+            first_placed=Min('placed_at'), last_placed=Max('placed_at'),
+        ).order_by()
+    }
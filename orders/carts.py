@@ -0,0 +1,170 @@
+# orders/carts.py
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from items.models import Combo, Item
+from orders.lifecycle import changes_for
+from orders.models import CartPurge, Order, OrderedItem, FINALIZED_STATUSES, STATUS_CANCELLED, STATUS_PENDING
+
+CART_TTL_HOURS = getattr(settings, 'CART_TTL_HOURS', 48)
+# Carts that started a payment wait longer, in case it is verified late
+PAYING_CART_TTL_HOURS = getattr(settings, 'PAYING_CART_TTL_HOURS', 7 * 24)
+
+# Carts are deleted/archived this many at a time to keep each statement short
+PURGE_BATCH_SIZE = 500
+
+
+def open_cart(customer):
+    """The customer's most recently used unpaid order, or None."""
+    return (
+        Order.objects.filter(customer=customer, status=STATUS_PENDING)
+        .order_by('-updated_at', '-id')
+        .first()
+    )
+
+
+def get_or_create_cart(customer, delivery_fee):
+    """
+    Reuse the customer's open cart instead of starting a new order on
+    every click. The delivery fee is refreshed in case the customer changed
+    their delivery region, and a booked slot that has already passed is
+    dropped. Returns (order, created).
+    """
+    order = open_cart(customer)
+    if order is None:
+        return Order.objects.create(customer=customer, delivery_fee=delivery_fee), True
+
+    if order.delivery_slot and order.delivery_slot < timezone.now():
+        order.delivery_slot = None
+    order.delivery_fee = delivery_fee
+    order.save()
+    return order, False
+
+
+def add_to_cart(order, item_quantities, combo_quantities):
+    """
+    Add quantities ({item_id: qty}, {combo_id: qty}) to an order's lines,
+    topping up existing lines, then recalculate the order totals. Unknown
+    ids and quantities below 1 are ignored. Returns (items_added, combos_added).
+    """
+    items = Item.objects.in_bulk([pk for pk, qty in item_quantities.items() if qty > 0])
+    combos = Combo.objects.in_bulk([pk for pk, qty in combo_quantities.items() if qty > 0])
+
+    for item in items.values():
+        quantity = item_quantities[item.id]
+        line, created = OrderedItem.objects.get_or_create(
+            order=order, item=item, combo=None, defaults={'quantity': quantity}
+        )
+        if not created:
+            line.quantity += quantity
+        line.calculate_price()
+        print(f"Added {quantity} of {item.name} to order")
+
+    for combo in combos.values():
+        quantity = combo_quantities[combo.id]
+        line, created = OrderedItem.objects.get_or_create(
+            order=order, combo=combo, item=None, defaults={'quantity': quantity}
+        )
+        if not created:
+            line.quantity += quantity
+        line.calculate_price()
+        print(f"Added {quantity} of COMBO {combo.name} to order")
+
+    order.refresh_totals()
+    return len(items), len(combos)
+
+
+def stale_carts(ttl_hours=CART_TTL_HOURS, now=None, paying_ttl_hours=PAYING_CART_TTL_HOURS):
+    """
+    Unpaid orders untouched for `ttl_hours`. Carts with a payment reference
+    get `paying_ttl_hours` instead, since the customer may have paid
+    without the order being finalized yet.
+    """
+    now = now or timezone.now()
+    cutoff = now - timedelta(hours=ttl_hours)
+    paying_cutoff = now - timedelta(hours=max(paying_ttl_hours, ttl_hours))
+    return Order.objects.filter(
+        Q(payment_reference__isnull=True, updated_at__lt=cutoff)
+        | Q(payment_reference__isnull=False, updated_at__lt=paying_cutoff),
+        status=STATUS_PENDING,
+    )
+
+
+def purge_stale_carts(ttl_hours=CART_TTL_HOURS, archive=False, now=None, batch_size=PURGE_BATCH_SIZE,
+                      paying_ttl_hours=PAYING_CART_TTL_HOURS):
+    """
+    Delete (or, with archive=True, cancel) stale carts and their OrderedItem
+    rows in batches of `batch_size` ids. Returns the CartPurge record for
+    the run.
+    """
+    now = now or timezone.now()
+    purge = CartPurge(ran_at=now, ttl_hours=ttl_hours, archived=archive)
+    purge.value = Decimal('0.00')
+
+    while True:
+        stale = stale_carts(ttl_hours, now, paying_ttl_hours)
+        batch = list(stale.order_by('id').values_list('id', flat=True)[:batch_size])
+        if not batch:
+            break
+
+        with transaction.atomic():
+            # Lock and re-check: a cart may have been paid for or added to
+            # since the batch was read
+            batch = list(stale.filter(id__in=batch).select_for_update().values_list('id', flat=True))
+            if not batch:
+                continue
+            totals = OrderedItem.objects.filter(order_id__in=batch).aggregate(n=Count('id'), value=Sum('price'))
+            purge.carts += len(batch)
+            purge.ordered_items += totals['n']
+            purge.value += totals['value'] or Decimal('0.00')
+
+            if archive:
+                Order.objects.filter(id__in=batch).update(**changes_for(STATUS_CANCELLED, now))
+            else:
+                OrderedItem.objects.filter(order_id__in=batch).delete()
+                Order.objects.filter(id__in=batch).delete()
+
+    purge.save()
+    return purge
+
+
+def abandonment_stats(days=30, ttl_hours=CART_TTL_HOURS, now=None):
+    """
+    Cart outcomes over the last `days`: carts that became paid orders,
+    carts abandoned (stale now, cancelled unpaid, or already purged) and
+    carts still open, with the abandonment rate and the value left behind.
+    """
+    now = now or timezone.now()
+    since = now - timedelta(days=days)
+    cutoff = now - timedelta(hours=ttl_hours)
+
+    recent = Order.objects.filter(created_at__gte=since)
+    converted = recent.filter(status__in=FINALIZED_STATUSES).count()
+    cancelled_unpaid = recent.filter(status=STATUS_CANCELLED, paid_at__isnull=True).count()
+    pending = recent.filter(status=STATUS_PENDING)
+    stale = pending.filter(updated_at__lt=cutoff).count()
+    still_open = pending.count() - stale
+
+    purged = CartPurge.objects.filter(ran_at__gte=since, archived=False).aggregate(
+        carts=Sum('carts'), value=Sum('value')
+    )
+    stale_value = OrderedItem.objects.filter(
+        order__in=pending.filter(updated_at__lt=cutoff)
+    ).aggregate(value=Sum('price'))['value'] or Decimal('0.00')
+
+    abandoned = stale + cancelled_unpaid + (purged['carts'] or 0)
+    finished = converted + abandoned
+    return {
+        'days': days,
+        'converted': converted,
+        'abandoned': abandoned,
+        'open': still_open,
+        'abandonment_rate': round(abandoned / finished * 100, 1) if finished else 0,
+        'abandoned_value': stale_value + (purged['value'] or Decimal('0.00')),
+    }
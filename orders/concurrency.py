@@ -0,0 +1,48 @@
+# orders/concurrency.py
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.db import close_old_connections, connections
+
+# Async views run their ORM work on this many threads per worker process, so
+# a burst of slow payment callbacks cannot open an unbounded number of
+# threads (and database connections)
+ORM_THREADS = getattr(settings, 'ASYNC_ORM_THREADS', 8)
+
+orm_executor = ThreadPoolExecutor(max_workers=ORM_THREADS, thread_name_prefix='orm')
+
+
+def db_sync_to_async(func):
+    """
+    Like sync_to_async, but runs `func` on the bounded ORM thread pool.
+
+    Stale connections are closed before and after each call, the way Django
+    does around a sync request, since these threads outlive any one request.
+
+        order = await db_sync_to_async(load_order)(pk)
+    """
+    @wraps(func)
+    def inner(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(inner, thread_sensitive=False, executor=orm_executor)
+
+
+def close_request_thread_connections(sender, **kwargs):
+    """
+    request_finished receiver. Under ASGI a sync view runs on a thread made
+    for its request alone, so a connection kept open there would never be
+    reused, only leaked. Close it; the ORM pool threads above and WSGI
+    workers (what the Procfile runs) live on and keep their persistent
+    connections (CONN_MAX_AGE).
+    """
+    if isinstance(sender, type) and issubclass(sender, ASGIHandler):
+        connections.close_all()
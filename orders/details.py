@@ -0,0 +1,174 @@
+# orders/details.py
+
+from decimal import Decimal
+
+
+from orders.models import (
+    ArchivedOrder, Order, OrderedItem, ORDER_STATUSES, FINALIZED_STATUSES, STATUS_DELIVERED,
+)
+
+ORDER_FIELDS = (
+    'id', 'status', 'placed_at', 'date_placed', 'time_placed', 'expected_delivery_time', 'delivery_slot',
+    'subtotal', 'delivery_fee', 'grand_total', 'used_loyalty_points', 'payment_reference',
+    'customer_id', 'customer__name', 'customer__phone', 'customer__address',
+    'customer__user_id', 'customer__user__email', 'customer__delivery_location__name',
+)
+
+LINE_FIELDS = (
+    'id', 'quantity', 'price', 'rating',
+    'item_id', 'item__name', 'item__rate', 'combo_id', 'combo__name', 'combo__rate',
+)
+
+
+class Ref:
+    """Just enough of a related object for templates: its id and name."""
+
+    def __init__(self, pk=None, name='', **extra):
+        self.id = pk
+        self.name = name or ''
+        self.__dict__.update(extra)
+
+    def __str__(self):
+        return self.name
+
+
+class OrderLine:
+    """Read-only ordered item, shaped like OrderedItem for the detail templates."""
+
+    def __init__(self, pk, quantity, price, rating=0, item=None, combo=None, unit_price=None):
+        self.id = pk
+        self.quantity = quantity
+        self.price = price
+        self.rating = rating
+        self.item = item
+        self.combo = combo
+        self.unit_price = unit_price if unit_price is not None else (
+            price / quantity if quantity else Decimal('0.00')
+        )
+
+    @property
+    def name(self):
+        if self.item:
+            return self.item.name
+        if self.combo:
+            return f"🎁 {self.combo.name} (Combo)"
+        return "Unknown Item"
+
+
+class OrderDetail:
+    """
+    Read-model for order detail pages: the order, its customer and all its
+    lines as plain attributes, so rendering never triggers another query.
+    Attribute names follow Order so the existing templates work unchanged.
+    """
+
+    is_archived = False
+
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+    @property
+    def delivered(self):
+        return self.status == STATUS_DELIVERED
+
+    @property
+    def finalized(self):
+        return self.status in FINALIZED_STATUSES
+
+    def get_status_display(self):
+        return dict(ORDER_STATUSES).get(self.status, self.status)
+
+    @property
+    def lines(self):
+        return self.ordered_items
+
+
+def _customer(row):
+    location = row['customer__delivery_location__name']
+    return Ref(
+        row['customer_id'],
+        row['customer__name'],
+        phone=row['customer__phone'],
+        address=row['customer__address'],
+        user=Ref(row['customer__user_id'], email=row['customer__user__email']),
+        delivery_location=Ref(name=location) if location else None,
+    )
+
+
+def _live_detail(filters):
+    row = Order.objects.filter(**filters).values(*ORDER_FIELDS).first()
+    if row is None:
+        return None
+
+    lines = [
+        OrderLine(
+            line['id'], line['quantity'], line['price'], line['rating'],
+            item=Ref(line['item_id'], line['item__name']) if line['item_id'] else None,
+            combo=Ref(line['combo_id'], line['combo__name']) if line['combo_id'] else None,
+            unit_price=line['item__rate'] if line['item_id'] else line['combo__rate'],
+        )
+        for line in OrderedItem.objects.filter(order_id=row['id']).order_by('id').values(*LINE_FIELDS)
+    ]
+
+    fields = {key: value for key, value in row.items() if '__' not in key}
+    fields.update(customer=_customer(row), ordered_items=lines)
+    return OrderDetail(**fields)
+
+
+def _archived_detail(filters):
+    archived = (
+        ArchivedOrder.objects.filter(**filters)
+        .select_related('customer__user', 'customer__delivery_location')
+        .first()
+    )
+    if archived is None:
+        return None
+
+    customer = archived.customer
+    location = customer.delivery_location
+    detail = OrderDetail(
+        id=archived.id,
+        status=archived.status,
+        placed_at=archived.placed_at,
+        date_placed=archived.date_placed,
+        time_placed=archived.time_placed,
+        expected_delivery_time=None,
+        delivery_slot=None,
+        subtotal=archived.subtotal,
+        delivery_fee=archived.delivery_fee,
+        grand_total=archived.grand_total,
+        used_loyalty_points=archived.used_loyalty_points,
+        payment_reference=archived.payment_reference,
+        customer_id=customer.id,
+        customer=Ref(
+            customer.id, customer.name, phone=customer.phone, address=customer.address,
+            user=Ref(customer.user_id, email=customer.user.email),
+            delivery_location=Ref(name=location.name) if location else None,
+        ),
+        ordered_items=[
+            OrderLine(
+                None, line.quantity, line.price, line.rating,
+                item=Ref(line.item_id, line.item.name) if line.item else None,
+                combo=Ref(line.combo_id, line.combo.name) if line.combo else None,
+            )
+            for line in archived.lines
+        ],
+    )
+    detail.is_archived = True
+    return detail
+
+
+def load_order_detail(order_id, customer=None, include_archived=False):
+    """
+    Load an order for display in at most two queries (order + customer,
+    then its lines). Pass `customer` to only find that customer's order.
+    Returns an OrderDetail, or None if there is no such order.
+    """
+    filters = {'id': order_id}
+    if customer is not None:
+        filters['customer'] = customer
+
+    detail = _live_detail(filters)
+    if detail is None and include_archived:
+        detail = _archived_detail(filters)
+    return detail
@@ -0,0 +1,67 @@
+# orders/dispatch.py
+
+from django.db import transaction
+
+from items.inventory import restore_sales
+from orders.lifecycle import bulk_transition
+from orders.models import Order, STATUS_PENDING, STATUS_PREPARED, STATUS_DISPATCHED, STATUS_DELIVERED, STATUS_CANCELLED
+from orders.scheduling import slot_index
+from users.loyalty import reverse_order
+
+# Dispatch desk actions
+PREPARED = 'prepared'
+DELIVERED = 'delivered'
+OUT_FOR_DELIVERY = 'out_for_delivery'
+CANCELLED = 'cancelled'
+ACTIONS = (PREPARED, DELIVERED, OUT_FOR_DELIVERY, CANCELLED)
+
+# Status each action moves an order to (see orders/lifecycle.py)
+ACTION_STATUS = {
+    PREPARED: STATUS_PREPARED,
+    DELIVERED: STATUS_DELIVERED,
+    OUT_FOR_DELIVERY: STATUS_DISPATCHED,
+    CANCELLED: STATUS_CANCELLED,
+}
+
+# Staff who may use the dispatch desk
+DISPATCH_DESIGNATIONS = ('CS', 'KS', 'MG', 'MD')
+
+# Largest batch accepted in one request
+MAX_BATCH_SIZE = 200
+
+
+def transition_orders(order_ids, action, now=None):
+    """
+    Apply one dispatch action to many orders.
+
+    The orders are locked and checked with one SELECT, then every eligible
+    order is changed with a single UPDATE that only touches the status and
+    timestamp columns (Order.save() is not called). Cancelling a paid
+    order also puts its stock back and reverses its loyalty points, in the
+    same transaction. Returns a list of {'order_id', 'ok', 'error'} dicts
+    in the order the ids were given.
+    """
+    if action not in ACTIONS:
+        raise ValueError(f"Unknown dispatch action '{action}'")
+
+    order_ids = list(dict.fromkeys(order_ids))
+    target = ACTION_STATUS[action]
+    with transaction.atomic():
+        moved, errors = bulk_transition(order_ids, target, now)
+        if target == STATUS_CANCELLED:
+            paid = [row['id'] for row in moved if row['status'] != STATUS_PENDING]
+            if paid:
+                restore_sales(paid)
+                for order in Order.objects.filter(id__in=paid).only('id', 'customer_id'):
+                    reverse_order(order)
+
+    # Delivered/cancelled orders no longer occupy their kitchen slot
+    if target in (STATUS_DELIVERED, STATUS_CANCELLED):
+        for row in moved:
+            if row['status'] != STATUS_PENDING:
+                slot_index.release(row['delivery_slot'])
+
+    return [
+        {'order_id': order_id, 'ok': order_id not in errors, 'error': errors.get(order_id)}
+        for order_id in order_ids
+    ]
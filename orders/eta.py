@@ -0,0 +1,137 @@
+# orders/eta.py
+
+import statistics
+import threading
+import time as time_module
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from orders.scheduling import next_available_slot, slot_end, slot_start
+
+DEFAULT_MINUTES = getattr(settings, 'ETA_DEFAULT_MINUTES', 45)
+HISTORY_DAYS = getattr(settings, 'ETA_HISTORY_DAYS', 30)
+REFRESH_SECONDS = getattr(settings, 'ETA_REFRESH_SECONDS', 600)
+
+# A location/category needs this many recorded deliveries before its own
+# duration is trusted over the overall one
+MIN_SAMPLES = 5
+
+# Deliveries slower than this are treated as outliers and left out of the history
+MAX_SAMPLE_MINUTES = 240
+
+
+class EtaModel:
+    """
+    Learned service durations, overall and per delivery location and item
+    category, from recently delivered orders. A sample runs from when the
+    kitchen could start on the order (payment, or its slot's start if
+    later) to delivery, so time spent queueing for a slot is not learned
+    and then counted again by estimate().
+
+    Re-learned at most every REFRESH_SECONDS per worker; estimates are plain
+    dictionary lookups plus the kitchen queue from orders.scheduling.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._overall = DEFAULT_MINUTES
+        self._by_location = {}
+        self._category_extra = {}
+        self._samples = 0
+        self._loaded_at = None
+
+    def _ensure_loaded(self):
+        if self._loaded_at is None or time_module.monotonic() - self._loaded_at > REFRESH_SECONDS:
+            self.refresh()
+
+    def refresh(self):
+        from orders.models import Order, OrderedItem
+
+        since = timezone.now() - timedelta(days=HISTORY_DAYS)
+        durations = {}
+        locations = {}
+        for order_id, location_id, paid_at, slot, delivered_at in Order.objects.filter(
+            delivered_at__gte=since, paid_at__isnull=False,
+        ).values_list('id', 'customer__delivery_location_id', 'paid_at', 'delivery_slot', 'delivered_at'):
+            started = max(paid_at, slot_start(slot)) if slot else paid_at
+            minutes = (delivered_at - started).total_seconds() / 60
+            if 0 < minutes <= MAX_SAMPLE_MINUTES:
+                durations[order_id] = minutes
+                locations[order_id] = location_id
+
+        overall = statistics.median(durations.values()) if len(durations) >= MIN_SAMPLES else DEFAULT_MINUTES
+
+        per_location = defaultdict(list)
+        for order_id, minutes in durations.items():
+            per_location[locations[order_id]].append(minutes)
+        by_location = {
+            location_id: statistics.median(values)
+            for location_id, values in per_location.items()
+            if location_id is not None and len(values) >= MIN_SAMPLES
+        }
+
+        per_category = defaultdict(list)
+        if durations:
+            for order_id, category in (
+                OrderedItem.objects.filter(order_id__in=durations.keys(), item__isnull=False)
+                .values_list('order_id', 'item__category')
+                .distinct()
+            ):
+                per_category[category].append(durations[order_id])
+        # Extra minutes an order containing this category takes, on top of the usual
+        category_extra = {
+            category: max(statistics.median(values) - overall, 0)
+            for category, values in per_category.items()
+            if len(values) >= MIN_SAMPLES
+        }
+
+        with self._lock:
+            self._overall = overall
+            self._by_location = by_location
+            self._category_extra = category_extra
+            self._samples = len(durations)
+            self._loaded_at = time_module.monotonic()
+
+    def invalidate(self):
+        self._loaded_at = None
+
+    def service_minutes(self, location_id=None, categories=()):
+        """Typical minutes from the kitchen starting to delivery for this location/basket."""
+        self._ensure_loaded()
+        base = self._by_location.get(location_id, self._overall)
+        extra = max((self._category_extra.get(category, 0) for category in categories), default=0)
+        return base + extra
+
+    def estimate(self, location_id=None, categories=(), delivery_slot=None, now=None):
+        """
+        Expected delivery datetime. Booked (future) slots are honoured;
+        otherwise the order waits for its slot (the next one with capacity
+        if none is assigned yet) and then takes the learned service time
+        for its location/basket.
+        """
+        now = now or timezone.now()
+        if delivery_slot is not None and slot_start(delivery_slot) > slot_start(now):
+            return slot_end(delivery_slot)
+
+        slot = delivery_slot if delivery_slot is not None else next_available_slot(now)
+        start = max(slot_start(slot), now)
+        return start + timedelta(minutes=self.service_minutes(location_id, categories))
+
+
+eta_model = EtaModel()
+
+
+def estimate_order_eta(order, now=None):
+    """Expected delivery datetime for an order (one query for its categories)."""
+    categories = set(
+        order.ordereditem_set.filter(item__isnull=False).values_list('item__category', flat=True)
+    )
+    return eta_model.estimate(
+        location_id=order.customer.delivery_location_id,
+        categories=categories,
+        delivery_slot=order.delivery_slot,
+        now=now,
+    )
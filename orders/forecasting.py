@@ -0,0 +1,182 @@
+# orders/forecasting.py
+
+from datetime import timedelta
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Sum
+from django.utils import timezone
+
+from items.models import Item, Combo
+from orders.lifecycle import local_day_bounds
+from orders.models import ArchivedOrder, OperatingHours, OrderedItem, FINALIZED_STATUSES
+
+# Days of sales history the model is fitted on
+HISTORY_DAYS = 364
+
+# The demand level is the average over the open days among the last this-many days
+LEVEL_DAYS = 28
+
+# Weight (in weeks) pulling each weekday factor towards 1.0, so a few odd
+# Saturdays don't swing the forecast
+SEASONALITY_PRIOR_WEEKS = 4
+
+# Recommended stock covers the expected sales plus this many standard
+# deviations of recent daily sales
+SAFETY_STDEVS = 1.0
+
+# Forecasts change once a day; this is how long one is reused
+FORECAST_TTL = 60 * 60  # seconds
+
+_COMBO_ITEMS = ('item1_id', 'item2_id', 'item3_id', 'item4_id', 'item5_id')
+
+
+def _add(matrix, positions, start, rows):
+    """Add (item position, date, units) rows into the items x days matrix."""
+    rows = [(positions[item_id], day, units) for item_id, day, units in rows if item_id in positions and units]
+    if not rows:
+        return
+    item_idx, days, units = zip(*rows)
+    day_idx = np.fromiter((day.toordinal() for day in days), dtype=np.int64, count=len(days)) - start.toordinal()
+    np.add.at(matrix, (np.array(item_idx), day_idx), np.array(units, dtype=float))
+
+
+def daily_sales(start, end):
+    """
+    Units sold per item per day in [start, end) from paid orders, live and
+    archived, as (item ids, matrix[item, day]). Combo sales count towards
+    each component item, as record_sales deducts them.
+
+    Live orders are summed per item/combo and day by the database, so the
+    Python side only touches one row per item per day.
+    """
+    item_ids = list(Item.objects.order_by('id').values_list('id', flat=True))
+    positions = {item_id: i for i, item_id in enumerate(item_ids)}
+    matrix = np.zeros((len(item_ids), (end - start).days))
+
+    lines = OrderedItem.objects.filter(
+        order__status__in=FINALIZED_STATUSES, order__date_placed__gte=start, order__date_placed__lt=end,
+    )
+    _add(matrix, positions, start, (
+        lines.filter(item__isnull=False)
+        .values_list('item_id', 'order__date_placed')
+        .annotate(units=Sum('quantity'))
+        .values_list('item_id', 'order__date_placed', 'units')
+        .order_by()
+    ))
+
+    components = {
+        row[0]: [item_id for item_id in row[1:] if item_id]
+        for row in Combo.objects.values_list('id', *_COMBO_ITEMS)
+    }
+    combo_rows = (
+        lines.filter(combo__isnull=False)
+        .values_list('combo_id', 'order__date_placed')
+        .annotate(units=Sum('quantity'))
+        .values_list('combo_id', 'order__date_placed', 'units')
+        .order_by()
+    )
+    _add(matrix, positions, start, (
+        (item_id, day, units)
+        for combo_id, day, units in combo_rows
+        for item_id in components.get(combo_id, ())
+    ))
+
+    # Archived lines are JSON, so they are read once and flattened here
+    archived = ArchivedOrder.objects.filter(
+        placed_at__gte=local_day_bounds(start)[0], placed_at__lt=local_day_bounds(end)[0],
+    ).values_list('placed_at', 'items')
+    archived_rows = []
+    for placed_at, archived_lines in archived.iterator(chunk_size=1000):
+        day = timezone.localtime(placed_at).date()
+        for line in archived_lines or ():
+            quantity = line.get('quantity') or 0
+            if line.get('item_id'):
+                archived_rows.append((line['item_id'], day, quantity))
+            elif line.get('combo_id'):
+                archived_rows.extend((item_id, day, quantity) for item_id in components.get(line['combo_id'], ()))
+    _add(matrix, positions, start, archived_rows)
+
+    return item_ids, matrix
+
+
+def open_days(start, end):
+    """Boolean array over [start, end): False on closed weekdays and holiday closures (OperatingHours)."""
+    n_days = (end - start).days
+    weekdays = (np.arange(n_days) + start.weekday()) % 7
+    is_open = np.ones(n_days, dtype=bool)
+    for day, closed_date, opens in OperatingHours.objects.values_list('day', 'closed_date', 'is_open'):
+        if opens:
+            continue
+        if closed_date:
+            if start <= closed_date < end:
+                is_open[(closed_date - start).days] = False
+        elif day is not None:
+            is_open[weekdays == day] = False
+    return is_open
+
+
+def forecast_demand(target=None, history_days=HISTORY_DAYS):
+    """
+    Forecast each item's sales on `target` (default: tomorrow) and the
+    stock to prepare for it. Returns {'date', 'closed', 'items': {item_id:
+    {'expected', 'recommended'}}}.
+
+    expected = recent level (mean over the open days of the last LEVEL_DAYS) x the
+    target weekday's factor (its mean over the history / the overall mean,
+    shrunk towards 1). recommended adds SAFETY_STDEVS of recent variation
+    and rounds up. Closed days are left out of every average, and a closed
+    target day recommends nothing.
+    """
+    today = timezone.localdate()
+    target = target or today + timedelta(days=1)
+    start = today - timedelta(days=history_days)
+
+    closed = not open_days(target, target + timedelta(days=1))[0]
+    item_ids, sales = daily_sales(start, today)
+    if closed or not item_ids:
+        return {'date': target, 'closed': closed, 'items': {item_id: {'expected': 0.0, 'recommended': 0} for item_id in item_ids}}
+
+    is_open = open_days(start, today)
+    weekdays = (np.arange(len(is_open)) + start.weekday()) % 7
+    recent = is_open.copy()
+    recent[:-LEVEL_DAYS] = False
+    same_weekday = is_open & (weekdays == target.weekday())
+
+    def mean(mask):
+        return sales[:, mask].mean(axis=1) if mask.any() else np.zeros(len(item_ids))
+
+    overall = mean(is_open)
+    level = mean(recent)
+    spread = sales[:, recent].std(axis=1) if recent.any() else np.zeros(len(item_ids))
+
+    weeks = same_weekday.sum()
+    prior = SEASONALITY_PRIOR_WEEKS
+    with np.errstate(divide='ignore', invalid='ignore'):
+        factor = np.where(
+            overall > 0,
+            (mean(same_weekday) * weeks + overall * prior) / ((weeks + prior) * overall),
+            1.0,
+        )
+
+    expected = level * factor
+    recommended = np.where(expected > 0, np.ceil(expected + SAFETY_STDEVS * spread), 0).astype(int)
+
+    return {
+        'date': target,
+        'closed': False,
+        'items': {
+            item_id: {'expected': round(float(e), 1), 'recommended': int(r)}
+            for item_id, e, r in zip(item_ids, expected, recommended)
+        },
+    }
+
+
+def next_day_forecast():
+    """forecast_demand() for tomorrow, cached for FORECAST_TTL."""
+    key = f'demand_forecast:{timezone.localdate() + timedelta(days=1)}'
+    forecast = cache.get(key)
+    if forecast is None:
+        forecast = forecast_demand()
+        cache.set(key, forecast, FORECAST_TTL)
+    return forecast
@@ -0,0 +1,68 @@
+# orders/fragments.py
+
+from django.core.cache import cache
+from django.db import transaction
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+
+from juiceville.cache import bump_version, current_version
+from orders.details import load_order_detail
+from orders.models import STATUS_PENDING
+
+# Rendered order-detail HTML is kept this long; a status change makes it
+# unreachable immediately by bumping the order's version.
+FRAGMENT_TTL = 60 * 60 * 24  # seconds
+
+# Stands in for the CSRF token in cached HTML and is swapped for the
+# requesting user's token on the way out.
+CSRF_PLACEHOLDER = '__order_detail_csrf__'
+
+
+def _version_key(order_id):
+    return f'order_detail_version:{order_id}'
+
+
+def _fragment_key(order_id, version, is_staff):
+    variant = 'staff' if is_staff else 'customer'
+    return f'order_detail_html:{order_id}:{version}:{variant}'
+
+
+def invalidate_order_fragments(*order_ids):
+    """
+    Bump the version of each order so its cached detail HTML is re-rendered.
+    Inside a transaction the bump waits for the commit; done earlier, a
+    request could re-cache the old rows under the new version.
+    """
+    def bump():
+        for order_id in order_ids:
+            bump_version(_version_key(order_id))
+
+    transaction.on_commit(bump)
+
+
+def order_detail_fragment(request, order_id):
+    """
+    Return (owner_user_id, html) for the order-detail modal, or None if the
+    order does not exist. Paid orders are served from the cache, in a staff
+    or customer variant; unpaid carts are always rendered fresh.
+    """
+    is_staff = request.user.is_staff
+    key = _fragment_key(order_id, current_version(_version_key(order_id)), is_staff)
+
+    cached = cache.get(key)
+    if cached is None:
+        order = load_order_detail(order_id)
+        if order is None:
+            return None
+        html = render_to_string('orders/_order_details.html', {
+            'order': order,
+            'ordered_items': order.lines,
+            'is_staff': is_staff,
+            'csrf_token': CSRF_PLACEHOLDER,
+        })
+        cached = (order.customer.user.id, html)
+        if order.status != STATUS_PENDING:
+            cache.set(key, cached, FRAGMENT_TTL)
+
+    owner_id, html = cached
+    return owner_id, html.replace(CSRF_PLACEHOLDER, get_token(request))
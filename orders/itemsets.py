@@ -0,0 +1,163 @@
+# orders/itemsets.py
+
+from array import array
+from collections import Counter
+from datetime import timedelta
+from decimal import Decimal
+from itertools import combinations
+
+from django.db import transaction
+from django.utils import timezone
+
+from items.models import Item, Combo
+from orders.models import ComboSuggestion
+from orders.recommendations import paid_baskets
+
+# Combo.calculate_rate's discount, used to price a proposed combo
+COMBO_DISCOUNT = Decimal('0.95')
+
+# Combos hold at most five items (item1..item5)
+MAX_COMBO_SIZE = 5
+
+# Baskets bigger than this are only counted for pairs; the number of
+# 3+-item subsets of a large party order would dominate the run
+MAX_BASKET_FOR_TRIPLES = 20
+
+
+def encode_baskets(baskets):
+    """
+    Read baskets (sets of item ids) once and return (weights, singles, codes).
+
+    Item ids are replaced by small dense integers, each basket is stored as
+    a sorted array('I'), and identical baskets are kept once with a count,
+    so the full history fits in memory compactly. `codes` maps code -> item
+    id; `singles` counts the orders containing each code.
+    """
+    codes, item_code = [], {}
+    weights = Counter()
+    for basket in baskets:
+        encoded = []
+        for item_id in basket:
+            code = item_code.get(item_id)
+            if code is None:
+                code = item_code[item_id] = len(codes)
+                codes.append(item_id)
+            encoded.append(code)
+        weights[array('I', sorted(encoded)).tobytes()] += 1
+
+    singles = Counter()
+    for key, weight in weights.items():
+        for code in array('I', key):
+            singles[code] += weight
+    return weights, singles, codes
+
+
+def _candidates(frequent, size):
+    """Apriori join + prune: size-item sets whose every (size-1)-subset is frequent."""
+    ordered = sorted(frequent)
+    candidates = set()
+    for i, a in enumerate(ordered):
+        for b in ordered[i + 1:]:
+            if a[:-1] != b[:-1]:
+                break
+            candidate = a + (b[-1],)
+            if all(subset in frequent for subset in combinations(candidate, size - 1)):
+                candidates.add(candidate)
+    return candidates
+
+
+def frequent_itemsets(weights, singles, min_support, max_size=MAX_COMBO_SIZE):
+    """
+    Apriori over encoded baskets. Returns {itemset (sorted codes): orders}
+    for every itemset of 2..max_size items in at least `min_support` orders.
+    """
+    frequent_singles = {code for code, count in singles.items() if count >= min_support}
+    baskets = []
+    for key, weight in weights.items():
+        kept = tuple(code for code in array('I', key) if code in frequent_singles)
+        if len(kept) > 1:
+            baskets.append((kept, weight))
+
+    found = {}
+    frequent = {(code,) for code in frequent_singles}
+    for size in range(2, max_size + 1):
+        candidates = _candidates(frequent, size)
+        if not candidates:
+            break
+        counts = Counter()
+        for kept, weight in baskets:
+            if len(kept) < size or (size > 2 and len(kept) > MAX_BASKET_FOR_TRIPLES):
+                continue
+            for subset in combinations(kept, size):
+                if subset in candidates:
+                    counts[subset] += weight
+        frequent = {itemset for itemset, count in counts.items() if count >= min_support}
+        found.update((itemset, counts[itemset]) for itemset in frequent)
+        # Only sets whose items all survived can grow further
+        alive = {code for itemset in frequent for code in itemset}
+        baskets = [(tuple(c for c in kept if c in alive), weight) for kept, weight in baskets]
+        baskets = [(kept, weight) for kept, weight in baskets if len(kept) > size]
+    return found
+
+
+def mine_combo_suggestions(days=None, min_support=5, min_lift=1.0, max_size=4, limit=50):
+    """
+    Mine paid orders from the last `days` (all history when None) for item
+    sets often bought together, and store the best `limit` by projected
+    revenue as ComboSuggestion rows, replacing the previous run. Revenue is
+    projected per 30 days when `days` is given. Returns (orders mined,
+    suggestions saved).
+    """
+    since = timezone.now() - timedelta(days=days) if days else None
+    weights, singles, codes = encode_baskets(paid_baskets(since))
+    orders = sum(weights.values())
+    found = frequent_itemsets(weights, singles, min_support, max_size=min(max_size, MAX_COMBO_SIZE)) if orders else {}
+
+    rates = dict(Item.objects.values_list('id', 'rate'))
+    existing = {}
+    for combo in Combo.objects.values('id', 'item1_id', 'item2_id', 'item3_id', 'item4_id', 'item5_id'):
+        items = frozenset(combo[f'item{n}_id'] for n in range(1, 6) if combo[f'item{n}_id'])
+        existing.setdefault(items, combo['id'])
+
+    months = Decimal(days) / 30 if days else None
+    suggestions = []
+    for itemset, count in found.items():
+        item_ids = [codes[code] for code in itemset]
+        if not all(item_id in rates for item_id in item_ids):
+            continue  # an item has since been deleted
+        support = count / orders
+        expected = 1.0
+        for code in itemset:
+            expected *= singles[code] / orders
+        lift = support / expected
+        if lift < min_lift:
+            continue
+        price = (sum(rates[item_id] for item_id in item_ids) * COMBO_DISCOUNT).quantize(Decimal('0.01'))
+        revenue = price * count
+        suggestions.append(ComboSuggestion(
+            item_ids=sorted(item_ids),
+            size=len(item_ids),
+            orders=count,
+            support=round(support, 4),
+            lift=round(lift, 3),
+            combo_price=price,
+            projected_revenue=(revenue / months).quantize(Decimal('0.01')) if months else revenue,
+            existing_combo_id=existing.get(frozenset(item_ids)),
+        ))
+
+    suggestions.sort(key=lambda s: (s.projected_revenue, s.lift), reverse=True)
+    with transaction.atomic():
+        ComboSuggestion.objects.all().delete()
+        ComboSuggestion.objects.bulk_create(suggestions[:limit])
+    return orders, len(suggestions[:limit])
+
+
+def combo_suggestions(limit=10):
+    """Stored suggestions, best first, each with `.items` (its Items) for the dashboard."""
+    suggestions = list(ComboSuggestion.objects.select_related('existing_combo')[:limit])
+    items = Item.objects.only('id', 'name', 'rate').in_bulk(
+        {item_id for suggestion in suggestions for item_id in suggestion.item_ids}
+    )
+    for suggestion in suggestions:
+        suggestion.items = [items[item_id] for item_id in suggestion.item_ids if item_id in items]
+    return suggestions
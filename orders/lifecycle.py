@@ -0,0 +1,140 @@
+# orders/lifecycle.py
+
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from orders.fragments import invalidate_order_fragments
+from orders.models import (
+    Order,
+    STATUS_PENDING, STATUS_PAID, STATUS_PREPARED, STATUS_DISPATCHED, STATUS_DELIVERED, STATUS_CANCELLED,
+)
+
+# Which statuses an order may move to from each status
+TRANSITIONS = {
+    STATUS_PENDING: (STATUS_PAID, STATUS_CANCELLED),
+    STATUS_PAID: (STATUS_PREPARED, STATUS_DISPATCHED, STATUS_DELIVERED, STATUS_CANCELLED),
+    STATUS_PREPARED: (STATUS_DISPATCHED, STATUS_DELIVERED, STATUS_CANCELLED),
+    STATUS_DISPATCHED: (STATUS_DELIVERED, STATUS_CANCELLED),
+    STATUS_DELIVERED: (),
+    STATUS_CANCELLED: (),
+}
+
+# Timestamp column stamped when an order enters each status
+TIMESTAMP_FIELDS = {
+    STATUS_PAID: 'paid_at',
+    STATUS_PREPARED: 'prepared_at',
+    STATUS_DISPATCHED: 'dispatched_at',
+    STATUS_DELIVERED: 'delivered_at',
+    STATUS_CANCELLED: 'cancelled_at',
+}
+
+
+class InvalidTransition(ValueError):
+    """Raised when an order cannot move from its current status to the target."""
+
+
+def can_transition(current, target):
+    return target in TRANSITIONS.get(current, ())
+
+
+def transition_error(current, target):
+    """Human readable reason an order in `current` cannot move to `target` (or None)."""
+    if can_transition(current, target):
+        return None
+    if current == STATUS_CANCELLED:
+        return 'Order was cancelled'
+    if current == STATUS_DELIVERED:
+        return 'Order already delivered'
+    if current == target:
+        return f"Order is already {dict(Order._meta.get_field('status').choices)[current].lower()}"
+    if current == STATUS_PENDING:
+        return 'Order has not been paid'
+    return f"Order cannot go from {current.lower()} to {target.lower()}"
+
+
+def changes_for(target, now):
+    """Column values written when an order enters `target`, including the legacy flags."""
+    changes = {'status': target, TIMESTAMP_FIELDS[target]: now}
+    if target == STATUS_PAID:
+        changes['finalized'] = True
+    elif target == STATUS_CANCELLED:
+        # Cancelled orders no longer count as paid for finalized readers
+        changes['finalized'] = False
+    elif target == STATUS_DELIVERED:
+        changes['delivered'] = True
+    return changes
+
+
+def transition(order, target, now=None, save=True):
+    """
+    Move a single order to `target`, stamping its timestamp column.
+    Raises InvalidTransition if the move is not allowed.
+    """
+    error = transition_error(order.status, target)
+    if error:
+        raise InvalidTransition(error)
+
+    changes = changes_for(target, now or timezone.now())
+    for field, value in changes.items():
+        setattr(order, field, value)
+    if save:
+        order.save(update_fields=list(changes))
+    return order
+
+
+def bulk_transition(order_ids, target, now=None):
+    """
+    Move many orders to `target` with one locked SELECT and a single
+    UPDATE (guarded on the status read, so a concurrent change is not
+    overwritten). Returns (rows, errors): the {'id', 'status',
+    'delivery_slot'} rows that were moved, and {order_id: reason} for the
+    rest.
+    """
+    now = now or timezone.now()
+    order_ids = list(dict.fromkeys(order_ids))
+
+    with transaction.atomic():
+        rows = {
+            row['id']: row
+            for row in Order.objects.select_for_update()
+            .filter(id__in=order_ids)
+            .values('id', 'status', 'delivery_slot')
+        }
+
+        errors = {}
+        moved = []
+        for order_id in order_ids:
+            row = rows.get(order_id)
+            error = 'Order not found' if row is None else transition_error(row['status'], target)
+            if error:
+                errors[order_id] = error
+            else:
+                moved.append(row)
+
+        if moved:
+            allowed_from = [status for status, targets in TRANSITIONS.items() if target in targets]
+            Order.objects.filter(id__in=[row['id'] for row in moved], status__in=allowed_from).update(
+                **changes_for(target, now)
+            )
+            # Takes effect once the transaction commits
+            invalidate_order_fragments(*[row['id'] for row in moved])
+
+    return moved, errors
+
+
+def local_day_bounds(day):
+    """Aware [start, end) datetimes covering a local calendar date."""
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+
+
+def local_month_bounds(year, month):
+    """Aware [start, end) datetimes covering a local calendar month."""
+    start = timezone.make_aware(datetime(year, month, 1))
+    if month == 12:
+        end = datetime(year + 1, 1, 1)
+    else:
+        end = datetime(year, month + 1, 1)
+    return start, timezone.make_aware(end)
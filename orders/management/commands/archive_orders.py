@@ -0,0 +1,25 @@
+# management/commands/archive_orders.py
+from django.core.management.base import BaseCommand
+
+from orders.archive import ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE, archivable_orders, archive_orders
+
+
+class Command(BaseCommand):
+    help = "Move delivered orders older than the archive horizon out of the live order tables (run weekly)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=ARCHIVE_AFTER_DAYS,
+                            help='Archive delivered orders placed more than this many days ago.')
+        parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE,
+                            help='Number of orders moved per transaction.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report how many orders would be archived.')
+
+    def handle(self, *args, **options):
+        days = options['days']
+        if options['dry_run']:
+            self.stdout.write(f"{archivable_orders(days).count()} orders older than {days} days would be archived.")
+            return
+
+        archived = archive_orders(days, batch_size=max(options['batch_size'], 1))
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} orders older than {days} days."))
@@ -0,0 +1,102 @@
+# management/commands/asset_weight.py
+import os
+from html.parser import HTMLParser
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.staticfiles import finders
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+# Pages behind login (e.g. /items/menu/) need --user
+DEFAULT_PAGES = ['/', '/offline/']
+
+
+class AssetCollector(HTMLParser):
+    """Collects the stylesheet, script, icon and image URLs a page loads."""
+
+    def __init__(self):
+        super().__init__()
+        self.urls = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'link' and attrs.get('href') and ('stylesheet' in (attrs.get('rel') or '') or 'icon' in (attrs.get('rel') or '')):
+            self.urls.append(attrs['href'])
+        elif tag in ('script', 'img') and attrs.get('src'):
+            self.urls.append(attrs['src'])
+
+
+def _size(path):
+    return os.path.getsize(path) if path and os.path.exists(path) else None
+
+
+def asset_sizes(url):
+    """(raw, gzip, brotli) bytes for a static URL; compressed sizes need collectstatic."""
+    static_url = '/' + settings.STATIC_URL.strip('/') + '/'
+    name = urlparse(url).path[len(static_url):]
+    collected = os.path.join(settings.STATIC_ROOT, name)
+    if os.path.exists(collected):
+        raw = _size(collected)
+    else:
+        raw = _size(finders.find(name))
+    return raw, _size(collected + '.gz'), _size(collected + '.br')
+
+
+def _kb(n):
+    return '-' if n is None else f"{n / 1024:.1f} KB"
+
+
+class Command(BaseCommand):
+    help = "Report the static asset weight of each page (raw / gzip / brotli). Run after collectstatic."
+
+    def add_arguments(self, parser):
+        parser.add_argument('pages', nargs='*', default=DEFAULT_PAGES,
+                            help='Paths to render (default: home and offline pages).')
+        parser.add_argument('--user', help='Render the pages logged in as this username.')
+
+    def handle(self, *args, **options):
+        client = Client()
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+            if user is None:
+                raise CommandError(f"No user named '{options['user']}'")
+            client.force_login(user)
+
+        static_url = '/' + settings.STATIC_URL.strip('/') + '/'
+        for page in options['pages']:
+            response = client.get(page, secure=True)
+            if response.status_code != 200:
+                self.stdout.write(self.style.WARNING(f"{page}: HTTP {response.status_code}, skipped"))
+                continue
+
+            collector = AssetCollector()
+            collector.feed(response.content.decode('utf-8', errors='replace'))
+            external = [url for url in collector.urls if urlparse(url).netloc]
+            local = list(dict.fromkeys(
+                url for url in collector.urls if not urlparse(url).netloc and urlparse(url).path.startswith(static_url)
+            ))
+
+            totals = [0, 0, 0]
+            missing = []
+            self.stdout.write(self.style.MIGRATE_HEADING(page))
+            for url in local:
+                raw, gz, br = asset_sizes(url)
+                if raw is None:
+                    missing.append(url)
+                    continue
+                totals[0] += raw
+                # Uncompressed size counts where no compressed copy exists
+                totals[1] += gz if gz is not None else raw
+                totals[2] += br if br is not None else (gz if gz is not None else raw)
+                if options['verbosity'] > 1:
+                    self.stdout.write(f"  {_kb(raw):>10} {_kb(gz):>10} {_kb(br):>10}  {url}")
+
+            self.stdout.write(
+                f"  {len(local)} static files: {_kb(totals[0])} raw, "
+                f"{_kb(totals[1])} gzip, {_kb(totals[2])} brotli "
+                f"(+ {len(external)} external, {len(missing)} missing)"
+            )
+            for url in missing:
+                self.stdout.write(self.style.WARNING(f"  missing: {url}"))
@@ -0,0 +1,25 @@
+# management/commands/build_recommendations.py
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from orders.recommendations import build_snapshot
+
+
+class Command(BaseCommand):
+    help = "Mine paid orders into the co-purchase index behind the cart suggestions (run nightly)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=365,
+                            help='Only count orders placed in the last N days (0 for all).')
+        parser.add_argument('--keep', type=int, default=2,
+                            help='Number of snapshots to keep, newest first.')
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(days=options['days']) if options['days'] > 0 else None
+        snapshot = build_snapshot(since=since, keep=max(options['keep'], 1))
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {snapshot.items} items and {snapshot.pairs} pairs from {snapshot.orders} orders "
+            f"({len(snapshot.data)} bytes)."
+        ))
@@ -0,0 +1,35 @@
+# management/commands/mine_combos.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from orders.itemsets import MAX_COMBO_SIZE, mine_combo_suggestions
+
+
+class Command(BaseCommand):
+    help = "Find items often bought together and propose them as combos on the MG dashboard (run weekly)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=90,
+                            help='Mine orders placed in the last N days (0 for the full history).')
+        parser.add_argument('--min-support', type=int, default=5,
+                            help='Minimum number of orders that must contain the whole set.')
+        parser.add_argument('--min-lift', type=float, default=1.0,
+                            help='Drop sets bought together no more often than chance would predict.')
+        parser.add_argument('--max-size', type=int, default=4, choices=range(2, MAX_COMBO_SIZE + 1),
+                            help='Largest item set to look for.')
+        parser.add_argument('--limit', type=int, default=50,
+                            help='Number of suggestions to keep.')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        orders, saved = mine_combo_suggestions(
+            days=options['days'] or None,
+            min_support=max(options['min_support'], 1),
+            min_lift=options['min_lift'],
+            max_size=options['max_size'],
+            limit=options['limit'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Mined {orders} orders in {time.perf_counter() - started:.1f}s; saved {saved} combo suggestions."
+        ))
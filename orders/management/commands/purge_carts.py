@@ -0,0 +1,45 @@
+# management/commands/purge_carts.py
+from django.core.management.base import BaseCommand
+
+from orders.carts import (
+    CART_TTL_HOURS, PAYING_CART_TTL_HOURS, PURGE_BATCH_SIZE, abandonment_stats, purge_stale_carts, stale_carts,
+)
+
+
+class Command(BaseCommand):
+    help = "Delete (or archive) unpaid carts that have not been touched for a while (run daily)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ttl-hours', type=int, default=CART_TTL_HOURS,
+                            help='Carts untouched for this many hours are purged.')
+        parser.add_argument('--paying-ttl-hours', type=int, default=PAYING_CART_TTL_HOURS,
+                            help='Carts that started a payment are purged after this many hours instead.')
+        parser.add_argument('--archive', action='store_true',
+                            help='Mark stale carts as cancelled instead of deleting them.')
+        parser.add_argument('--batch-size', type=int, default=PURGE_BATCH_SIZE,
+                            help='Number of carts removed per statement.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report how many carts would be purged.')
+
+    def handle(self, *args, **options):
+        ttl_hours = options['ttl_hours']
+        paying_ttl_hours = options['paying_ttl_hours']
+
+        if options['dry_run']:
+            count = stale_carts(ttl_hours, paying_ttl_hours=paying_ttl_hours).count()
+            self.stdout.write(f"{count} carts older than {ttl_hours}h would be purged.")
+        else:
+            purge = purge_stale_carts(
+                ttl_hours, archive=options['archive'], batch_size=max(options['batch_size'], 1),
+                paying_ttl_hours=paying_ttl_hours,
+            )
+            action = "Archived" if purge.archived else "Deleted"
+            self.stdout.write(self.style.SUCCESS(
+                f"{action} {purge.carts} carts ({purge.ordered_items} items, ₦{purge.value}) older than {ttl_hours}h."
+            ))
+
+        stats = abandonment_stats(ttl_hours=ttl_hours)
+        self.stdout.write(
+            f"Last {stats['days']} days: {stats['converted']} paid, {stats['abandoned']} abandoned "
+            f"({stats['abandonment_rate']}%), {stats['open']} still open."
+        )
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0004_order_total_price"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="KitchenCapacity",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "day",
+                    models.IntegerField(
+                        blank=True,
+                        choices=[
+                            (0, "Monday"),
+                            (1, "Tuesday"),
+                            (2, "Wednesday"),
+                            (3, "Thursday"),
+                            (4, "Friday"),
+                            (5, "Saturday"),
+                            (6, "Sunday"),
+                        ],
+                        help_text="Leave blank to apply to every day.",
+                        null=True,
+                    ),
+                ),
+                (
+                    "start_time",
+                    models.TimeField(
+                        help_text="Start of the window this capacity applies to."
+                    ),
+                ),
+                (
+                    "end_time",
+                    models.TimeField(
+                        help_text="End of the window this capacity applies to."
+                    ),
+                ),
+                (
+                    "orders_per_slot",
+                    models.PositiveIntegerField(
+                        default=6, help_text="Orders the kitchen can prepare per slot."
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Kitchen Capacity",
+                "verbose_name_plural": "Kitchen Capacity",
+                "ordering": ["day", "start_time"],
+            },
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="delivery_slot",
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0005_kitchen_scheduling"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="delivered_at",
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="paid_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0006_order_paid_at_delivered_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="cancelled_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="dispatched_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0007_order_dispatched_at_cancelled_at"),
+        ("users", "0002_customer_created_at_customer_date_of_birth_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="placed_at",
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="prepared_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("PENDING", "Pending Payment"),
+                    ("PAID", "Processing"),
+                    ("PREPARED", "Ready"),
+                    ("DISPATCHED", "Out for Delivery"),
+                    ("DELIVERED", "Delivered"),
+                    ("CANCELLED", "Cancelled"),
+                ],
+                db_index=True,
+                default="PENDING",
+                max_length=10,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["status", "placed_at"], name="order_status_placed_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Backfill Order.status and Order.placed_at from the legacy boolean flags
+# and the separate date_placed/time_placed fields.
+
+from datetime import datetime, time
+
+from django.db import migrations
+from django.utils import timezone
+
+BATCH_SIZE = 500
+
+
+def backfill_status(apps, schema_editor):
+    Order = apps.get_model("orders", "Order")
+
+    # Most specific state wins, so apply in this order
+    Order.objects.filter(finalized=True).update(status="PAID")
+    Order.objects.filter(finalized=True, dispatched_at__isnull=False).update(
+        status="DISPATCHED"
+    )
+    Order.objects.filter(delivered=True).update(status="DELIVERED")
+    Order.objects.filter(cancelled_at__isnull=False).update(status="CANCELLED")
+
+    # placed_at combines date_placed + time_placed in the site time zone
+    batch = []
+    orders = Order.objects.filter(
+        date_placed__isnull=False, placed_at__isnull=True
+    ).only("id", "date_placed", "time_placed")
+    for order in orders.iterator(chunk_size=BATCH_SIZE):
+        placed = datetime.combine(order.date_placed, order.time_placed or time(0, 0))
+        order.placed_at = timezone.make_aware(placed)
+        batch.append(order)
+        if len(batch) >= BATCH_SIZE:
+            Order.objects.bulk_update(batch, ["placed_at"])
+            batch = []
+    if batch:
+        Order.objects.bulk_update(batch, ["placed_at"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0008_order_status"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_status, migrations.RunPython.noop),
+    ]
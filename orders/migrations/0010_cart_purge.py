@@ -0,0 +1,70 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def copy_created_at(apps, schema_editor):
+    # Best guess for when existing orders were last touched
+    Order = apps.get_model("orders", "Order")
+    Order.objects.update(updated_at=models.F("created_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0009_backfill_order_status"),
+        ("users", "0002_customer_created_at_customer_date_of_birth_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CartPurge",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "ran_at",
+                    models.DateTimeField(
+                        db_index=True, default=django.utils.timezone.now
+                    ),
+                ),
+                ("ttl_hours", models.PositiveIntegerField()),
+                (
+                    "archived",
+                    models.BooleanField(
+                        default=False,
+                        help_text="Carts were cancelled and kept instead of deleted.",
+                    ),
+                ),
+                ("carts", models.PositiveIntegerField(default=0)),
+                ("ordered_items", models.PositiveIntegerField(default=0)),
+                (
+                    "value",
+                    models.DecimalField(decimal_places=2, default=0.0, max_digits=12),
+                ),
+            ],
+            options={
+                "ordering": ["-ran_at"],
+            },
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["status", "updated_at"], name="order_status_updated_idx"
+            ),
+        ),
+        migrations.RunPython(copy_created_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:22
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0010_cart_purge"),
+        ("users", "0002_customer_created_at_customer_date_of_birth_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedOrder",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("PENDING", "Pending Payment"),
+                            ("PAID", "Processing"),
+                            ("PREPARED", "Ready"),
+                            ("DISPATCHED", "Out for Delivery"),
+                            ("DELIVERED", "Delivered"),
+                            ("CANCELLED", "Cancelled"),
+                        ],
+                        default="DELIVERED",
+                        max_length=10,
+                    ),
+                ),
+                ("placed_at", models.DateTimeField(db_index=True)),
+                ("paid_at", models.DateTimeField(blank=True, null=True)),
+                ("delivered_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "subtotal",
+                    models.DecimalField(decimal_places=2, default=0.0, max_digits=10),
+                ),
+                (
+                    "delivery_fee",
+                    models.DecimalField(decimal_places=2, default=0.0, max_digits=10),
+                ),
+                (
+                    "grand_total",
+                    models.DecimalField(decimal_places=2, default=0.0, max_digits=10),
+                ),
+                ("used_loyalty_points", models.BooleanField(default=False)),
+                (
+                    "payment_reference",
+                    models.CharField(blank=True, max_length=100, null=True),
+                ),
+                ("hidden_from_customer", models.BooleanField(default=False)),
+                ("items", models.JSONField(default=list)),
+                (
+                    "archived_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                (
+                    "customer",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_orders",
+                        to="users.customer",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-placed_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["customer", "placed_at"],
+                        name="archorder_customer_placed_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:23
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0011_archivedorder"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="order",
+            name="ordered_items",
+        ),
+    ]
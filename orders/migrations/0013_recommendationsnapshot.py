@@ -0,0 +1,51 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:43
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0012_remove_order_ordered_items"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RecommendationSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "built_at",
+                    models.DateTimeField(
+                        db_index=True, default=django.utils.timezone.now
+                    ),
+                ),
+                (
+                    "orders",
+                    models.PositiveIntegerField(
+                        default=0, help_text="Paid orders mined."
+                    ),
+                ),
+                ("items", models.PositiveIntegerField(default=0)),
+                (
+                    "pairs",
+                    models.PositiveIntegerField(
+                        default=0, help_text="Item pairs kept."
+                    ),
+                ),
+                ("data", models.BinaryField()),
+            ],
+            options={
+                "ordering": ["-built_at"],
+            },
+        ),
+    ]
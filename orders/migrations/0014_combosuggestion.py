@@ -0,0 +1,80 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:44
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("items", "0006_menu_fulltext"),
+        ("orders", "0013_recommendationsnapshot"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ComboSuggestion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("item_ids", models.JSONField(default=list)),
+                ("size", models.PositiveSmallIntegerField()),
+                (
+                    "orders",
+                    models.PositiveIntegerField(
+                        help_text="Paid orders containing all of these items."
+                    ),
+                ),
+                (
+                    "support",
+                    models.FloatField(
+                        help_text="Share of mined orders containing all of these items."
+                    ),
+                ),
+                (
+                    "lift",
+                    models.FloatField(
+                        help_text="How much more often they are bought together than by chance."
+                    ),
+                ),
+                (
+                    "combo_price",
+                    models.DecimalField(
+                        decimal_places=2,
+                        help_text="Sum of item rates less the combo discount.",
+                        max_digits=10,
+                    ),
+                ),
+                (
+                    "projected_revenue",
+                    models.DecimalField(
+                        decimal_places=2,
+                        help_text="Combo price x orders (per 30 days if a window was mined).",
+                        max_digits=12,
+                    ),
+                ),
+                ("mined_at", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "existing_combo",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="items.combo",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-projected_revenue", "-lift"],
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Create the database cache table for CACHES['default'] (settings.py), so
+# `migrate` is all a deploy needs. createcachetable skips existing tables.
+
+from django.core.management import call_command
+from django.db import migrations
+
+
+def create_cache_table(apps, schema_editor):
+    call_command("createcachetable", database=schema_editor.connection.alias, verbosity=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0014_combosuggestion"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_cache_table, migrations.RunPython.noop),
+    ]
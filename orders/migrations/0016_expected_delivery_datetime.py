@@ -0,0 +1,63 @@
+# Order.expected_delivery_time becomes a DateTimeField, so deliveries
+# booked into a later day's slot keep their date. Existing times are given
+# the date of the order's slot, or the day it was placed.
+
+from datetime import datetime, timedelta
+
+from django.db import migrations, models
+from django.utils import timezone
+
+BATCH_SIZE = 500
+
+
+def backfill_expected_delivery(apps, schema_editor):
+    Order = apps.get_model("orders", "Order")
+
+    batch = []
+    orders = Order.objects.filter(expected_delivery_time__isnull=False).only(
+        "id", "expected_delivery_time", "delivery_slot", "date_placed", "time_placed"
+    )
+    for order in orders.iterator(chunk_size=BATCH_SIZE):
+        if order.delivery_slot is not None:
+            day = timezone.localtime(order.delivery_slot).date()
+        elif order.date_placed is not None:
+            day = order.date_placed
+            # An evening order delivered after midnight
+            if order.time_placed and order.expected_delivery_time < order.time_placed:
+                day += timedelta(days=1)
+        else:
+            continue
+        order.expected_delivery_at = timezone.make_aware(
+            datetime.combine(day, order.expected_delivery_time)
+        )
+        batch.append(order)
+        if len(batch) >= BATCH_SIZE:
+            Order.objects.bulk_update(batch, ["expected_delivery_at"])
+            batch = []
+    if batch:
+        Order.objects.bulk_update(batch, ["expected_delivery_at"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0015_cache_table"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="expected_delivery_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_expected_delivery, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name="order",
+            name="expected_delivery_time",
+        ),
+        migrations.RenameField(
+            model_name="order",
+            old_name="expected_delivery_at",
+            new_name="expected_delivery_time",
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Backfill Order.paid_at for orders finalized before it was recorded
+# (0009 set their status but left paid_at empty). The time the order was
+# placed is when it was paid.
+
+from django.db import migrations
+from django.db.models import F
+
+PAID_STATUSES = ["PAID", "PREPARED", "DISPATCHED", "DELIVERED"]
+
+
+def backfill_paid_at(apps, schema_editor):
+    Order = apps.get_model("orders", "Order")
+
+    unstamped = Order.objects.filter(paid_at__isnull=True, status__in=PAID_STATUSES)
+    unstamped.filter(placed_at__isnull=False).update(paid_at=F("placed_at"))
+    # Orders from before placed_at existed fall back to when they were created
+    unstamped.filter(placed_at__isnull=True).update(paid_at=F("created_at"))
+
+    # Cancelled orders only count as paid if they went through finalization
+    Order.objects.filter(
+        status="CANCELLED", finalized=True, paid_at__isnull=True
+    ).update(paid_at=F("placed_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0016_expected_delivery_datetime"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_paid_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Cancelled orders kept finalized=True from when they were paid, so readers
+# of the legacy flag still counted them. Cancelling now clears it; clear it
+# on the orders cancelled before that.
+
+from django.db import migrations
+
+
+def clear_cancelled_finalized(apps, schema_editor):
+    Order = apps.get_model("orders", "Order")
+    Order.objects.filter(status="CANCELLED", finalized=True).update(finalized=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0017_backfill_order_paid_at"),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_cancelled_finalized, migrations.RunPython.noop),
+    ]
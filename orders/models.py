@@ -24,6 +24,42 @@ DAYS_OF_WEEK = (
     (6, 'Sunday'),
 )
 
+# Order lifecycle. Allowed transitions live in orders/lifecycle.py
+STATUS_PENDING = 'PENDING'
+STATUS_PAID = 'PAID'
+STATUS_PREPARED = 'PREPARED'
+STATUS_DISPATCHED = 'DISPATCHED'
+STATUS_DELIVERED = 'DELIVERED'
+STATUS_CANCELLED = 'CANCELLED'
+
+ORDER_STATUSES = (
+    (STATUS_PENDING, 'Pending Payment'),
+    (STATUS_PAID, 'Processing'),
+    (STATUS_PREPARED, 'Ready'),
+    (STATUS_DISPATCHED, 'Out for Delivery'),
+    (STATUS_DELIVERED, 'Delivered'),
+    (STATUS_CANCELLED, 'Cancelled'),
+)
+
+# Paid orders, whatever stage they are at (the old `finalized=True`)
+FINALIZED_STATUSES = (STATUS_PAID, STATUS_PREPARED, STATUS_DISPATCHED, STATUS_DELIVERED)
+# Paid but not yet delivered: the kitchen/dispatch queue
+ACTIVE_STATUSES = (STATUS_PAID, STATUS_PREPARED, STATUS_DISPATCHED)
+
+class OrderedItemQuerySet(models.QuerySet):
+    def for_display(self):
+        """Lines with their item/combo loaded, for rendering names and prices."""
+        return self.select_related('item', 'combo')
+
+
+class OrderQuerySet(models.QuerySet):
+    def with_lines(self):
+        """Prefetch each order's lines (with item/combo) in one extra query; read them via Order.lines."""
+        return self.prefetch_related(
+            models.Prefetch('ordereditem_set', queryset=OrderedItem.objects.for_display())
+        )
+
+
 class OrderedItem(models.Model):
     order = models.ForeignKey('Order', on_delete=models.CASCADE)
     item = models.ForeignKey(Item, on_delete=models.CASCADE)
@@ -46,6 +82,8 @@ class OrderedItem(models.Model):
         related_name='ordered_combos' 
     )
 
+    objects = OrderedItemQuerySet.as_manager()
+
     def __str__(self):
         # Safely determine the name of the item/combo.
         if self.item:
@@ -88,20 +126,40 @@ class OrderedItem(models.Model):
 
 class Order(models.Model):
     customer = models.ForeignKey(Customer, on_delete=models.CASCADE)
-    ordered_items = models.ManyToManyField(OrderedItem, related_name='orders')
     grand_total = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     date_placed = models.DateField(auto_now_add=False, null=True, blank=True)
     time_placed = models.TimeField(auto_now_add=False, null=True, blank=True)
-    expected_delivery_time = models.TimeField(auto_now_add=False, null=True, blank=True)
+    expected_delivery_time = models.DateTimeField(null=True, blank=True)
     delivered = models.BooleanField(default=False)
     finalized = models.BooleanField(default=False)
     used_loyalty_points = models.BooleanField(default=False)
     payment_reference = models.CharField(max_length=100, null=True, blank=True)
     hidden_from_customer = models.BooleanField(default=False)
+    # Start of the kitchen slot this order is prepared in (see orders/scheduling.py)
+    delivery_slot = models.DateTimeField(null=True, blank=True, db_index=True)
+    # Lifecycle status and per-transition timestamps (see orders/lifecycle.py).
+    # `finalized`/`delivered` above are kept in sync for older code paths.
+    status = models.CharField(max_length=10, choices=ORDER_STATUSES, default=STATUS_PENDING, db_index=True)
+    placed_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    paid_at = models.DateTimeField(null=True, blank=True)
+    prepared_at = models.DateTimeField(null=True, blank=True)
+    dispatched_at = models.DateTimeField(null=True, blank=True)
+    delivered_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    cancelled_at = models.DateTimeField(null=True, blank=True)
 
     # Added field to store total price
     total_price = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     created_at = models.DateTimeField(default=timezone.now)
+    # Last time the order was saved; unpaid carts idle for too long are purged (see orders/carts.py)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = OrderQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'placed_at'], name='order_status_placed_idx'),
+            models.Index(fields=['status', 'updated_at'], name='order_status_updated_idx'),
+        ]
 
     def __str__(self):
         return str(self.customer.user.username) + "- " + str(self.date_placed) + " - #" + str(self.id)
@@ -119,6 +177,13 @@ class Order(models.Model):
         
         super(Order, self).save(*args, **kwargs)
 
+    @property
+    def lines(self):
+        """Ordered items; ArchivedOrder.lines returns the same shape for archived orders."""
+        if 'ordereditem_set' in getattr(self, '_prefetched_objects_cache', {}):
+            return self.ordereditem_set.all()
+        return self.ordereditem_set.for_display()
+
     def calculate_totals(self):
         """
         Calculate subtotal, apply discounts, and set grand_total
@@ -197,4 +262,155 @@ class OperatingHours(models.Model):
             
         open_str = self.opening_time.strftime('%I:%M %p')
         close_str = self.closing_time.strftime('%I:%M %p')
-        return f"{day_name}: {open_str} - {close_str}"
\ No newline at end of file
+        return f"{day_name}: {open_str} - {close_str}"
+
+class KitchenCapacity(models.Model):
+    """How many orders the kitchen can prepare per delivery slot in a time window."""
+    day = models.IntegerField(choices=DAYS_OF_WEEK, null=True, blank=True, help_text="Leave blank to apply to every day.")
+    start_time = models.TimeField(help_text="Start of the window this capacity applies to.")
+    end_time = models.TimeField(help_text="End of the window this capacity applies to.")
+    orders_per_slot = models.PositiveIntegerField(default=6, help_text="Orders the kitchen can prepare per slot.")
+
+    class Meta:
+        verbose_name = "Kitchen Capacity"
+        verbose_name_plural = "Kitchen Capacity"
+        ordering = ['day', 'start_time']
+
+    def __str__(self):
+        day_name = self.get_day_display() if self.day is not None else "Every day"
+        return f"{day_name} {self.start_time:%H:%M}-{self.end_time:%H:%M}: {self.orders_per_slot} per slot"
+
+class CartPurge(models.Model):
+    """One run of the abandoned-cart reaper, kept so abandonment can be reported after the carts are gone."""
+    ran_at = models.DateTimeField(default=timezone.now, db_index=True)
+    ttl_hours = models.PositiveIntegerField()
+    archived = models.BooleanField(default=False, help_text="Carts were cancelled and kept instead of deleted.")
+    carts = models.PositiveIntegerField(default=0)
+    ordered_items = models.PositiveIntegerField(default=0)
+    value = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
+
+    class Meta:
+        ordering = ['-ran_at']
+
+    def __str__(self):
+        action = "Archived" if self.archived else "Purged"
+        return f"{action} {self.carts} carts on {self.ran_at:%Y-%m-%d %H:%M}"
+
+class RecommendationSnapshot(models.Model):
+    """
+    A precomputed item co-purchase index (see orders/recommendations.py),
+    built periodically by `manage.py build_recommendations`. `data` is the
+    compressed array form that workers load once and keep in memory.
+    """
+    built_at = models.DateTimeField(default=timezone.now, db_index=True)
+    orders = models.PositiveIntegerField(default=0, help_text="Paid orders mined.")
+    items = models.PositiveIntegerField(default=0)
+    pairs = models.PositiveIntegerField(default=0, help_text="Item pairs kept.")
+    data = models.BinaryField()
+
+    class Meta:
+        ordering = ['-built_at']
+
+    def __str__(self):
+        return f"Recommendations from {self.orders} orders ({self.built_at:%Y-%m-%d %H:%M})"
+
+class ComboSuggestion(models.Model):
+    """
+    An item set often bought together, proposed as a new combo by
+    `manage.py mine_combos` (orders/itemsets.py). Each run replaces the
+    previous suggestions.
+    """
+    item_ids = models.JSONField(default=list)
+    size = models.PositiveSmallIntegerField()
+    orders = models.PositiveIntegerField(help_text="Paid orders containing all of these items.")
+    support = models.FloatField(help_text="Share of mined orders containing all of these items.")
+    lift = models.FloatField(help_text="How much more often they are bought together than by chance.")
+    combo_price = models.DecimalField(max_digits=10, decimal_places=2, help_text="Sum of item rates less the combo discount.")
+    projected_revenue = models.DecimalField(max_digits=12, decimal_places=2, help_text="Combo price x orders (per 30 days if a window was mined).")
+    existing_combo = models.ForeignKey(Combo, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    mined_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-projected_revenue', '-lift']
+
+    def __str__(self):
+        return f"{self.size}-item combo, {self.orders} orders, lift {self.lift}"
+
+class ArchivedLine:
+    """An ordered item read back from ArchivedOrder.items, shaped like OrderedItem for templates."""
+
+    class _Named:
+        def __init__(self, pk, name):
+            self.id = pk
+            self.name = name
+
+    def __init__(self, data):
+        self.quantity = data.get('quantity', 0)
+        self.price = Decimal(data.get('price') or '0.00')
+        self.rating = data.get('rating', 0)
+        self.item_id = data.get('item_id')
+        self.combo_id = data.get('combo_id')
+        self.item = self._Named(self.item_id, data.get('name', '')) if self.item_id else None
+        self.combo = self._Named(self.combo_id, data.get('name', '')) if self.combo_id else None
+
+    @property
+    def unit_price(self):
+        return self.price / self.quantity if self.quantity else Decimal('0.00')
+
+    @property
+    def name(self):
+        if self.combo:
+            return f"🎁 {self.combo.name} (Combo)"
+        return self.item.name if self.item else "Unknown Item"
+
+
+class ArchivedOrder(models.Model):
+    """
+    Compact copy of a delivered order moved out of the live tables (see
+    orders/archive.py). Keeps the original order id, and the ordered items
+    are stored inline as JSON instead of OrderedItem rows. Exposes the same
+    attributes the history/report templates read from Order.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='archived_orders')
+    status = models.CharField(max_length=10, choices=ORDER_STATUSES, default=STATUS_DELIVERED)
+    placed_at = models.DateTimeField(db_index=True)
+    paid_at = models.DateTimeField(null=True, blank=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+    subtotal = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+    delivery_fee = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+    grand_total = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+    used_loyalty_points = models.BooleanField(default=False)
+    payment_reference = models.CharField(max_length=100, null=True, blank=True)
+    hidden_from_customer = models.BooleanField(default=False)
+    # [{'item_id', 'combo_id', 'name', 'quantity', 'price', 'rating'}, ...]
+    items = models.JSONField(default=list)
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    is_archived = True
+    finalized = True
+
+    class Meta:
+        ordering = ['-placed_at']
+        indexes = [
+            models.Index(fields=['customer', 'placed_at'], name='archorder_customer_placed_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived order #{self.id} ({self.placed_at:%Y-%m-%d})"
+
+    @property
+    def delivered(self):
+        return self.status == STATUS_DELIVERED
+
+    @property
+    def date_placed(self):
+        return timezone.localtime(self.placed_at).date()
+
+    @property
+    def time_placed(self):
+        return timezone.localtime(self.placed_at).time()
+
+    @property
+    def lines(self):
+        return [ArchivedLine(data) for data in self.items]
@@ -1,5 +1,6 @@
 # orders/notifications.py 
 
+import httpx
 import requests
 from django.conf import settings
 from django.urls import reverse
@@ -12,8 +13,9 @@ DEBUG_BOT_TOKEN = '7379387313:AAGp9hvaLtsYotoNZpNNddUrjatCWHiDJho'
 # 🛑 CRITICAL: REPLACE THE PLACEHOLDER BELOW WITH YOUR ACTUAL NEGATIVE CHAT ID
 DEBUG_CHAT_ID = '-1003010450709' # Example: Use your actual negative number
 
-def send_telegram_alert(order):
-    
+def _telegram_request(order):
+    """Build the (api_url, payload) for a new-order alert, or None if BASE_URL is missing."""
+
     # 🚨 DEBUG: USE HARD-CODED VALUES TO BYPASS SETTINGS.PY
     bot_token = DEBUG_BOT_TOKEN
     chat_id = DEBUG_CHAT_ID
@@ -22,7 +24,7 @@ def send_telegram_alert(order):
     base_url = getattr(settings, 'BASE_URL', None)
     if not base_url:
         print("ERROR: BASE_URL is not set in settings.py.")
-        return
+        return None
         
     # Build the URL for the staff to view the order details
     try:
@@ -55,6 +57,15 @@ def send_telegram_alert(order):
         'disable_web_page_preview': True
     }
 
+    return api_url, payload
+
+
+def send_telegram_alert(order):
+    request = _telegram_request(order)
+    if request is None:
+        return
+    api_url, payload = request
+
     try:
         response = requests.post(api_url, data=payload, timeout=5)
         response.raise_for_status() 
@@ -63,4 +74,26 @@ def send_telegram_alert(order):
         print(f"Telegram API Response Text: {response.text}")
         
     except requests.exceptions.RequestException as e:
-        print(f"CRITICAL REQUESTS ERROR: {e}")
\ No newline at end of file
+        print(f"CRITICAL REQUESTS ERROR: {e}")
+
+
+async def asend_telegram_alert(order):
+    """
+    Async version of send_telegram_alert for async views. `order.customer`
+    must already be loaded (select_related), as the ORM can't be used here.
+    """
+    request = _telegram_request(order)
+    if request is None:
+        return
+    api_url, payload = request
+
+    try:
+        async with httpx.AsyncClient(timeout=5) as client:
+            response = await client.post(api_url, data=payload)
+        response.raise_for_status()
+
+        print(f"Telegram API Response Status: {response.status_code}")
+        print(f"Telegram API Response Text: {response.text}")
+
+    except httpx.HTTPError as e:
+        print(f"CRITICAL REQUESTS ERROR: {e}")
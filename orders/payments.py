@@ -0,0 +1,41 @@
+# orders/payments.py
+
+import httpx
+from django.conf import settings
+
+PAYSTACK_API = 'https://api.paystack.co'
+
+# Seconds to wait on Paystack before giving up on a request
+PAYSTACK_TIMEOUT = getattr(settings, 'PAYSTACK_TIMEOUT', 15)
+
+
+class PaymentError(Exception):
+    """Raised when an order cannot be sent for payment; the message is shown to the customer."""
+
+
+async def _paystack(method, path, **kwargs):
+    """
+    Call the Paystack API without blocking the worker. Returns the decoded
+    JSON body ({'status', 'message', 'data'}), like paystackapi does.
+    """
+    headers = {'Authorization': f'Bearer {settings.PAYSTACK_SECRET_KEY}'}
+    async with httpx.AsyncClient(base_url=PAYSTACK_API, headers=headers, timeout=PAYSTACK_TIMEOUT) as client:
+        response = await client.request(method, path, **kwargs)
+    try:
+        return response.json()
+    except ValueError:
+        return {'status': False, 'message': f'Paystack returned HTTP {response.status_code}'}
+
+
+async def initialize_transaction(email, amount, reference, callback_url):
+    """Start a Paystack transaction; `amount` is in kobo."""
+    return await _paystack('POST', '/transaction/initialize', json={
+        'email': email,
+        'amount': amount,
+        'reference': reference,
+        'callback_url': callback_url,
+    })
+
+
+async def verify_transaction(reference):
+    return await _paystack('GET', f'/transaction/verify/{reference}')
@@ -0,0 +1,94 @@
+# orders/pwa.py
+
+import hashlib
+import json
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.templatetags.static import static
+
+# Static files the service worker keeps offline (paths relative to STATIC_URL)
+PRECACHE_ASSETS = getattr(settings, 'PWA_PRECACHE_ASSETS', [
+    'orders/bundles/site.css',
+    'orders/js/vendor/jquery-1.11.2.min.js',
+    'orders/bundles/site.js',
+    'orders/img/icons/apple-touch-icon.png',
+    'orders/img/icons/icon-192x192.png',
+])
+
+
+def _expand_bundles(assets):
+    """Swap STATIC_BUNDLES entries for their sources until collectstatic has built them."""
+    bundles = getattr(settings, 'STATIC_BUNDLES', {})
+    expanded = []
+    for path in assets:
+        if path in bundles and (settings.DEBUG or not staticfiles_storage.exists(path)):
+            expanded.extend(bundles[path])
+        else:
+            expanded.append(path)
+    return expanded
+
+
+def _file_digest(path):
+    """md5 of a static file's contents, or None if it cannot be found."""
+    found = finders.find(path)
+    if not found:
+        try:
+            found = staticfiles_storage.path(path)
+        except NotImplementedError:
+            return None
+    try:
+        with open(found, 'rb') as fh:
+            return hashlib.md5(fh.read()).hexdigest()[:12]
+    except OSError:
+        return None
+
+
+def _build_manifest(assets):
+    entries = []
+    for path in _expand_bundles(assets):
+        try:
+            url = static(path)
+        except ValueError:
+            # Not in the collectstatic manifest (ManifestStaticFilesStorage)
+            print(f"WARNING: precache asset '{path}' is missing from the static manifest")
+            continue
+
+        plain_url = settings.STATIC_URL.rstrip('/') + '/' + path
+        if not plain_url.startswith('/'):
+            plain_url = '/' + plain_url
+        if url != plain_url:
+            # Hashed filename: the URL itself changes with the contents
+            revision = None
+        else:
+            revision = _file_digest(path)
+            if revision is None:
+                print(f"WARNING: precache asset '{path}' not found, skipping")
+                continue
+        entries.append({'url': url, 'revision': revision})
+
+    version = hashlib.md5(json.dumps(entries, sort_keys=True).encode()).hexdigest()[:12]
+    return entries, version
+
+
+@lru_cache(maxsize=1)
+def _cached_manifest(assets):
+    return _build_manifest(assets)
+
+
+def precache_manifest():
+    """
+    Return (entries, version) for the service worker.
+
+    Each entry is {'url', 'revision'}: the URL comes from the static files
+    storage, so with hashed filenames (collectstatic manifest) it already
+    changes whenever the file does and revision is None; otherwise the
+    revision is a digest of the file. `version` changes whenever any entry
+    does, which is what makes browsers pick up a new service worker.
+    Computed once per process outside DEBUG.
+    """
+    if settings.DEBUG:
+        return _build_manifest(tuple(PRECACHE_ASSETS))
+    return _cached_manifest(tuple(PRECACHE_ASSETS))
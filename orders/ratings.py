@@ -0,0 +1,117 @@
+# orders/ratings.py
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Sum, Value
+from django.db.models.functions import Cast
+
+from items.models import Item
+from orders.models import ArchivedOrder, OrderedItem, STATUS_DELIVERED
+
+RATING_CHOICES = range(1, 6)
+
+# Rating shown for items nobody has rated yet (Item.rating default)
+UNRATED = Decimal('5.0')
+
+
+class RatingError(ValueError):
+    """Raised when a rating submission cannot be accepted; the message is shown to the customer."""
+
+
+def _average(total, count):
+    """SQL for (rating_total + total) / (rating_count + count) as a 1-decimal rating."""
+    return Cast(
+        (F('rating_total') + total) * Value(1.0) / (F('rating_count') + count),
+        output_field=DecimalField(max_digits=2, decimal_places=1),
+    )
+
+
+def rate_lines(order, ratings):
+    """
+    Store the customer's ratings for a delivered order's item lines.
+
+    `ratings` maps OrderedItem id -> 1..5. Lines can be re-rated; only the
+    difference is applied. Each affected Item gets one UPDATE that moves
+    rating_total/rating_count and recomputes rating from them with F()
+    expressions, so concurrent submissions don't overwrite each other and
+    Item.save() (image processing) is never called. Returns the number of
+    lines rated.
+    """
+    if order.status != STATUS_DELIVERED:
+        raise RatingError('Only delivered orders can be rated.')
+
+    for line_id, rating in ratings.items():
+        if rating not in RATING_CHOICES:
+            raise RatingError(f'Ratings must be between {RATING_CHOICES[0]} and {RATING_CHOICES[-1]} stars.')
+
+    with transaction.atomic():
+        lines = list(
+            OrderedItem.objects.select_for_update()
+            .filter(order=order, id__in=ratings.keys(), item__isnull=False)
+            .only('id', 'item_id', 'rating')
+        )
+
+        changes = defaultdict(lambda: [0, 0])  # item_id -> [total delta, count delta]
+        changed_lines = []
+        for line in lines:
+            new = ratings[line.id]
+            if new == line.rating:
+                continue
+            changes[line.item_id][0] += new - line.rating
+            # A line rated for the first time adds to the count; re-rating doesn't
+            changes[line.item_id][1] += 0 if line.rating else 1
+            line.rating = new
+            changed_lines.append(line)
+
+        if not changed_lines:
+            return 0
+
+        OrderedItem.objects.bulk_update(changed_lines, ['rating'])
+        for item_id, (total, count) in changes.items():
+            # rating is listed first: MySQL applies SET clauses left to right,
+            # so it must read the old rating_total/rating_count
+            Item.objects.filter(id=item_id).update(
+                rating=_average(total, count),
+                rating_total=F('rating_total') + total,
+                rating_count=F('rating_count') + count,
+            )
+
+    return len(changed_lines)
+
+
+def recompute_item_ratings():
+    """
+    Rebuild every Item's rating_total, rating_count and rating from the
+    stored line ratings (live and archived orders), to repair drift.
+    Items without ratings go back to UNRATED. Returns the number of items
+    whose stored values changed.
+    """
+    totals = defaultdict(lambda: [0, 0])
+    for item_id, total, count in (
+        OrderedItem.objects.filter(item__isnull=False, rating__gt=0)
+        .values_list('item_id')
+        .annotate(total=Sum('rating'), count=Count('id'))
+        .values_list('item_id', 'total', 'count')
+        .order_by()
+    ):
+        totals[item_id][0] += total
+        totals[item_id][1] += count
+
+    for lines in ArchivedOrder.objects.values_list('items', flat=True).iterator():
+        for line in lines or ():
+            if line.get('item_id') and line.get('rating'):
+                totals[line['item_id']][0] += line['rating']
+                totals[line['item_id']][1] += 1
+
+    changed = []
+    for item in Item.objects.only('id', 'rating', 'rating_total', 'rating_count'):
+        total, count = totals.get(item.id, (0, 0))
+        rating = (Decimal(total) / count).quantize(Decimal('0.1')) if count else UNRATED
+        if (item.rating_total, item.rating_count, item.rating) != (total, count, rating):
+            item.rating_total, item.rating_count, item.rating = total, count, rating
+            changed.append(item)
+
+    Item.objects.bulk_update(changed, ['rating', 'rating_total', 'rating_count'], batch_size=500)
+    return len(changed)
@@ -0,0 +1,222 @@
+# orders/recommendations.py
+
+import heapq
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+from collections import Counter, defaultdict
+from itertools import combinations
+
+from django.conf import settings
+
+from items.models import Item, Combo
+from orders.models import ArchivedOrder, OrderedItem, RecommendationSnapshot, FINALIZED_STATUSES
+
+# Neighbours kept per item; the tail of rarely co-bought items is dropped
+MAX_NEIGHBOURS = 30
+
+# Workers look for a newer snapshot at most this often
+REFRESH_SECONDS = getattr(settings, 'RECOMMENDATION_REFRESH_SECONDS', 300)
+
+# Snapshot layout: item count, pair count, then the arrays below as raw
+# little-endian bytes, all zlib-compressed
+_HEADER = struct.Struct('<II')
+_ARRAYS = (('ids', 'q'), ('freq', 'i'), ('indptr', 'i'), ('neighbours', 'i'), ('counts', 'i'))
+
+_index = None
+_checked_at = 0
+_index_lock = threading.Lock()
+
+
+def paid_baskets(since=None):
+    """
+    Yield the set of item ids bought together in each paid order, live and
+    archived. Combo lines are left out; they are bundles already. Pass
+    `since` (a datetime) to only look at recent orders.
+    """
+    lines = OrderedItem.objects.filter(order__status__in=FINALIZED_STATUSES, item__isnull=False)
+    if since is not None:
+        lines = lines.filter(order__placed_at__gte=since)
+
+    basket, current = set(), None
+    for order_id, item_id in lines.order_by('order_id').values_list('order_id', 'item_id').iterator(chunk_size=2000):
+        if order_id != current and basket:
+            yield basket
+            basket = set()
+        current = order_id
+        basket.add(item_id)
+    if basket:
+        yield basket
+
+    archived = ArchivedOrder.objects.all()
+    if since is not None:
+        archived = archived.filter(placed_at__gte=since)
+    for lines in archived.values_list('items', flat=True).iterator(chunk_size=500):
+        basket = {line['item_id'] for line in lines or () if line.get('item_id')}
+        if basket:
+            yield basket
+
+
+class CoPurchaseIndex:
+    """
+    Item-to-item co-occurrence counts in CSR form: the neighbours of the
+    item at position i are neighbours[indptr[i]:indptr[i + 1]] (positions
+    into ids), bought together counts[...] times. freq[i] is the number of
+    orders containing that item.
+    """
+
+    def __init__(self, ids, freq, indptr, neighbours, counts):
+        self.ids, self.freq, self.indptr = ids, freq, indptr
+        self.neighbours, self.counts = neighbours, counts
+        self._pos = {item_id: i for i, item_id in enumerate(ids)}
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def empty(cls):
+        return cls(array('q'), array('i'), array('i', [0]), array('i'), array('i'))
+
+    @classmethod
+    def from_baskets(cls, baskets, max_neighbours=MAX_NEIGHBOURS):
+        """Returns (index, number of baskets counted)."""
+        freq, pairs, orders = Counter(), Counter(), 0
+        for basket in baskets:
+            orders += 1
+            freq.update(basket)
+            pairs.update(combinations(sorted(basket), 2))
+
+        adjacent = defaultdict(list)
+        for (a, b), count in pairs.items():
+            adjacent[a].append((count, b))
+            adjacent[b].append((count, a))
+
+        ids = array('q', sorted(freq))
+        pos = {item_id: i for i, item_id in enumerate(ids)}
+        indptr, neighbours, counts = array('i', [0]), array('i'), array('i')
+        for item_id in ids:
+            for count, other in heapq.nlargest(max_neighbours, adjacent.get(item_id, ())):
+                neighbours.append(pos[other])
+                counts.append(count)
+            indptr.append(len(neighbours))
+
+        return cls(ids, array('i', (freq[item_id] for item_id in ids)), indptr, neighbours, counts), orders
+
+    def to_bytes(self):
+        parts = [_HEADER.pack(len(self.ids), len(self.neighbours))]
+        for name, typecode in _ARRAYS:
+            values = getattr(self, name)
+            if sys.byteorder != 'little':
+                values = array(typecode, values)
+                values.byteswap()
+            parts.append(values.tobytes())
+        return zlib.compress(b''.join(parts))
+
+    @classmethod
+    def from_bytes(cls, data):
+        raw = zlib.decompress(data)
+        n_items, n_pairs = _HEADER.unpack_from(raw)
+        lengths = {'ids': n_items, 'freq': n_items, 'indptr': n_items + 1, 'neighbours': n_pairs, 'counts': n_pairs}
+        offset, arrays = _HEADER.size, {}
+        for name, typecode in _ARRAYS:
+            values = array(typecode)
+            size = lengths[name] * values.itemsize
+            values.frombytes(raw[offset:offset + size])
+            if sys.byteorder != 'little':
+                values.byteswap()
+            arrays[name] = values
+            offset += size
+        return cls(**arrays)
+
+    def scores(self, item_ids):
+        """
+        {item_id: score} for items bought with any of `item_ids`. The score
+        sums, over the given items, the share of their orders that also had
+        the candidate (count / freq), so items that go with several things
+        in the cart rank first. The given items themselves are left out.
+        """
+        scores = defaultdict(float)
+        for item_id in item_ids:
+            i = self._pos.get(item_id)
+            if i is None:
+                continue
+            base = self.freq[i]
+            for j in range(self.indptr[i], self.indptr[i + 1]):
+                scores[self.ids[self.neighbours[j]]] += self.counts[j] / base
+        for item_id in item_ids:
+            scores.pop(item_id, None)
+        return scores
+
+    def related(self, item_ids, limit=4):
+        """The `limit` item ids most often bought with `item_ids`, best first."""
+        scores = self.scores(item_ids)
+        return heapq.nlargest(limit, scores, key=scores.get)
+
+
+def build_snapshot(since=None, keep=2):
+    """Mine paid orders into a new RecommendationSnapshot, keeping the newest `keep`."""
+    index, orders = CoPurchaseIndex.from_baskets(paid_baskets(since))
+    snapshot = RecommendationSnapshot.objects.create(
+        orders=orders, items=len(index), pairs=len(index.neighbours), data=index.to_bytes(),
+    )
+    stale = RecommendationSnapshot.objects.values_list('id', flat=True)[keep:]
+    RecommendationSnapshot.objects.filter(id__in=list(stale)).delete()
+    return snapshot
+
+
+def get_index():
+    """
+    This worker's CoPurchaseIndex, loaded from the newest snapshot. The
+    database is asked for a newer one at most every REFRESH_SECONDS.
+    """
+    global _index, _checked_at
+    if _index is not None and time.monotonic() - _checked_at < REFRESH_SECONDS:
+        return _index[1]
+
+    with _index_lock:
+        if _index is None or time.monotonic() - _checked_at >= REFRESH_SECONDS:
+            latest = RecommendationSnapshot.objects.values_list('id', flat=True).first()
+            if _index is None or _index[0] != latest:
+                data = RecommendationSnapshot.objects.values_list('data', flat=True).get(id=latest) if latest else None
+                _index = (latest, CoPurchaseIndex.from_bytes(bytes(data)) if data else CoPurchaseIndex.empty())
+            _checked_at = time.monotonic()
+    return _index[1]
+
+
+def recommend_items(cart_item_ids, limit=4):
+    """In-stock Items frequently bought with the cart's items, best first (one query)."""
+    if not cart_item_ids:
+        return []
+    candidates = get_index().related(cart_item_ids, limit=limit * 3)
+    in_stock = Item.objects.in_bulk(candidates) if candidates else {}
+    return [in_stock[pk] for pk in candidates if pk in in_stock and in_stock[pk].stock > 0][:limit]
+
+
+def best_combo(cart_item_ids):
+    """
+    The in-stock Combo that best fits the cart: the one sharing the most
+    items with it, then the one whose other items are most often bought
+    with the cart. None if no combo relates to the cart at all.
+    """
+    if not cart_item_ids:
+        return None
+    cart = set(cart_item_ids)
+    scores = get_index().scores(cart)
+
+    best, best_key = None, None
+    for combo in Combo.objects.select_related('item1', 'item2', 'item3', 'item4', 'item5'):
+        components = {item.id for item in (combo.item1, combo.item2, combo.item3, combo.item4, combo.item5) if item}
+        if not components or combo.effective_stock <= 0:
+            continue
+        shared = len(components & cart)
+        rest = components - cart
+        affinity = sum(scores.get(item_id, 0) for item_id in rest) / len(rest) if rest else 0
+        if not shared and not affinity:
+            continue
+        key = (shared + affinity, shared)
+        if best_key is None or key > best_key:
+            best, best_key = combo, key
+    return best
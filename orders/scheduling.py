@@ -0,0 +1,253 @@
+# orders/scheduling.py
+
+import threading
+import time as time_module
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db.models import Count
+from django.utils import timezone
+
+SLOT_MINUTES = getattr(settings, 'KITCHEN_SLOT_MINUTES', 30)
+DEFAULT_SLOT_CAPACITY = getattr(settings, 'KITCHEN_SLOT_CAPACITY', 6)
+PREORDER_LEAD_HOURS = getattr(settings, 'PREORDER_LEAD_HOURS', 24)
+
+# Category code (items.constants.CATEGORIES) for Pre-Order Cakes, which
+# must be booked into a slot at least PREORDER_LEAD_HOURS ahead
+PREORDER_CATEGORY = 'PC'
+
+# Opening window used for days without an OperatingHours entry
+DEFAULT_HOURS = (time(8, 0), time(21, 0))
+
+# How far ahead to look for a free slot / offer slots for booking
+SEARCH_DAYS = 7
+
+# Each worker re-reads the slot counts at least this often so orders
+# finalized/delivered by other workers are picked up.
+INDEX_REFRESH_SECONDS = 60
+
+
+def slot_start(dt):
+    """Round an aware datetime down to the start of its kitchen slot."""
+    dt = timezone.localtime(dt)
+    minutes = (dt.hour * 60 + dt.minute) // SLOT_MINUTES * SLOT_MINUTES
+    return dt.replace(hour=minutes // 60, minute=minutes % 60, second=0, microsecond=0)
+
+
+def slot_end(start):
+    return start + timedelta(minutes=SLOT_MINUTES)
+
+
+class SlotIndex:
+    """
+    In-memory count of undelivered, finalized orders per kitchen slot,
+    plus the capacity rules and operating hours needed to find free slots.
+
+    Built with one grouped query and then kept up to date by book()/release()
+    from finalize_order/close_order, so estimating a delivery time does not
+    count orders on every request.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+        self._capacity_rules = []
+        self._weekly_hours = {}
+        self._closed_dates = set()
+        self._loaded_at = None
+
+    def _ensure_loaded(self):
+        if self._loaded_at is None or time_module.monotonic() - self._loaded_at > INDEX_REFRESH_SECONDS:
+            self.rebuild()
+
+    def rebuild(self):
+        from orders.models import ACTIVE_STATUSES, Order, KitchenCapacity, OperatingHours
+
+        counts = {}
+        rows = (
+            Order.objects.filter(status__in=ACTIVE_STATUSES)
+            .values_list('delivery_slot')
+            .annotate(n=Count('id'))
+            .order_by()
+        )
+        for slot, n in rows:
+            # Orders finalized before slots existed count against the current slot
+            key = slot_start(slot) if slot else None
+            counts[key] = counts.get(key, 0) + n
+
+        capacity_rules = list(KitchenCapacity.objects.values_list('day', 'start_time', 'end_time', 'orders_per_slot'))
+
+        weekly_hours, closed_dates = {}, set()
+        for day, closed_date, is_open, opening, closing in OperatingHours.objects.values_list(
+            'day', 'closed_date', 'is_open', 'opening_time', 'closing_time'
+        ):
+            if closed_date:
+                if not is_open:
+                    closed_dates.add(closed_date)
+            elif day is not None:
+                weekly_hours[day] = (opening, closing) if is_open and opening and closing else None
+
+        with self._lock:
+            self._counts = counts
+            self._capacity_rules = capacity_rules
+            self._weekly_hours = weekly_hours
+            self._closed_dates = closed_dates
+            self._loaded_at = time_module.monotonic()
+
+    def invalidate(self):
+        self._loaded_at = None
+
+    def book(self, slot):
+        self._ensure_loaded()
+        key = slot_start(slot) if slot else None
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0) + 1
+
+    def release(self, slot):
+        self._ensure_loaded()
+        key = slot_start(slot) if slot else None
+        with self._lock:
+            if self._counts.get(key, 0) > 0:
+                self._counts[key] -= 1
+
+    def load(self, slot):
+        self._ensure_loaded()
+        return self._counts.get(slot_start(slot), 0)
+
+    def queue_depth(self):
+        """Undelivered finalized orders, across all slots."""
+        self._ensure_loaded()
+        return sum(self._counts.values())
+
+    def capacity(self, slot):
+        """Orders per slot for the given slot start (day-specific rules win)."""
+        self._ensure_loaded()
+        local = timezone.localtime(slot)
+        best = None
+        for day, start, end, per_slot in self._capacity_rules:
+            if start <= local.time() < end and (day is None or day == local.weekday()):
+                if best is None or (day is not None and best[0] is None):
+                    best = (day, per_slot)
+        return best[1] if best else DEFAULT_SLOT_CAPACITY
+
+    def is_open(self, slot):
+        self._ensure_loaded()
+        local = timezone.localtime(slot)
+        if local.date() in self._closed_dates:
+            return False
+        hours = self._weekly_hours.get(local.weekday(), DEFAULT_HOURS)
+        if hours is None:
+            return False
+        opening, closing = hours
+        return opening <= local.time() and slot_end(local).time() <= closing
+
+    def remaining(self, slot):
+        return self.capacity(slot) - self.load(slot)
+
+    def overdue(self, now):
+        """Undelivered orders whose slot has already started (or has no slot)."""
+        self._ensure_loaded()
+        current = slot_start(now)
+        return sum(n for slot, n in self._counts.items() if slot is None or slot < current)
+
+
+slot_index = SlotIndex()
+
+
+def iter_slots(after, days=SEARCH_DAYS):
+    """Yield open slot starts from the slot containing `after` onwards."""
+    slot = slot_start(after)
+    limit = slot + timedelta(days=days)
+    while slot < limit:
+        if slot_index.is_open(slot):
+            yield slot
+        slot = slot_end(slot)
+
+
+def next_available_slot(after=None):
+    """
+    First open slot at or after `after` with spare capacity. Orders already
+    waiting in past slots (the backlog) use up capacity from the earliest
+    slots first, so a long queue pushes the estimate later.
+    """
+    after = after or timezone.now()
+    backlog = slot_index.overdue(after)
+    fallback = None
+    for slot in iter_slots(after):
+        fallback = fallback or slot
+        spare = slot_index.remaining(slot)
+        if backlog >= spare:
+            backlog -= max(spare, 0)
+            continue
+        return slot
+    # Fully booked for the whole search window: fall back to the first open slot
+    return fallback or slot_start(after)
+
+
+def booked_count(slot):
+    """Undelivered finalized orders in `slot`, counted in the database."""
+    from orders.models import ACTIVE_STATUSES, Order
+
+    start = slot_start(slot)
+    return Order.objects.filter(
+        status__in=ACTIVE_STATUSES, delivery_slot__gte=start, delivery_slot__lt=slot_end(start),
+    ).count()
+
+
+def claim_slot(slot):
+    """
+    First open slot from `slot` onwards that still has room, going by the
+    database rather than this worker's index (which can lag other workers
+    by up to INDEX_REFRESH_SECONDS). Called with the order locked while its
+    payment is booked, so a slot chosen at checkout is not overbooked.
+    """
+    for candidate in iter_slots(slot):
+        if booked_count(candidate) < slot_index.capacity(candidate):
+            return candidate
+    return slot_start(slot)
+
+
+def earliest_slot_for(order, now=None, requires_preorder=None):
+    """
+    Earliest time an order may be booked for (pre-order cakes need lead
+    time). Pass `requires_preorder` if the caller already knows it.
+    """
+    now = now or timezone.now()
+    if requires_preorder is None:
+        requires_preorder = order_requires_preorder(order)
+    if requires_preorder:
+        return now + timedelta(hours=PREORDER_LEAD_HOURS)
+    return now
+
+
+def available_slots(order, now=None, limit=48, requires_preorder=None):
+    """Bookable (slot_start, remaining) pairs for an order's checkout page."""
+    slots = []
+    for slot in iter_slots(earliest_slot_for(order, now, requires_preorder=requires_preorder)):
+        spare = slot_index.remaining(slot)
+        if spare > 0:
+            slots.append((slot, spare))
+            if len(slots) >= limit:
+                break
+    return slots
+
+
+def order_requires_preorder(order):
+    """True if the order contains any Pre-Order Cakes."""
+    return order.ordereditem_set.filter(item__category=PREORDER_CATEGORY).exists()
+
+
+def estimate_ready_time(now=None):
+    """Expected delivery time for an ASAP order placed now."""
+    return slot_end(next_available_slot(now))
+
+
+def parse_slot(value):
+    """Parse a slot submitted by the booking form (ISO format)."""
+    try:
+        dt = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    if timezone.is_naive(dt):
+        dt = timezone.make_aware(dt)
+    return slot_start(dt)
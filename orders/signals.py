@@ -0,0 +1,24 @@
+from django.core.signals import request_finished
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import DeliveryLocation, Order
+from .concurrency import close_request_thread_connections
+from .fragments import invalidate_order_fragments
+from .zones import invalidate_zones
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def order_changed_handler(sender, instance, **kwargs):
+    # Cached detail HTML shows status/totals; bulk status changes in
+    # orders/lifecycle.py invalidate explicitly since they skip save()
+    invalidate_order_fragments(instance.pk)
+
+@receiver(post_save, sender=DeliveryLocation)
+@receiver(post_delete, sender=DeliveryLocation)
+def delivery_location_changed_handler(sender, instance, **kwargs):
+    # Zone fees are read from each process's registry (orders/zones.py)
+    invalidate_zones()
+
+# Per-request threads under ASGI don't get to reuse a connection (orders/concurrency.py)
+request_finished.connect(close_request_thread_connections)
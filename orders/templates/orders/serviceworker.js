@@ -0,0 +1,284 @@
+// Juiceville service worker, rendered by orders.views.service_worker.
+// VERSION and PRECACHE come from the static files manifest, so this file
+// only changes (and browsers only re-install it) when an asset changes.
+const VERSION = '{{ version }}';
+const PRECACHE = {{ precache_json }};
+
+const STATIC_CACHE = 'juiceville-static';    // precached assets, kept across versions
+const RUNTIME_CACHE = 'juiceville-runtime';  // other static files, cached on first use
+const DATA_CACHE = 'juiceville-data';        // menu data (stale-while-revalidate)
+const PAGES_CACHE = 'juiceville-pages';      // cart/payment pages (network-first)
+const KNOWN_CACHES = [STATIC_CACHE, RUNTIME_CACHE, DATA_CACHE, PAGES_CACHE];
+
+// Revision of each precached URL, stored alongside the assets
+const REVISIONS_KEY = '/__precache-revisions__';
+
+const STATIC_URL = '{{ static_url }}';
+const OFFLINE_URL = '{{ offline_url }}';
+const MENU_API_URL = '{{ menu_api_url }}';
+const CART_API_URL = '{{ cart_api_url }}';
+
+// Cart and payment pages: always try the network so prices, stock and
+// payment state are current; fall back to the last copy when offline
+const NETWORK_FIRST = [
+    /^\/orders\/create-order\/$/,
+    /^\/orders\/checkout\/$/,
+    /^\/orders\/\d+\/add-items\/$/,
+    /^\/orders\/\d+\/summary\/$/,
+    /^\/orders\/\d+\/initiate-payment\/$/,
+    /^\/orders\/payment\/\d+\/$/,
+    new RegExp('^' + CART_API_URL + '$'),
+];
+
+// Cart additions made offline wait here until the connection is back
+const SYNC_TAG = 'cart-sync';
+const QUEUE_DB = 'juiceville-sync';
+const QUEUE_STORE = 'cart-queue';
+
+
+// --- Install: precache only what changed -------------------------------
+
+self.addEventListener('install', function(event) {
+    event.waitUntil(precache().then(() => self.skipWaiting()));
+});
+
+async function precache() {
+    const cache = await caches.open(STATIC_CACHE);
+    const stored = await cache.match(REVISIONS_KEY);
+    const revisions = stored ? await stored.json() : {};
+
+    const changed = [];
+    for (const entry of PRECACHE) {
+        const cached = await cache.match(entry.url);
+        // Hashed URLs (revision null) never change contents; others are
+        // re-fetched when their digest differs from the stored one
+        if (!cached || (entry.revision && revisions[entry.url] !== entry.revision)) {
+            changed.push(entry);
+        }
+    }
+
+    await Promise.all(changed.map(async function(entry) {
+        const response = await fetch(entry.url, {cache: 'no-cache'});
+        if (response.ok) {
+            await cache.put(entry.url, response);
+        }
+    }));
+
+    const newRevisions = {};
+    PRECACHE.forEach(entry => { newRevisions[entry.url] = entry.revision; });
+    await cache.put(REVISIONS_KEY, new Response(JSON.stringify(newRevisions), {
+        headers: {'Content-Type': 'application/json'}
+    }));
+
+    const pages = await caches.open(PAGES_CACHE);
+    await pages.add(new Request(OFFLINE_URL, {cache: 'no-cache'}));
+    console.log('Service Worker ' + VERSION + ' precached ' + changed.length + ' changed asset(s).');
+}
+
+
+// --- Activate: drop assets that are no longer in the manifest ----------
+
+self.addEventListener('activate', function(event) {
+    event.waitUntil(cleanUp().then(() => self.clients.claim()));
+});
+
+async function cleanUp() {
+    // Caches from older service workers (e.g. juiceville-v1.3)
+    const names = await caches.keys();
+    await Promise.all(names.filter(name => !KNOWN_CACHES.includes(name)).map(name => caches.delete(name)));
+
+    const current = new Set(PRECACHE.map(entry => new URL(entry.url, self.location.origin).href));
+    current.add(new URL(REVISIONS_KEY, self.location.origin).href);
+
+    const cache = await caches.open(STATIC_CACHE);
+    const requests = await cache.keys();
+    await Promise.all(requests.filter(request => !current.has(request.url)).map(request => cache.delete(request)));
+}
+
+
+// --- Fetch ------------------------------------------------------------
+
+self.addEventListener('fetch', function(event) {
+    const request = event.request;
+    const url = new URL(request.url);
+    if (url.origin !== self.location.origin) {
+        return;
+    }
+
+    if (request.method === 'POST' && url.pathname === CART_API_URL) {
+        event.respondWith(cartPost(request));
+        return;
+    }
+    if (request.method !== 'GET') {
+        return;
+    }
+
+    if (url.pathname === MENU_API_URL) {
+        event.respondWith(staleWhileRevalidate(event, request, DATA_CACHE));
+    } else if (NETWORK_FIRST.some(pattern => pattern.test(url.pathname))) {
+        event.respondWith(networkFirst(request, PAGES_CACHE));
+    } else if (url.pathname.startsWith(STATIC_URL)) {
+        event.respondWith(cacheFirst(request));
+    } else if (request.mode === 'navigate') {
+        event.respondWith(fetch(request).catch(() => offlineFallback(request)));
+    }
+});
+
+async function staleWhileRevalidate(event, request, cacheName) {
+    const cache = await caches.open(cacheName);
+    const cached = await cache.match(request);
+    const update = fetch(request).then(function(response) {
+        if (response.ok) {
+            cache.put(request, response.clone());
+        }
+        return response;
+    });
+
+    if (cached) {
+        // Answer from the cache now, refresh it in the background
+        event.waitUntil(update.catch(() => {}));
+        return cached;
+    }
+    return update;
+}
+
+async function networkFirst(request, cacheName) {
+    const cache = await caches.open(cacheName);
+    try {
+        const response = await fetch(request);
+        if (response.ok && !response.redirected) {
+            cache.put(request, response.clone());
+        }
+        return response;
+    } catch (error) {
+        return (await cache.match(request)) || offlineFallback(request);
+    }
+}
+
+async function cacheFirst(request) {
+    const cached = await caches.match(request);
+    if (cached) {
+        return cached;
+    }
+    try {
+        const response = await fetch(request);
+        if (response.ok && response.type === 'basic') {
+            const cache = await caches.open(RUNTIME_CACHE);
+            cache.put(request, response.clone());
+        }
+        return response;
+    } catch (error) {
+        return new Response('Network error happened', {
+            status: 408,
+            headers: {'Content-Type': 'text/plain'}
+        });
+    }
+}
+
+async function offlineFallback(request) {
+    if (request.mode === 'navigate') {
+        const offline = await caches.match(OFFLINE_URL);
+        if (offline) {
+            return offline;
+        }
+    }
+    return new Response('Network error happened', {
+        status: 408,
+        headers: {'Content-Type': 'text/plain'}
+    });
+}
+
+
+// --- Offline cart additions (background sync) ---------------------------
+
+async function cartPost(request) {
+    const queued = request.clone();
+    try {
+        return await fetch(request);
+    } catch (error) {
+        await enqueue({
+            url: queued.url,
+            body: await queued.text(),
+            headers: {
+                'Content-Type': queued.headers.get('Content-Type') || 'application/json',
+                'X-CSRFToken': queued.headers.get('X-CSRFToken') || '',
+            },
+            queuedAt: Date.now(),
+        });
+        if (self.registration.sync) {
+            await self.registration.sync.register(SYNC_TAG);
+        }
+        return new Response(JSON.stringify({queued: true}), {
+            status: 202,
+            headers: {'Content-Type': 'application/json'}
+        });
+    }
+}
+
+self.addEventListener('sync', function(event) {
+    if (event.tag === SYNC_TAG) {
+        event.waitUntil(replayCart());
+    }
+});
+
+// Browsers without Background Sync: pages post {type: 'replay-cart'} when back online
+self.addEventListener('message', function(event) {
+    if (event.data && event.data.type === 'replay-cart') {
+        event.waitUntil(replayCart());
+    }
+});
+
+async function replayCart() {
+    const entries = await queued();
+    let sent = 0;
+    for (const entry of entries) {
+        // A network error throws here, leaving the rest queued for the next sync
+        const response = await fetch(entry.url, {
+            method: 'POST',
+            body: entry.body,
+            headers: entry.headers,
+            credentials: 'same-origin',
+        });
+        // 4xx (stale CSRF token, item gone, ...) will not succeed on retry either
+        if (response.ok || response.status < 500) {
+            await dequeue(entry.id);
+            sent += response.ok ? 1 : 0;
+        }
+    }
+
+    if (entries.length) {
+        const clients = await self.clients.matchAll({type: 'window'});
+        clients.forEach(client => client.postMessage({type: 'cart-synced', sent: sent}));
+    }
+}
+
+function openQueue() {
+    return new Promise(function(resolve, reject) {
+        const open = indexedDB.open(QUEUE_DB, 1);
+        open.onupgradeneeded = () => open.result.createObjectStore(QUEUE_STORE, {keyPath: 'id', autoIncrement: true});
+        open.onsuccess = () => resolve(open.result);
+        open.onerror = () => reject(open.error);
+    });
+}
+
+async function withStore(mode, callback) {
+    const db = await openQueue();
+    return new Promise(function(resolve, reject) {
+        const tx = db.transaction(QUEUE_STORE, mode);
+        const result = callback(tx.objectStore(QUEUE_STORE));
+        tx.oncomplete = () => resolve(result.result);
+        tx.onerror = () => reject(tx.error);
+    });
+}
+
+function enqueue(entry) {
+    return withStore('readwrite', store => store.add(entry));
+}
+
+function dequeue(id) {
+    return withStore('readwrite', store => store.delete(id));
+}
+
+function queued() {
+    return withStore('readonly', store => store.getAll());
+}
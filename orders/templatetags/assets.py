@@ -0,0 +1,40 @@
+# orders/templatetags/assets.py
+
+from django import template
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.templatetags.static import static
+from django.utils.html import format_html_join
+
+register = template.Library()
+
+# bundle name -> whether collectstatic has built it, checked once per process
+_built = {}
+
+
+def _bundle_built(name):
+    if name not in _built:
+        try:
+            _built[name] = staticfiles_storage.exists(name)
+        except NotImplementedError:
+            _built[name] = False
+    return _built[name]
+
+
+@register.simple_tag
+def static_bundle(name):
+    """
+    <link>/<script> tags for a STATIC_BUNDLES entry.
+
+    Uses the single minified, hashed bundle once collectstatic has built it
+    (and DEBUG is off); otherwise falls back to one tag per source file so
+    edits show up straight away in development.
+
+        {% static_bundle 'orders/bundles/site.css' %}
+    """
+    sources = settings.STATIC_BUNDLES[name]
+    urls = [static(name)] if not settings.DEBUG and _bundle_built(name) else [static(s) for s in sources]
+
+    if name.endswith('.css'):
+        return format_html_join('\n', '<link rel="stylesheet" href="{}">', ((url,) for url in urls))
+    return format_html_join('\n', '<script src="{}"></script>', ((url,) for url in urls))
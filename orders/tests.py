@@ -1,3 +1,390 @@
-from django.test import TestCase
+import gzip
+import json
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+import brotli
+
+from django.contrib.auth.models import User
+from django.core.paginator import Paginator
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from items.inventory import record_sales
+from juiceville.cache import current_version
+from items.models import Item, StockMovement
+from orders.archive import customer_history
+from orders.carts import purge_stale_carts
+from orders.dispatch import CANCELLED, DELIVERED, transition_orders
+from orders.eta import EtaModel
+from orders.fragments import _version_key, order_detail_fragment
+from orders.lifecycle import InvalidTransition, bulk_transition, transition
+from orders.models import (
+    ArchivedOrder, DeliveryLocation, Order, OrderedItem,
+    STATUS_CANCELLED, STATUS_DELIVERED, STATUS_PAID, STATUS_PENDING, STATUS_PREPARED,
+)
+from orders.scheduling import slot_end, slot_index, slot_start
+from orders.utils import calculate_expected_delivery_time
+from orders.views import _complete_paid_order
+from orders.zones import customer_zone_fee, reprice_open_orders, zone_fee
+from users.loyalty import settle_order
+from users.models import Customer, LoyaltyEntry
+
+
+def make_customer(username='customer'):
+    # bulk_create skips Customer.save()/Item.save(), which need an image on disk
+    customer, = Customer.objects.bulk_create([Customer(user=User.objects.create_user(username, password='pw'))])
+    return customer
+
+
+def make_items(*names, stock=10, category='FD'):
+    return Item.objects.bulk_create([
+        Item(name=name, category=category, description=name, rate=Decimal('500.00'), stock=stock) for name in names
+    ])
+
+
+def make_order(customer, *lines, **fields):
+    """A cart holding (item, quantity) lines."""
+    order = Order.objects.create(customer=customer, **fields)
+    OrderedItem.objects.bulk_create([
+        OrderedItem(order=order, item=item, quantity=quantity, price=item.rate * quantity) for item, quantity in lines
+    ])
+    return order
+
+
+class ExpectedDeliveryTests(TestCase):
+
+    def test_later_slot_keeps_its_date(self):
+        customer = make_customer()
+        item, = make_items('Chicken Pie')
+        slot = slot_start(timezone.now() + timedelta(days=1))
+        order = make_order(customer, (item, 1), delivery_slot=slot)
+
+        calculate_expected_delivery_time(order)
+        order.save()
+        order.refresh_from_db()
+        self.assertGreater(order.expected_delivery_time, slot)
+        self.assertEqual(timezone.localtime(order.expected_delivery_time).date(), timezone.localtime(slot).date())
+
+
+class LifecycleTests(TestCase):
+
+    def setUp(self):
+        self.order = make_order(make_customer())
+
+    def test_transition_stamps_status_and_time(self):
+        transition(self.order, STATUS_PAID)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, STATUS_PAID)
+        self.assertTrue(self.order.finalized)
+        self.assertIsNotNone(self.order.paid_at)
+
+        transition(self.order, STATUS_PREPARED)
+        transition(self.order, STATUS_DELIVERED)
+        self.order.refresh_from_db()
+        self.assertTrue(self.order.delivered)
+        self.assertIsNotNone(self.order.delivered_at)
+
+    def test_invalid_transitions(self):
+        with self.assertRaisesMessage(InvalidTransition, 'Order has not been paid'):
+            transition(self.order, STATUS_DELIVERED)
+        transition(self.order, STATUS_CANCELLED)
+        with self.assertRaisesMessage(InvalidTransition, 'Order was cancelled'):
+            transition(self.order, STATUS_PAID)
+
+
+class EtaModelTests(TestCase):
+
+    def test_slot_wait_is_not_learned(self):
+        customer = make_customer()
+        now = timezone.now()
+        paid = now - timedelta(days=1)
+        slot = slot_start(paid + timedelta(hours=2))
+        # Paid two hours ahead of the slot, delivered 30 minutes into it
+        Order.objects.bulk_create([
+            Order(customer=customer, status=STATUS_DELIVERED, paid_at=paid, delivery_slot=slot,
+                  delivered_at=slot + timedelta(minutes=30))
+            for _ in range(5)
+        ])
+        model = EtaModel()
+        self.assertEqual(model.service_minutes(), 30)
+        self.assertEqual(model.estimate(delivery_slot=slot_start(now), now=now), now + timedelta(minutes=30))
+
+
+class FinalizeTests(TestCase):
+
+    def setUp(self):
+        self.customer = make_customer()
+        self.pie, = make_items('Chicken Pie', stock=10)
+        self.order = make_order(self.customer, (self.pie, 2), payment_reference='ref')
+        # _complete_paid_order is handed the order finalize_order loaded
+        self.order = Order.objects.select_related('customer').get(pk=self.order.pk)
+
+    def test_finalize_books_once(self):
+        booked, notes = _complete_paid_order(self.order)
+        self.assertTrue(notes)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, STATUS_PAID)
+        # finalize_order alerts the kitchen with the order as booked
+        self.assertEqual((booked.status, booked.grand_total), (STATUS_PAID, self.order.grand_total))
+        self.assertIsNotNone(self.order.expected_delivery_time)
+
+        # A repeated payment callback must not take stock or points again
+        with self.assertRaises(InvalidTransition):
+            _complete_paid_order(self.order)
+        self.pie.refresh_from_db()
+        self.assertEqual(self.pie.stock, 8)
+        self.assertEqual(StockMovement.objects.filter(order=self.order, kind=StockMovement.SALE).count(), 1)
+        self.assertEqual(LoyaltyEntry.objects.filter(order=self.order).count(), 1)
+
+    def test_full_slot_moves_to_the_next_one(self):
+        slot = slot_start(timezone.localtime() + timedelta(days=1)).replace(hour=12, minute=0)
+        slot_index.invalidate()
+        Order.objects.bulk_create([
+            Order(customer=self.customer, status=STATUS_PAID, delivery_slot=slot)
+            for _ in range(slot_index.capacity(slot))
+        ])
+        Order.objects.filter(pk=self.order.pk).update(delivery_slot=slot)
+        self.order.refresh_from_db()
+
+        _, notes = _complete_paid_order(self.order)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.delivery_slot, slot_end(slot))
+        self.assertIn('filled up', notes[-1])
+
+    def test_empty_cart_is_not_finalized(self):
+        empty = Order.objects.select_related('customer').get(pk=make_order(self.customer).pk)
+        self.assertIsNone(_complete_paid_order(empty)[1])
+        empty.refresh_from_db()
+        self.assertEqual(empty.status, STATUS_PENDING)
+
+
+class DispatchTests(TestCase):
+
+    def setUp(self):
+        self.customer = make_customer()
+        self.pie, = make_items('Chicken Pie', stock=10)
+
+    def paid_order(self, quantity=3):
+        order = make_order(self.customer, (self.pie, quantity), subtotal=Decimal('3000.00'))
+        record_sales(order, order.ordereditem_set.all())
+        settle_order(order, order.subtotal)
+        transition(order, STATUS_PAID)
+        return order
+
+    def test_cancelling_a_paid_order_restores_stock_and_points(self):
+        order = self.paid_order()
+        self.pie.refresh_from_db()
+        self.assertEqual(self.pie.stock, 7)
+
+        result, = transition_orders([order.id], CANCELLED)
+        self.assertTrue(result['ok'])
+        self.pie.refresh_from_db()
+        self.assertEqual(self.pie.stock, 10)
+        self.assertEqual(StockMovement.objects.get(order=order, kind=StockMovement.RETURN).change, 3)
+        order.refresh_from_db()
+        self.assertFalse(order.finalized)
+
+        self.customer.refresh_from_db()
+        self.assertEqual((self.customer.loyalty_points, self.customer.orders_count), (0, 0))
+        self.assertEqual(LoyaltyEntry.objects.get(order=order, kind=LoyaltyEntry.REVERSAL).points, -3)
+
+        # A second cancel is refused and changes nothing
+        result, = transition_orders([order.id], CANCELLED)
+        self.assertFalse(result['ok'])
+        self.pie.refresh_from_db()
+        self.assertEqual(self.pie.stock, 10)
+
+    def test_cancelling_a_cart_touches_no_stock(self):
+        order = make_order(self.customer, (self.pie, 2))
+        result, = transition_orders([order.id], CANCELLED)
+        self.assertTrue(result['ok'])
+        self.assertEqual(Order.objects.get(id=order.id).status, STATUS_CANCELLED)
+        self.assertFalse(StockMovement.objects.exists())
+
+    def test_unpaid_order_cannot_be_delivered(self):
+        order = make_order(self.customer, (self.pie, 1))
+        result, missing = transition_orders([order.id, 0], DELIVERED)
+        self.assertEqual(result['error'], 'Order has not been paid')
+        self.assertEqual(missing['error'], 'Order not found')
+        self.assertEqual(Order.objects.get(id=order.id).status, STATUS_PENDING)
+
+
+class CartPurgeTests(TestCase):
+
+    def setUp(self):
+        customer = make_customer()
+        pie, = make_items('Chicken Pie')
+        self.stale = make_order(customer, (pie, 2), subtotal=Decimal('1000.00'))
+        self.paying = make_order(customer, (pie, 1), payment_reference='ref')
+        self.fresh = make_order(customer, (pie, 1))
+        # updated_at is auto_now, so age the carts with an UPDATE
+        Order.objects.filter(id__in=[self.stale.id, self.paying.id]).update(
+            updated_at=timezone.now() - timedelta(hours=72)
+        )
+
+    def test_purge_deletes_stale_carts_only(self):
+        purge = purge_stale_carts(ttl_hours=48, batch_size=1)
+        self.assertEqual((purge.carts, purge.ordered_items, purge.value), (1, 1, Decimal('1000.00')))
+        self.assertEqual(set(Order.objects.values_list('id', flat=True)), {self.paying.id, self.fresh.id})
+        self.assertFalse(OrderedItem.objects.filter(order_id=self.stale.id).exists())
+
+    def test_abandoned_payments_wait_longer(self):
+        Order.objects.filter(id=self.paying.id).update(updated_at=timezone.now() - timedelta(days=8))
+        purge = purge_stale_carts(ttl_hours=48)
+        self.assertEqual(purge.carts, 2)
+        self.assertEqual(list(Order.objects.values_list('id', flat=True)), [self.fresh.id])
+
+    def test_archive_cancels_instead(self):
+        purge_stale_carts(ttl_hours=48, archive=True)
+        self.stale.refresh_from_db()
+        self.assertEqual(self.stale.status, STATUS_CANCELLED)
+        self.assertIsNone(self.stale.paid_at)
+        self.assertTrue(OrderedItem.objects.filter(order_id=self.stale.id).exists())
+
+
+class CustomerHistoryTests(TestCase):
+
+    def test_pages_live_and_archived_orders_together(self):
+        customer = make_customer()
+        pie, = make_items('Chicken Pie')
+        now = timezone.now()
+        live = [
+            make_order(customer, (pie, 1), status=STATUS_PAID, placed_at=now - timedelta(days=days))
+            for days in (1, 3)
+        ]
+        make_order(customer, (pie, 1))
+        ArchivedOrder.objects.bulk_create([
+            ArchivedOrder(id=1000 + days, customer=customer, placed_at=now - timedelta(days=days))
+            for days in (2, 4)
+        ])
+
+        history = customer_history(customer)
+        self.assertEqual(history.count(), 4)
+        first, second = Paginator(history, 2).page(1), Paginator(history, 2).page(2)
+        self.assertEqual([order.id for order in first], [live[0].id, 1002])
+        self.assertEqual([order.id for order in second], [live[1].id, 1004])
+        self.assertEqual([line.item_id for line in first[0].lines], [pie.id])
+
+
+class OrderFragmentTests(TestCase):
+
+    def setUp(self):
+        customer = make_customer()
+        pie, = make_items('Chicken Pie')
+        self.order = make_order(customer, (pie, 1))
+        transition(self.order, STATUS_PAID)
+        self.request = RequestFactory().get('/')
+        self.request.user = User.objects.create_user('kitchen', is_staff=True)
+
+    def test_status_change_rerenders_after_commit(self):
+        owner_id, html = order_detail_fragment(self.request, self.order.id)
+        self.assertIn('Chicken Pie', html)
+        version = current_version(_version_key(self.order.id))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk_transition([self.order.id], STATUS_PREPARED)
+            # Nothing is invalidated before the commit
+            self.assertEqual(current_version(_version_key(self.order.id)), version)
+        self.assertNotEqual(current_version(_version_key(self.order.id)), version)
+
+
+class ApiETagTests(TestCase):
+
+    def setUp(self):
+        self.pie, = make_items('Chicken Pie', stock=1)
+
+    def get(self, url, **headers):
+        return self.client.get(url, secure=True, **headers)
+
+    def test_menu_revalidates_with_etag(self):
+        url = reverse('api:menu')
+        first = self.get(url)
+        self.assertEqual(first.status_code, 200)
+        etag = first['ETag']
+        self.assertIn('public', first['Cache-Control'])
+
+        unchanged = self.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(unchanged.status_code, 304)
+        self.assertEqual(unchanged.content, b'')
+
+        Item.objects.filter(id=self.pie.id).update(stock=0)
+        changed = self.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], etag)
+
+    def test_brotli_first_then_gzip(self):
+        make_items(*(f'Meat Pie {n}' for n in range(5)))
+        url = reverse('api:menu')
+        plain = self.get(url).content
+
+        response = self.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(json.loads(brotli.decompress(response.content)), json.loads(plain))
+        self.assertEqual(
+            self.get(url, HTTP_ACCEPT_ENCODING='br', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304
+        )
+
+        response = self.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(response.content)), json.loads(plain))
+
+    def test_fields_trim_records(self):
+        items = self.get(reverse('api:menu') + '?fields=id,name').json()['items']
+        self.assertEqual(items, [{'id': self.pie.id, 'name': 'Chicken Pie'}])
+
+    def test_order_status_is_private(self):
+        order = make_order(make_customer())
+        url = reverse('api:order_status', args=[order.id])
+        self.assertEqual(self.get(url).status_code, 401)
+
+        self.client.login(username='customer', password='pw')
+        response = self.get(url)
+        self.assertEqual(response.json()['order']['status'], STATUS_PENDING)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertEqual(self.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        # Another customer's order is not found
+        make_customer('other')
+        self.client.login(username='other', password='pw')
+        self.assertEqual(self.get(url).status_code, 404)
+
+
+class DeliveryZoneTests(TestCase):
+
+    def setUp(self):
+        self.zone = DeliveryLocation.objects.create(name='Ikeja', fee=Decimal('1000.00'))
+        self.customer = make_customer()
+        Customer.objects.filter(id=self.customer.id).update(delivery_location=self.zone)
+
+    def test_fee_change_reaches_the_registry_after_commit(self):
+        self.assertEqual(zone_fee(self.zone.id), Decimal('1000.00'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.zone.fee = Decimal('1500.00')
+            self.zone.save()
+        self.assertEqual(zone_fee(self.zone.id), Decimal('1500.00'))
+        self.assertEqual(zone_fee(None), Decimal('0.00'))
+
+    def test_reprice_open_orders_only(self):
+        pie, = make_items('Chicken Pie')
+        cart = make_order(self.customer, (pie, 2), subtotal=Decimal('1000.00'), delivery_fee=Decimal('1000.00'))
+        discounted = make_order(
+            self.customer, subtotal=Decimal('1000.00'), delivery_fee=Decimal('1000.00'), used_loyalty_points=True,
+        )
+        paid = make_order(self.customer, (pie, 1), subtotal=Decimal('500.00'), delivery_fee=Decimal('1000.00'))
+        transition(paid, STATUS_PAID)
+
+        DeliveryLocation.objects.filter(id=self.zone.id).update(fee=Decimal('2000.00'))
+        self.assertEqual(customer_zone_fee(self.customer.id), Decimal('2000.00'))
+        self.assertEqual(reprice_open_orders(self.zone.id), 2)
+
+        cart.refresh_from_db()
+        self.assertEqual((cart.delivery_fee, cart.grand_total), (Decimal('2000.00'), Decimal('3000.00')))
+        discounted.refresh_from_db()
+        self.assertEqual(discounted.grand_total, Decimal('500.00'))
+        paid.refresh_from_db()
+        self.assertEqual(paid.delivery_fee, Decimal('1000.00'))
+        # Already repriced carts are left alone
+        self.assertEqual(reprice_open_orders(self.zone.id), 0)
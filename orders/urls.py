@@ -20,12 +20,16 @@ urlpatterns = [
     path('past-transactions/', past_transactions, name="past_transactions"),
     path('generate-sales/', generate_sales, name="generate_sales"),
     path('notify-offers/', notify_offers, name="notify_offers"),
+    path('<int:pk>/book-slot/', book_delivery_slot, name="book_delivery_slot"),
     path('<int:pk>/apply-loyalty-points/', apply_loyalty_points, name="apply_loyalty_points"),
     path('<int:pk>/initiate-payment/', initiate_payment, name="initiate_payment"),
     path('close-order/<int:pk>/', close_order, name='close_order'),
+    path('dispatch/', dispatch_orders, name='dispatch_orders'),
     path('update-stock/', update_stock, name='update_stock'),
+    path('update-stock/sheet/', stock_sheet, name='stock_sheet'),
     path('my-orders/', customer_past_transactions, name='customer_past_transactions'),
     path('my-orders/<int:order_id>/', transaction_detail, name='transaction_detail'),
+    path('<int:pk>/rate/', rate_order, name='rate_order'),
     path('generate_sales/', generate_sales, name='generate_sales'),
     path('staff-order/<int:order_id>/', staff_order_details, name='staff_order_details'),
 
@@ -5,13 +5,10 @@ import random
 import smtplib
 from email.message import EmailMessage
 from django.conf import settings
-
-def calculate_item_ratings(ordered_items):
-    for oitem in ordered_items:
-        total_rating = oitem.item.rating * oitem.item.times_rated
-        oitem.item.times_rated += 1
-        oitem.item.rating = (total_rating + oitem.rating) / oitem.item.times_rated
-        oitem.item.save()
+from django.utils import timezone
+from items.inventory import record_sales
+from orders.eta import estimate_order_eta
+from orders.scheduling import next_available_slot
 
 def calculate_grand_total_and_update_stocks(order, ordered_items):
     grand_total = Decimal('0.00')
@@ -19,52 +16,24 @@ def calculate_grand_total_and_update_stocks(order, ordered_items):
     for oitem in ordered_items:
         # 1. Update Grand Total (This is always safe)
         grand_total += oitem.price
-        
-        # 2. Deduct Stock (MUST check which type of object is being ordered)
-        
-        # A. Handle Individual Items
-        if oitem.item:
-            # Check if oitem.item exists before accessing its stock
-            item = oitem.item
-            if item.stock >= oitem.quantity:
-                item.stock -= oitem.quantity
-                item.save()
-            else:
-                # Optional: Handle critical low stock error
-                print(f"ERROR: Insufficient stock for individual item {item.name}")
-
-        # B. Handle Combos (Deduct stock from the Combo's components)
-        elif oitem.combo:
-            combo = oitem.combo
-            quantity = oitem.quantity
-            
-            # Assuming Combo model has item1, item2, item3, etc. fields
-            component_fields = [combo.item1, combo.item2, combo.item3, combo.item4, combo.item5]
-
-            # Iterate through all non-null component items of the combo
-            for component_item in component_fields:
-                if component_item:
-                    deduct_qty = quantity
-                    
-                    if component_item.stock >= deduct_qty:
-                        component_item.stock -= deduct_qty
-                        component_item.save()
-                    else:
-                        # Optional: Handle critical low stock error
-                        print(f"ERROR: Insufficient stock for component {component_item.name} in combo {combo.name}")
-        
-        # C. Handle Corrupt OrderedItem (Neither item nor combo is set)
-        else:
-            print(f"WARNING: OrderedItem {oitem.id} has no item or combo association and was skipped for stock deduction.")
-            continue
 
+    # 2. Deduct Stock (items directly, combos via their component items).
+    # Written with conditional F() updates and logged in the inventory ledger.
+    record_sales(order, ordered_items)
 
+    # Saved by the caller together with the rest of the finalization
     order.grand_total = grand_total
-    order.save()
 
 def calculate_expected_delivery_time(order):
-    order.expected_delivery_time = datetime.now() + timedelta(minutes=45)
-    order.save()
+    # Orders without a booked slot go into the next slot with kitchen capacity
+    now = timezone.now()
+    if order.delivery_slot is None:
+        order.delivery_slot = next_available_slot(now)
+    # Estimated from the assigned slot, not a fresh look at the queue
+    eta = estimate_order_eta(order, now=now)
+    # Saved by the caller together with the rest of the finalization
+    order.expected_delivery_time = eta
+    return eta
 
 def mail_customers(customers, offer_text):
     try:
@@ -1,10 +1,13 @@
 # orders/views.py
 
 import json
+import logging
 import uuid
 import xlwt
 import csv
+import httpx
 
+from django.db import transaction
 from django.db.models import Count, Sum
 from datetime import date, datetime, timedelta
 from calendar import monthrange
@@ -13,29 +16,84 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.views.decorators.http import require_POST
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.admin.views.decorators import staff_member_required
-from django.http import HttpResponse, JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse
 from django.contrib import messages
 from django.urls import reverse
 from django.core.paginator import Paginator
 from django.db.models import Sum
 from django.template.loader import render_to_string
 from django.utils import timezone
+from django.utils.safestring import mark_safe
+from django.templatetags.static import static
 
 from decimal import Decimal
 from django.conf import settings
-from paystackapi.paystack import Paystack
 
-from users.models import Customer, Staff
-from items.models import Item, Combo
-from orders.models import Order, OrderedItem, DeliveryLocation, OperatingHours
+from users.models import Customer, LoyaltyEntry, Staff
+from users.loyalty import settle_order as settle_loyalty
+from users.customers import get_customer
+from users.roles import designation_required, get_staff_role
+from items.models import Item, Combo, StockMovement
+from items.inventory import (
+    StockSheetError, apply_stock_counts, parse_stock_csv, parse_stock_post, stockout_projections,
+    write_stock_sheet,
+)
+from orders.models import (
+    Order, OrderedItem, DeliveryLocation, OperatingHours, ArchivedOrder,
+    ACTIVE_STATUSES, FINALIZED_STATUSES, ORDER_STATUSES, STATUS_DELIVERED, STATUS_PAID, STATUS_PENDING,
+)
 from items.constants import CATEGORIES
 from orders.forms import OfferForm
-from .notifications import send_telegram_alert
+from orders.itemsets import combo_suggestions
+from orders.archive import (
+    archived_customer_totals, archived_status_rollup, customer_history, merge_rollups,
+)
+from orders.concurrency import db_sync_to_async
+from orders.carts import abandonment_stats, add_to_cart, get_or_create_cart, open_cart
+from orders.details import load_order_detail
+from orders.fragments import order_detail_fragment
+from orders.dispatch import (
+    ACTIONS as DISPATCH_ACTIONS, DELIVERED, DISPATCH_DESIGNATIONS, MAX_BATCH_SIZE, transition_orders,
+)
+from orders.eta import estimate_order_eta
+from orders.forecasting import next_day_forecast
+from orders.payments import PaymentError, initialize_transaction, verify_transaction
+from orders.pwa import precache_manifest
+from orders.ratings import RATING_CHOICES, RatingError, rate_lines
+from orders.recommendations import best_combo, recommend_items
+from orders.lifecycle import InvalidTransition, local_day_bounds, local_month_bounds, transition, transition_error
+from orders.zones import customer_zone_fee, zone_fee
+from orders.scheduling import (
+    available_slots, claim_slot, earliest_slot_for, next_available_slot, order_requires_preorder, parse_slot,
+    slot_index, slot_start,
+)
+from .notifications import asend_telegram_alert
 from orders.utils import *
 
+logger = logging.getLogger(__name__)
+
 def index(request):
     return render(request, 'orders/index.html')
 
+def service_worker(request):
+    """
+    The PWA service worker, generated from the static files manifest so
+    its precache list points at the current (hashed) asset URLs.
+    Replaces django-pwa's copy of the file at /serviceworker.js.
+    """
+    precache, version = precache_manifest()
+    response = render(request, 'orders/serviceworker.js', {
+        'version': version,
+        'precache_json': mark_safe(json.dumps(precache)),
+        'static_url': static(''),
+        'offline_url': reverse('offline'),
+        'menu_api_url': reverse('api:menu'),
+        'cart_api_url': reverse('api:cart'),
+    }, content_type='application/javascript')
+    # Browsers must check for a new worker on every visit
+    response['Cache-Control'] = 'no-cache'
+    return response
+
 def test_menu(request):
     ck_items = []
     ps_items = []
@@ -75,18 +133,18 @@ def test_menu(request):
 
     return render(request, 'orders/menu-1.html', context)
 
-def is_managing_director(user):
-    """Check if user is Managing Director"""
-    if not user.is_authenticated:
-        return False
-    # Check if superuser or in Managing Director group or has MG designation
-    return (user.is_superuser or 
-            user.groups.filter(name='Managing Director').exists() or
-            (hasattr(user, 'staff') and user.staff.designation in ['MD', 'MG']))
+# Superuser, 'Managing Director' group or MD/MG designation
+managing_director_required = designation_required(
+    'MD', 'MG',
+    groups=['Managing Director'],
+    allow_superuser=True,
+)
 
 @login_required
 def create_order(request):
-    customer = get_object_or_404(Customer, user=request.user)
+    customer = get_customer(request)
+    if customer is None:
+        raise Http404('Customer profile not found')
     
     # Setup datetime variables
     now = datetime.now()
@@ -139,18 +197,15 @@ def create_order(request):
             return redirect('index')
                     
     # 3. NEW ENFORCEMENT LOGIC: Check for profile completion (Mandatory)
-    if not customer.name or not customer.address or not customer.phone or not customer.delivery_location:
+    if not customer.name or not customer.address or not customer.phone or not customer.delivery_location_id:
         messages.error(request, 'Please complete your profile details (Name, Phone, Address, and Delivery Region) before placing an order.')
         return redirect('customer_profile')
     
     # CRITICAL FIX: Fetch the specific delivery fee from the customer's chosen location
-    delivery_fee = customer.delivery_location.fee if customer.delivery_location else Decimal('0.00')
+    delivery_fee = zone_fee(customer.delivery_location_id)
     
-    # 4. Create the Order
-    order = Order.objects.create(
-        customer=customer,
-        delivery_fee=delivery_fee 
-    )
+    # 4. Reuse the customer's open cart, or create the Order
+    order, created = get_or_create_cart(customer, delivery_fee)
     
     return redirect('orders:add_items', pk=order.id)
 
@@ -158,83 +213,39 @@ def create_order(request):
 def add_items(request, pk):
     order = get_object_or_404(Order, pk=pk)
     
-    try:
-        customer = request.user.customer
-        if customer.delivery_location:
-            delivery_fee = customer.delivery_location.fee
-        else:
-            delivery_fee = Decimal('0.00')
-    except Exception:
-        delivery_fee = Decimal('0.00')
+    customer = get_customer(request)
+    delivery_fee = zone_fee(customer.delivery_location_id) if customer is not None else Decimal('0.00')
+    if customer is not None and order.customer_id == customer.id:
+        # Reuse the request's customer for the ETA/fee lookups below
+        order.customer = customer
 
     if request.method == "POST":
         print("POST request received - Processing items and combos")
         
         data = request.POST 
-        items = Item.objects.all()
-        combos = Combo.objects.all()
-        items_added_count = 0 
-        combos_added_count = 0 
-
-        # PROCESS INDIVIDUAL ITEMS
-        for item in items:
-            item_quantity_list = data.getlist(str(item.id))
-            item_quantity_str = item_quantity_list[0] if item_quantity_list else '0'
-            item_quantity = 0
-            
-            if item_quantity_str:
-                try:
-                    item_quantity = int(item_quantity_str)
-                except ValueError:
-                    continue 
-
-            if item_quantity > 0:
-                ordered_item, created = OrderedItem.objects.get_or_create(
-                    order=order,
-                    item=item,
-                    combo=None, 
-                    defaults={'quantity': item_quantity}
-                )
-
-                if not created:
-                    ordered_item.quantity += item_quantity
-                    ordered_item.save()
-
-                ordered_item.calculate_price()
-                items_added_count += 1
-                print(f"Added {item_quantity} of {item.name} to order")
-
-        # PROCESS COMBO ITEMS
-        for combo in combos:
-            combo_key = f"combo_{combo.id}"
-            combo_quantity_str = data.get(combo_key, '0') 
-            combo_quantity = 0
-
-            if combo_quantity_str:
-                try:
-                    combo_quantity = int(combo_quantity_str)
-                except ValueError:
-                    continue
-
-            # Only add combos with explicit quantity > 0
-            if combo_quantity > 0:
-                ordered_combo, created = OrderedItem.objects.get_or_create(
-                    order=order,
-                    combo=combo, 
-                    item=None,
-                    defaults={'quantity': combo_quantity}
-                )
-                
-                if not created:
-                    ordered_combo.quantity += combo_quantity
-                    ordered_combo.save()
-                    
-                ordered_combo.calculate_price()
-                combos_added_count += 1 
-                print(f"Added {combo_quantity} of COMBO {combo.name} to order")
+        item_quantities, combo_quantities = {}, {}
 
-        # FORCE RECALCULATION OF ORDER TOTALS
-        order.refresh_totals()
+        # Item fields are named by item id, combo fields combo_<id>
+        for key in data:
+            value = data.getlist(key)[0] if data.getlist(key) else '0'
+            try:
+                quantity = int(value or 0)
+            except ValueError:
+                continue
+            if key.isdigit():
+                item_quantities[int(key)] = quantity
+            elif key.startswith('combo_') and key[6:].isdigit():
+                combo_quantities[int(key[6:])] = quantity
+
+        # One-click add from the cart suggestions: quick_add=<item id> or combo_<id>
+        quick_add = data.get('quick_add', '')
+        if quick_add.isdigit():
+            item_quantities[int(quick_add)] = item_quantities.get(int(quick_add), 0) + 1
+        elif quick_add.startswith('combo_') and quick_add[6:].isdigit():
+            combo_id = int(quick_add[6:])
+            combo_quantities[combo_id] = combo_quantities.get(combo_id, 0) + 1
+
+        items_added_count, combos_added_count = add_to_cart(order, item_quantities, combo_quantities)
         
         # Feedback
         total_added = items_added_count + combos_added_count
@@ -247,11 +258,22 @@ def add_items(request, pk):
     
     # For GET requests, ensure totals are calculated
     order.refresh_totals()
-    ordered_items = OrderedItem.objects.filter(order=order)
+    ordered_items = order.lines
+
+    # Delivery slot booking (required for Pre-Order Cakes)
+    requires_preorder = order_requires_preorder(order)
+
+    # "Frequently bought with" suggestions from the precomputed co-purchase index
+    cart_item_ids = [line.item_id for line in ordered_items if line.item_id]
 
     context = {
         'order': order,
         'ordered_items': ordered_items,
+        'requires_preorder': requires_preorder,
+        'delivery_slots': available_slots(order, requires_preorder=requires_preorder),
+        'estimated_ready': estimate_order_eta(order),
+        'recommended_items': recommend_items(cart_item_ids),
+        'recommended_combo': best_combo(cart_item_ids),
         'available_combos': Combo.objects.all(),
         'ck_items': Item.objects.filter(category='CK', stock__gte=1),
         'ps_items': Item.objects.filter(category='PS', stock__gte=1),
@@ -269,10 +291,40 @@ def add_items(request, pk):
     return render(request, 'orders/menu.html', context)
 
 
+@login_required
+@require_POST
+def book_delivery_slot(request, pk):
+    """Book the kitchen/delivery slot an order should be prepared in"""
+    order = get_object_or_404(Order, pk=pk, customer__user=request.user, status=STATUS_PENDING)
+
+    value = request.POST.get('delivery_slot')
+    if not value:
+        # Empty choice = deliver as soon as possible
+        order.delivery_slot = None
+        order.save(update_fields=['delivery_slot'])
+        messages.success(request, 'Your order will be delivered as soon as possible.')
+        return redirect('orders:add_items', order.id)
+
+    slot = parse_slot(value)
+    if slot is None or slot < slot_start(earliest_slot_for(order)):
+        messages.error(request, 'Please choose a valid delivery time.')
+        return redirect('orders:add_items', order.id)
+
+    if not slot_index.is_open(slot) or slot_index.remaining(slot) <= 0:
+        messages.error(request, 'Sorry, that delivery time is fully booked. Please choose another.')
+        return redirect('orders:add_items', order.id)
+
+    order.delivery_slot = slot
+    order.save(update_fields=['delivery_slot'])
+    messages.success(request, f'Delivery booked for {timezone.localtime(slot).strftime("%a %d %b, %I:%M %p")}.')
+    return redirect('orders:add_items', order.id)
+
 @login_required
 def apply_loyalty_points(request, pk):
     order = get_object_or_404(Order, pk=pk)
-    customer = request.user.customer
+    customer = get_customer(request)
+    if customer is None:
+        raise Http404('Customer profile not found')
 
     if customer.loyalty_points >= 50:
         order.used_loyalty_points = True
@@ -283,71 +335,129 @@ def apply_loyalty_points(request, pk):
     order.save()
     return redirect('orders:add_items', order.id)
 
+def _complete_paid_order(order):
+    """
+    Book a verified payment: loyalty points, stock, ETA and status. Runs on
+    the ORM thread pool; returns (order as booked, messages to show), with
+    None for the messages if the order has no items. The order row is
+    locked for the whole booking, so a repeated callback raises
+    InvalidTransition instead of booking twice.
+    """
+    with transaction.atomic():
+        locked = Order.objects.select_for_update().get(pk=order.pk)
+        if locked.status != STATUS_PENDING:
+            raise InvalidTransition(transition_error(locked.status, STATUS_PAID))
+        locked.customer = order.customer
+        notes = _book_payment(locked)
+    if notes is not None:
+        slot_index.book(locked.delivery_slot)
+    return locked, notes
+
+def _book_payment(order):
+    """The booking itself, on the locked order (see _complete_paid_order)."""
+    ordered_items = order.lines
+    if not len(ordered_items):
+        return None
+
+    notes = []
+    now = timezone.now()
+    order.placed_at = now
+    order.date_placed = timezone.localdate(now)
+    order.time_placed = timezone.localtime(now).time()
+    
+    # Calculate final total with loyalty discount
+    subtotal = sum(item.price for item in ordered_items)
+    delivery_fee = order.delivery_fee
+    
+    # Points are redeemed/earned through the ledger, once per order
+    discount, entry = settle_loyalty(order, subtotal)
+    if entry.kind == LoyaltyEntry.REDEEM:
+        notes.append(f'Loyalty points redeemed for a ₦{discount:,.0f} discount!')
+    else:
+        notes.append(f'You earned {entry.points} loyalty points!')
+
+    order.grand_total = max(subtotal + delivery_fee - discount, Decimal('0.00'))
+
+    # The slot may have filled up since checkout; take the next free one
+    booked = order.delivery_slot
+    order.delivery_slot = claim_slot(booked or next_available_slot(now))
+    if booked is not None and order.delivery_slot != booked:
+        notes.append(
+            'Your delivery time filled up before payment, so your order is now booked for '
+            f'{timezone.localtime(order.delivery_slot).strftime("%a %d %b, %I:%M %p")}.'
+        )
+    
+    # Update stocks, then persist totals, ETA and status in one write
+    calculate_grand_total_and_update_stocks(order, ordered_items)
+    calculate_expected_delivery_time(order)
+    transition(order, STATUS_PAID, now=now, save=False)
+    order.save()
+    return notes
+
 @login_required
-def finalize_order(request, pk):
-    order = get_object_or_404(Order, pk=pk)
-    ordered_items = OrderedItem.objects.filter(order=order)
-    customer = request.user.customer
+async def finalize_order(request, pk):
+    # Paystack and Telegram are awaited on the event loop; ORM work goes to
+    # the bounded thread pool (orders/concurrency.py)
+    order = await db_sync_to_async(get_object_or_404)(Order.objects.select_related('customer'), pk=pk)
+
+    # A refreshed or repeated payment callback
+    if order.status != STATUS_PENDING:
+        return redirect('orders:order_summary', order.id)
 
     if not order.payment_reference:
         messages.error(request, 'Please proceed with payment before finalizing the order.')
         return redirect('orders:add_items', order.id)
 
-    paystack = Paystack(secret_key=settings.PAYSTACK_SECRET_KEY)
-    verification_response = paystack.transaction.verify(order.payment_reference)
-
-    if verification_response['status'] and verification_response['data']['status'] == 'success':
-        if len(ordered_items):
-            order.date_placed = date.today()
-            order.time_placed = datetime.now()
-            
-            # Calculate final total with loyalty discount
-            subtotal = sum(item.price for item in ordered_items)
-            delivery_fee = order.delivery_fee
-            
-            if order.used_loyalty_points and customer.loyalty_points >= 50:
-                discount = Decimal('2500.00')
-                customer.loyalty_points -= 50
-                messages.success(request, 'Loyalty points redeemed for a ₦2500 discount!')
-            else:
-                discount = Decimal('0.00')
-                points_earned = int(subtotal) // 1000
-                customer.loyalty_points += points_earned
-                messages.success(request, f'You earned {points_earned} loyalty points!')
-
-            order.grand_total = max(subtotal + delivery_fee - discount, Decimal('0.00'))
-            customer.save()
-            
-            # Update stocks
-            calculate_grand_total_and_update_stocks(order, ordered_items)
-            calculate_expected_delivery_time(order)
-            order.finalized = True
-            order.save()
-
-            print("ATTEMPTING TO SEND TELEGRAM ALERT NOW (Finalize Order)...")
-            send_telegram_alert(order) 
+    try:
+        verification_response = await verify_transaction(order.payment_reference)
+    except httpx.HTTPError as e:
+        logger.warning("Paystack verification failed for order #%s: %r", order.id, e)
+        verification_response = {}
 
-            messages.success(request, 'Order Cooking!')
+    if verification_response.get('status') and (verification_response.get('data') or {}).get('status') == 'success':
+        try:
+            order, notes = await db_sync_to_async(_complete_paid_order)(order)
+        except InvalidTransition:
+            # Finalized by a concurrent callback while we verified
             return redirect('orders:order_summary', order.id)
-        else:
+        if notes is None:
             return redirect('orders:add_items', order.id)
+        for note in notes:
+            messages.success(request, note)
+
+        print("ATTEMPTING TO SEND TELEGRAM ALERT NOW (Finalize Order)...")
+        await asend_telegram_alert(order)
+
+        messages.success(request, 'Order Cooking!')
+        return redirect('orders:order_summary', order.id)
     else:
         messages.error(request, 'Payment verification failed. Please try again.')
         return redirect('orders:add_items', order.id)
 
-@login_required
-def initiate_payment(request, pk):
+def _prepare_payment(request, pk):
+    """
+    Recalculate an order's total and give it a fresh payment reference.
+    Runs on the ORM thread pool; returns (order, payment data for Paystack)
+    or raises PaymentError.
+    """
     order = get_object_or_404(Order, pk=pk)
-    customer = request.user.customer
+    customer = get_customer(request)
+    if customer is None:
+        raise Http404('Customer profile not found')
 
-    if len(OrderedItem.objects.filter(order=order)) == 0:
-        messages.error(request, 'Cannot initiate payment for an empty order.')
-        return redirect('orders:add_items', order.id)
+    if not order.ordereditem_set.exists():
+        raise PaymentError('Cannot initiate payment for an empty order.')
+
+    # Pre-Order Cakes need a delivery slot booked far enough ahead
+    if order_requires_preorder(order):
+        if order.delivery_slot is None or order.delivery_slot < earliest_slot_for(order, requires_preorder=True) - timedelta(minutes=settings.KITCHEN_SLOT_MINUTES):
+            raise PaymentError(f'Pre-order cakes need at least {settings.PREORDER_LEAD_HOURS} hours notice. Please book a delivery time before paying.')
 
     # Recalculate grand total to ensure accuracy before payment
-    ordered_items = OrderedItem.objects.filter(order=order)
-    subtotal = sum(item.price for item in ordered_items)
-    delivery_fee = order.delivery_fee # Use the delivery fee from the order object
+    subtotal = order.ordereditem_set.aggregate(total=Sum('price'))['total'] or Decimal('0.00')
+    # Charge the zone's current fee, not a worker's cached copy of it
+    order.delivery_fee = customer_zone_fee(order.customer_id)
+    delivery_fee = order.delivery_fee
     discount = Decimal('0.00')
 
     if order.used_loyalty_points and customer.loyalty_points >= 50:
@@ -356,34 +466,38 @@ def initiate_payment(request, pk):
     # FIX: Add delivery_fee to the final_total
     final_total = max(subtotal + delivery_fee - discount, Decimal('0.00'))
     order.grand_total = final_total
-    order.save()
-
-    paystack = Paystack(secret_key=settings.PAYSTACK_SECRET_KEY)
-
-    # Paystack amount is in kobo (100 kobo = 1 Naira)
-    amount_kobo = int(final_total * 100)
 
     # Generate a unique payment reference
-    payment_reference = str(uuid.uuid4())
-
-    order.payment_reference = payment_reference
+    order.payment_reference = str(uuid.uuid4())
     order.save()
 
-    payment_data = {
+    return order, {
         "email": customer.user.email,
-        "amount": amount_kobo,
-        "reference": payment_reference,
-        "callback_url": request.build_absolute_uri(reverse('orders:finalize_order', args=[order.id])),
+        # Paystack amount is in kobo (100 kobo = 1 Naira)
+        "amount": int(final_total * 100),
+        "reference": order.payment_reference,
     }
 
+@login_required
+async def initiate_payment(request, pk):
+    try:
+        order, payment_data = await db_sync_to_async(_prepare_payment)(request, pk)
+    except PaymentError as e:
+        messages.error(request, str(e))
+        return redirect('orders:add_items', pk)
+
+    payment_data["callback_url"] = request.build_absolute_uri(reverse('orders:finalize_order', args=[order.id]))
+
     try:
-        response = paystack.transaction.initialize(**payment_data)
+        response = await initialize_transaction(**payment_data)
         if response.get('status'):
             return redirect(response['data']['authorization_url'])
         else:
             messages.error(request, response.get('message', 'Failed to initiate payment. Please try again.'))
-    except Exception as e:
-        messages.error(request, f'An error occurred: {e}')
+    except (httpx.HTTPError, KeyError) as e:
+        # Paystack unreachable or an unexpected reply; the details are not for customers
+        logger.warning("Paystack initialization failed for order #%s: %r", order.id, e)
+        messages.error(request, 'We could not reach the payment provider. Please try again.')
 
     return redirect('orders:add_items', order.id)
 
@@ -398,11 +512,15 @@ def delete_order(request, pk):
 
 @login_required
 def order_summary(request, pk):
-    order = get_object_or_404(Order, pk=pk)
-    
-    # Force recalculation before displaying
-    order.refresh_totals()
-    ordered_items = OrderedItem.objects.filter(order=order)
+    # Unpaid orders may still change, so recalculate them before displaying
+    pending = Order.objects.filter(pk=pk, status=STATUS_PENDING).first()
+    if pending is not None:
+        pending.refresh_totals()
+
+    order = load_order_detail(pk)
+    if order is None:
+        raise Http404('Order not found')
+    ordered_items = order.lines
 
     # Debug output
     print("=== ORDER SUMMARY DEBUG ===")
@@ -454,38 +572,66 @@ def staff_dashboard(request):
 @login_required
 @staff_member_required
 @require_POST # Ensure only POST requests are processed
+@designation_required('CS', 'KS', 'MG', 'MD', message="You do not have permission to close orders.")
 def close_order(request, pk):
-    # Ensure staff object is retrieved, or use a custom decorator/middleware
-    # for cleaner user profile access if available.
-    staff = get_object_or_404(Staff, user=request.user)
+    # 1. Update order status (delivered_at feeds the delivery ETA model)
+    result = transition_orders([pk], DELIVERED)[0]
     
-    # 1. Check staff permissions
-    if staff.designation in ['CS', 'KS', 'MG', 'MD']:
-        order = get_object_or_404(Order, pk=pk)
-        
-        # 2. Update order status
-        order.delivered = True
-        order.save()
-        
-        # OPTIONAL: Add loyalty points logic here...
-        
-        # 3. Add success message (now visible because we redirect to a full page)
-        messages.success(request, f"Order #{order.pk} has been marked as delivered and closed.")
-        
-        # 4. Redirect to the staff dashboard to refresh the list
-        return redirect('staff_dashboard') 
-        
+    # OPTIONAL: Add loyalty points logic here...
+    
+    # 2. Add message (now visible because we redirect to a full page)
+    if result['ok']:
+        messages.success(request, f"Order #{pk} has been marked as delivered and closed.")
     else:
-        # If permission check fails, add an error message and redirect home or to dashboard
-        messages.error(request, "You do not have permission to close orders.")
-        return redirect('staff_dashboard') 
+        messages.error(request, f"Order #{pk}: {result['error']}")
+    
+    # 3. Redirect to the staff dashboard to refresh the list
+    return redirect('staff_dashboard') 
+
+@login_required
+@staff_member_required
+@require_POST
+def dispatch_orders(request):
+    """
+    Batch status changes for the dispatch desk.
+    Expects JSON {"action": "prepared" | "out_for_delivery" | "delivered" | "cancelled", "order_ids": [...]}
+    and returns the result for each order.
+    """
+    staff = get_staff_role(request)
+    if not staff.has_designation(*DISPATCH_DESIGNATIONS):
+        return JsonResponse({'success': False, 'error': 'You do not have permission to update orders.'}, status=403)
+
+    try:
+        data = json.loads(request.body)
+        action = data.get('action')
+        order_ids = [int(order_id) for order_id in data.get('order_ids', [])]
+    except (ValueError, TypeError, AttributeError):
+        return JsonResponse({'success': False, 'error': 'Invalid request'}, status=400)
+
+    if action not in DISPATCH_ACTIONS:
+        return JsonResponse({'success': False, 'error': 'Invalid action'}, status=400)
+    if not order_ids:
+        return JsonResponse({'success': False, 'error': 'No orders selected'}, status=400)
+    if len(order_ids) > MAX_BATCH_SIZE:
+        return JsonResponse({'success': False, 'error': f'At most {MAX_BATCH_SIZE} orders can be updated at once'}, status=400)
+
+    results = transition_orders(order_ids, action)
+
+    return JsonResponse({
+        'success': True,
+        'action': action,
+        'updated': sum(1 for result in results if result['ok']),
+        'results': results,
+    })
     
 @login_required
 def past_transactions(request):
 
-    customer = get_object_or_404(Customer, user = request.user)
-    # Order by date placed descending to show most recent first
-    orders = Order.objects.filter(customer = customer, finalized = True).order_by('-date_placed') 
+    customer = get_customer(request)
+    if customer is None:
+        raise Http404('Customer profile not found')
+    # Most recent first, including orders moved to the archive
+    orders = customer_history(customer)
 
     # Implement Pagination
     paginator = Paginator(orders, 10) # 10 orders per page
@@ -556,45 +702,22 @@ def customer_past_transactions(request):
     """
     Safe version that handles missing hidden_from_customer column
     """
-    try:
-        customer = request.user.customer
-    except Customer.DoesNotExist:
+    customer = get_customer(request)
+    if customer is None:
         return render(request, 'orders/error.html', {
             'message': 'Customer profile not found. Please contact support.'
         })
     
-    # SAFE APPROACH: Get all orders first, then filter in Python
-    try:
-        # Try database filtering first (if column exists)
-        past_transactions = Order.objects.filter(
-            customer=customer,
-            finalized=True,
-            hidden_from_customer=False
-        ).order_by('-date_placed')
-        
-        # Test if the query works by checking one record
-        if past_transactions.exists():
-            _ = past_transactions.first().hidden_from_customer
-            
-    except (OperationalError, FieldError) as e:
-        # If column doesn't exist, fall back to showing all orders
-        print(f"Column not found, using fallback: {e}")
-        past_transactions = Order.objects.filter(
-            customer=customer,
-            finalized=True
-        ).order_by('-date_placed')
-    
-    # Calculate loyalty points statistics (simplified - no total spent)
-    total_orders = Order.objects.filter(customer=customer, finalized=True).count()
+    # Live and archived orders, newest first
+    past_transactions = customer_history(customer, include_hidden=False)
+    
+    # Loyalty statistics come from the counters kept on Customer
+    total_orders = customer.orders_count
     earned_points = customer.loyalty_points
-    points_used = Order.objects.filter(
-        customer=customer, 
-        finalized=True, 
-        used_loyalty_points=True
-    ).count() * 50
+    points_used = customer.points_redeemed
     
-    # Check if cleanup features are available
-    cleanup_available = hasattr(Order.objects.first(), 'hidden_from_customer') if Order.objects.exists() else False
+    # hidden_from_customer exists on every order now
+    cleanup_available = True
     
     paginator = Paginator(past_transactions, 10)
     page_number = request.GET.get('page')
@@ -615,44 +738,70 @@ def customer_past_transactions(request):
 @login_required
 def transaction_detail(request, order_id):
     try:
-        # If the user is staff, they can view any order
-        if request.user.is_staff:
-            order = Order.objects.get(id=order_id)
-        else:
-            # For non-staff, they must have a customer profile and the order must belong to them
-            customer = request.user.customer
-            order = Order.objects.get(id=order_id, customer=customer)
-    
-    except (Order.DoesNotExist, Customer.DoesNotExist) as e:
-        # Handle the error appropriately
-        if isinstance(e, Order.DoesNotExist):
-            messages.error(request, f"Order #{order_id} does not exist.")
-        else:
-            messages.error(request, "Customer profile not found.")
+        # If the user is staff, they can view any order; customers only their own
+        customer = None if request.user.is_staff else request.user.customer
+    except Customer.DoesNotExist:
+        messages.error(request, "Customer profile not found.")
+        return redirect('orders:customer_past_transactions')
+
+    order = load_order_detail(order_id, customer=customer, include_archived=True)
+    if order is None:
+        messages.error(request, f"Order #{order_id} does not exist.")
         return redirect('orders:customer_past_transactions')
     
-    ordered_items = order.ordereditem_set.all()
+    ordered_items = order.lines
+    viewer = get_customer(request)
     
     context = {
         'order': order,
         'ordered_items': ordered_items,
+        # Customers rate their own delivered orders; archived ones are read-only
+        'can_rate': (
+            viewer is not None and order.customer.id == viewer.id
+            and order.delivered and not order.is_archived
+        ),
+        'rating_choices': RATING_CHOICES,
     }
     return render(request, 'orders/past_transactions.html', context)
 
 
 @login_required
-def checkout(request):
-    user = request.user
-    
+@require_POST
+def rate_order(request, pk):
+    """
+    Save the star ratings (rating_<line id> fields) for a delivered order's items
+    """
+    order = get_object_or_404(Order, pk=pk, customer=get_customer(request))
+
+    ratings = {}
+    for key, value in request.POST.items():
+        line_id = key.removeprefix('rating_')
+        if line_id != key and line_id.isdigit() and value.isdigit():
+            ratings[int(line_id)] = int(value)
+
     try:
-        customer = user.customer
-    except Customer.DoesNotExist:
+        rated = rate_lines(order, ratings)
+    except RatingError as e:
+        messages.error(request, str(e))
+        return redirect('orders:transaction_detail', order_id=order.id)
+
+    if rated:
+        messages.success(request, "Thanks for rating your order!")
+    else:
+        messages.info(request, "Your ratings are unchanged.")
+    return redirect('orders:transaction_detail', order_id=order.id)
+
+
+@login_required
+def checkout(request):
+    customer = get_customer(request)
+    if customer is None:
         messages.error(request, "Your customer profile is incomplete. Please update it.")
         # Ensure 'customer_profile' is the correct URL name
         return redirect('customer_profile') 
 
     # --- CRITICAL ENFORCEMENT CHECK ---
-    if customer.delivery_location is None:
+    if customer.delivery_location_id is None:
         messages.error(request, 
             "🛑 **Action Required:** Please select your **Delivery Region (Fee Zone)** in your profile to calculate the mandatory Delivery Fee."
         )
@@ -662,21 +811,20 @@ def checkout(request):
     # --- IF REGION IS SET, PROCEED ---
 
     # 1. Fetch the correct delivery fee
-    delivery_fee = customer.delivery_location.fee
+    delivery_fee = zone_fee(customer.delivery_location_id)
     
     # 2. Update the current Order object's delivery_fee and grand_total
-    try:
-        current_order = Order.objects.get(customer=customer, finalized=False)
-        current_order.delivery_fee = delivery_fee # Use the fee from the selected region
-        
-        # Recalculate grand_total based on the new delivery fee
-        current_order.grand_total = current_order.subtotal + current_order.delivery_fee
-        current_order.save() 
-        
-    except Order.DoesNotExist:
+    current_order = open_cart(customer)
+    if current_order is None:
         messages.error(request, "No active order found. Please place items in your cart first.")
         return redirect('orders:menu') # Redirect back to the menu
 
+    current_order.delivery_fee = delivery_fee # Use the fee from the selected region
+    
+    # Recalculate grand_total based on the new delivery fee
+    current_order.grand_total = current_order.subtotal + current_order.delivery_fee
+    current_order.save() 
+
     # 3. Proceed to payment initiation or final checkout page
     context = {
         'order': current_order,
@@ -704,46 +852,36 @@ def payment(request, order_id):
     
     return render(request, 'orders/payment.html', context)
 
+# Items projected to run out within this many days are flagged on update_stock
+STOCKOUT_WARNING_DAYS = 2
+
 @staff_member_required
+@designation_required('CS', 'KS', 'MG', 'MD', message='You do not have permission to update stock.')
 def update_stock(request):
-    staff = request.user.staff
-    if staff.designation not in ['CS', 'KS', 'MG', 'MD']:
-        messages.error(request, 'You do not have permission to update stock.')
-        return redirect('staff_dashboard')
+    staff = get_staff_role(request)
 
     if request.method == 'POST':
         print("Updating stock levels...")
-        
-        # Update Individual Items
-        items_updated = 0
-        for item in Item.objects.all():
-            try:
-                stock_key = f'item_{item.id}'
-                new_stock = int(request.POST.get(stock_key, item.stock))
-                if new_stock >= 0 and new_stock != item.stock:
-                    item.stock = new_stock
-                    item.save()
-                    items_updated += 1
-                    print(f"Updated {item.name} stock to {new_stock}")
-            except (ValueError, TypeError) as e:
-                print(f"Error updating {item.name}: {e}")
-                continue
-        
-        # Update Combos
-        combos_updated = 0
-        for combo in Combo.objects.all():
-            try:
-                combo_key = f'combo_{combo.id}'
-                new_stock = int(request.POST.get(combo_key, combo.stock))
-                if new_stock >= 0 and new_stock != combo.stock:
-                    combo.stock = new_stock
-                    combo.save()
-                    combos_updated += 1
-                    print(f"Updated {combo.name} stock to {new_stock}")
-            except (ValueError, TypeError) as e:
-                print(f"Error updating {combo.name}: {e}")
-                continue
-                        
+
+        # CSV upload (end-of-day stocktake) or the on-page form
+        stock_sheet = request.FILES.get('stock_sheet')
+        try:
+            if stock_sheet:
+                item_counts, combo_counts, errors = parse_stock_csv(stock_sheet)
+                kind = StockMovement.STOCKTAKE
+            else:
+                item_counts, combo_counts, errors = parse_stock_post(request.POST)
+                kind = StockMovement.ADJUSTMENT
+        except StockSheetError as e:
+            messages.error(request, str(e))
+            return redirect('orders:update_stock')
+
+        if errors:
+            messages.warning(request, f'{len(errors)} row(s) were skipped: ' + '; '.join(errors[:5]))
+
+        # Diff against stored stock and write all changes in one transaction
+        items_updated, combos_updated = apply_stock_counts(item_counts, combo_counts, user=request.user, kind=kind)
+
         messages.success(request, f'Stock levels updated successfully! {items_updated} items and {combos_updated} combos modified.')
         return redirect('orders:update_stock')
 
@@ -754,24 +892,52 @@ def update_stock(request):
     items_low_stock = items.filter(stock__lt=10).count()
     combos_low_stock = combos.filter(stock__lt=10).count()
 
+    # Days until each item runs out, from the inventory ledger's sales velocity
+    projections = stockout_projections(items)
+    for item in items:
+        item.days_to_stockout = projections.get(item.id)
+    running_out = sorted(
+        (item for item in items if item.days_to_stockout is not None and item.days_to_stockout <= STOCKOUT_WARNING_DAYS),
+        key=lambda item: item.days_to_stockout,
+    )
+
+    # Tomorrow's expected sales; ?prefill=forecast fills the form with the recommended stock
+    forecast = next_day_forecast()
+    prefill = request.GET.get('prefill') == 'forecast'
+    for item in items:
+        item.forecast = forecast['items'].get(item.id)
+        item.form_stock = item.forecast['recommended'] if prefill and item.forecast else item.stock
+
     context = {
         'items': items,
         'combos': combos,
         'staff': staff,
         'items_low_stock': items_low_stock,
         'combos_low_stock': combos_low_stock,
+        'running_out': running_out,
+        'stockout_warning_days': STOCKOUT_WARNING_DAYS,
+        'forecast_date': forecast['date'],
+        'forecast_closed': forecast['closed'],
+        'prefill': prefill,
     }
     
     return render(request, 'orders/update_stock.html', context)
 
+@staff_member_required
+@designation_required('CS', 'KS', 'MG', 'MD', message='You do not have permission to update stock.')
+def stock_sheet(request):
+    """Download the current stock levels as a CSV for stocktakes"""
+    today = date.today().strftime("%d%m%Y")
+    response = HttpResponse(content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="Stock_{today}.csv"'
+    write_stock_sheet(response)
+    return response
+
 # Admin Controls
 @login_required
 @staff_member_required
+@designation_required('CS', 'KS', 'DL', 'AC', 'AD', 'MG', 'MD', message='You do not have permission to generate sales reports.')
 def generate_sales(request):
-    staff = get_object_or_404(Staff, user=request.user)
-    if staff.designation not in ['CS', 'KS', 'DL', 'AC', 'AD', 'MG', 'MD']:
-        messages.error(request, 'You do not have permission to generate sales reports.')
-        return redirect('staff_dashboard')
 
     today = date.today().strftime("%d%m%Y")
 
@@ -795,12 +961,10 @@ def generate_sales(request):
     #Writing Orders data to the sheet
     font_style = xlwt.XFStyle()
 
-    orders = Order.objects.filter(date_placed=date.today(), finalized = True)
+    day_start, day_end = local_day_bounds(timezone.localdate())
+    orders = Order.objects.filter(placed_at__gte=day_start, placed_at__lt=day_end, status__in=FINALIZED_STATUSES)
     items = Item.objects.all()
-    ordered_items = []
-
-    for order in orders:
-        ordered_items += OrderedItem.objects.filter(order = order)
+    ordered_items = list(OrderedItem.objects.filter(order__in=orders).for_display())
 
     net_sales = 0
     for c in range(len(CATEGORIES)):
@@ -898,36 +1062,43 @@ def monthly_report(request):
     end_date = date(report_year, report_month, num_days)
     
     # Get ALL orders for the month (finalized and non-finalized for complete audit)
+    month_start, month_end = local_month_bounds(report_year, report_month)
     monthly_orders = Order.objects.filter(
-        date_placed__gte=start_date,
-        date_placed__lte=end_date
-    ).select_related('customer__user').order_by('date_placed', 'time_placed')
-    
-    # Calculate comprehensive statistics
-    total_orders = monthly_orders.count()
-    finalized_orders = monthly_orders.filter(finalized=True)
-    delivered_orders = finalized_orders.filter(delivered=True)
+        placed_at__gte=month_start,
+        placed_at__lt=month_end
+    ).select_related('customer__user').order_by('placed_at')
+    
+    # Order counts and revenue per status in one GROUP BY (plus the archive)
+    by_status = merge_rollups(
+        {
+            row['status']: row
+            for row in monthly_orders.order_by().values('status').annotate(n=Count('id'), total=Sum('grand_total'))
+        },
+        archived_status_rollup(month_start, month_end),
+    )
+    archived_orders = ArchivedOrder.objects.filter(
+        placed_at__gte=month_start, placed_at__lt=month_end
+    ).select_related('customer').order_by('placed_at')
+    total_orders = sum(row['n'] for row in by_status.values())
+    finalized_count = sum(by_status[s]['n'] for s in FINALIZED_STATUSES if s in by_status)
+    delivered_count = by_status[STATUS_DELIVERED]['n'] if STATUS_DELIVERED in by_status else 0
     
     # Revenue calculations
-    total_revenue = finalized_orders.aggregate(
-        total=Sum('grand_total')
-    )['total'] or Decimal('0.00')
-    
-    pending_revenue = monthly_orders.filter(
-        finalized=False
-    ).aggregate(
-        total=Sum('grand_total')
-    )['total'] or Decimal('0.00')
+    revenue = {status: row['total'] or Decimal('0.00') for status, row in by_status.items()}
+    total_revenue = sum((revenue.get(s, Decimal('0.00')) for s in FINALIZED_STATUSES), Decimal('0.00'))
+    pending_revenue = revenue.get(STATUS_PENDING, Decimal('0.00'))
+    status_labels = dict(ORDER_STATUSES)
     
     # Daily breakdown with complete data
     daily_report_data = {}
     
-    for order in monthly_orders:
-        day_key = order.date_placed.strftime('%Y-%m-%d')
+    for order in list(archived_orders) + list(monthly_orders):
+        placed = timezone.localtime(order.placed_at)
+        day_key = placed.strftime('%Y-%m-%d')
         
         if day_key not in daily_report_data:
             daily_report_data[day_key] = {
-                'date': order.date_placed,
+                'date': placed.date(),
                 'orders_count': 0,
                 'finalized_orders': 0,
                 'delivered_orders': 0,
@@ -939,36 +1110,33 @@ def monthly_report(request):
         # Update day totals
         daily_report_data[day_key]['orders_count'] += 1
         
-        if order.finalized:
+        finalized = order.status in FINALIZED_STATUSES
+        delivered = order.status == STATUS_DELIVERED
+        if finalized:
             daily_report_data[day_key]['finalized_orders'] += 1
             daily_report_data[day_key]['revenue'] += order.grand_total
             
-            if order.delivered:
+            if delivered:
                 daily_report_data[day_key]['delivered_orders'] += 1
-        else:
+        elif order.status == STATUS_PENDING:
             daily_report_data[day_key]['pending_revenue'] += order.grand_total
         
-        # Add order event
-        status = "Pending Payment"
-        if order.finalized:
-            status = "Delivered" if order.delivered else "Processing"
-        
         daily_report_data[day_key]['events'].append({
             'order_id': order.id,
-            'time': order.time_placed.strftime('%I:%M %p') if order.time_placed else 'N/A',
+            'time': placed.strftime('%I:%M %p'),
             'customer': order.customer.name,
             'total': order.grand_total,
-            'status': status,
-            'finalized': order.finalized,
-            'delivered': order.delivered,
+            'status': status_labels[order.status],
+            'finalized': finalized,
+            'delivered': delivered,
             'payment_ref': order.payment_reference or 'No Payment',
         })
     
     # Calculate additional metrics
     business_days = len(daily_report_data)
     average_daily_revenue = total_revenue / business_days if business_days > 0 else Decimal('0.00')
-    average_order_value = total_revenue / finalized_orders.count() if finalized_orders.count() > 0 else Decimal('0.00')
-    delivery_rate = (delivered_orders.count() / finalized_orders.count() * 100) if finalized_orders.count() > 0 else 0
+    average_order_value = total_revenue / finalized_count if finalized_count > 0 else Decimal('0.00')
+    delivery_rate = (delivered_count / finalized_count * 100) if finalized_count > 0 else 0
     
     # Generate month choices for dropdown (format: 'YYYY-MM')
     months = []
@@ -1007,8 +1175,8 @@ def monthly_report(request):
         'report_month_num': report_month,
         'daily_reports': sorted(daily_report_data.values(), key=lambda x: x['date']),
         'total_orders': total_orders,
-        'finalized_orders': finalized_orders.count(),
-        'delivered_orders': delivered_orders.count(),
+        'finalized_orders': finalized_count,
+        'delivered_orders': delivered_count,
         'total_revenue': total_revenue,
         'pending_revenue': pending_revenue,
         'start_date': start_date,
@@ -1025,25 +1193,25 @@ def monthly_report(request):
     return render(request, 'orders/monthly_report.html', context)
 
 @staff_member_required
+@designation_required('MD', 'MG', 'CS', 'KS', 'DL', message='You do not have permission to view today\'s orders.')
 def day_orders(request):
     """View for TODAY'S operational orders (staff focus)"""
-    staff = get_object_or_404(Staff, user=request.user)
-    
-    if staff.designation not in ['MD', 'MG', 'CS', 'KS', 'DL']:
-        messages.error(request, 'You do not have permission to view today\'s orders.')
-        return redirect('staff_dashboard')
+    staff = get_staff_role(request)
     
     # Get TODAY'S orders only
-    today = datetime.now().date()
+    today = timezone.localdate()
+    day_start, day_end = local_day_bounds(today)
     today_orders = Order.objects.filter(
-        date_placed=today,
-        finalized=True
-    ).select_related('customer').order_by('-time_placed')
+        placed_at__gte=day_start,
+        placed_at__lt=day_end,
+        status__in=FINALIZED_STATUSES
+    ).select_related('customer').order_by('-placed_at')
     
-    # Get counts instead of QuerySets
-    pending_orders_count = today_orders.filter(delivered=False).count()
-    delivered_orders_count = today_orders.filter(delivered=True).count()
-    total_orders_count = today_orders.count()
+    # Status counts in one GROUP BY
+    counts = dict(today_orders.order_by().values_list('status').annotate(n=Count('id')))
+    delivered_orders_count = counts.get(STATUS_DELIVERED, 0)
+    total_orders_count = sum(counts.values())
+    pending_orders_count = total_orders_count - delivered_orders_count
     
     # Calculate revenue
     revenue_sum = today_orders.aggregate(Sum('grand_total'))['grand_total__sum']
@@ -1066,39 +1234,29 @@ def order_details_ajax(request):
     if request.method == 'GET':
         order_id = request.GET.get('order_id')
         
+        # Rendered HTML comes from the fragment cache after the first open
         try:
-            order = Order.objects.get(id=order_id)
-            ordered_items = OrderedItem.objects.filter(order=order)
-            
-            # Check permissions - staff can see any order, customers only their own
-            if request.user.is_staff:
-                # Staff can view any order
-                pass
-            else:
-                # Regular users can only view their own orders
-                customer = get_object_or_404(Customer, user=request.user)
-                if order.customer != customer:
-                    return JsonResponse({
-                        'success': False,
-                        'error': 'You do not have permission to view this order.'
-                    })
-            
-            # Render the order details HTML
-            html = render_to_string('orders/_order_details.html', {
-                'order': order,
-                'ordered_items': ordered_items,
-                'is_staff': request.user.is_staff,  # Pass staff status to template
-            })
-            
+            fragment = order_detail_fragment(request, int(order_id))
+        except (TypeError, ValueError):
+            fragment = None
+        if fragment is None:
             return JsonResponse({
-                'success': True,
-                'html': html
+                'success': False,
+                'error': 'Order not found'
             })
-        except Order.DoesNotExist:
+        owner_id, html = fragment
+        
+        # Check permissions - staff can see any order, customers only their own
+        if not request.user.is_staff and owner_id != request.user.id:
             return JsonResponse({
                 'success': False,
-                'error': 'Order not found'
+                'error': 'You do not have permission to view this order.'
             })
+        
+        return JsonResponse({
+            'success': True,
+            'html': html
+        })
     
     return JsonResponse({
         'success': False,
@@ -1123,7 +1281,7 @@ def staff_dashboard(request):
     
     # Get pending orders based on staff designation
     if staff.designation in ['CS', 'AD', 'MD', 'KS', 'DL']:
-        pending_orders = Order.objects.filter(finalized=True, delivered=False).order_by('date_placed', 'time_placed')
+        pending_orders = Order.objects.filter(status__in=ACTIVE_STATUSES).order_by('placed_at')
         pending_orders_count = pending_orders.count()
         
         # Calculate pending orders total revenue
@@ -1149,25 +1307,19 @@ def staff_dashboard(request):
 
 @login_required
 @staff_member_required
+@designation_required('CS', 'KS', 'DL', 'MG', 'MD', 'AD', message='You do not have permission to view order details.')
 def staff_order_details(request, order_id):
     """View for staff to see order details (without customer restriction)"""
-    staff = get_object_or_404(Staff, user=request.user)
+    staff = get_staff_role(request)
     
-    # Check if staff has permission to view orders
-    if staff.designation not in ['CS', 'KS', 'DL', 'MG', 'MD', 'AD']:
-        messages.error(request, 'You do not have permission to view order details.')
-        return redirect('staff_dashboard')
-    
-    # 1. Efficiently get the order and its related customer
-    try:
-        # Use select_related to fetch the customer in the same query
-        order = Order.objects.select_related('customer').get(id=order_id)
-    except Order.DoesNotExist:
+    # 1. Get the order, its customer and its lines (two queries)
+    order = load_order_detail(order_id, include_archived=True)
+    if order is None:
         messages.error(request, f'Order #{order_id} not found.')
         return redirect('staff_dashboard')
     
     # 2. Get the ordered items
-    ordered_items = OrderedItem.objects.filter(order=order)
+    ordered_items = order.lines
 
     # 3. Compile context and render the template
     context = {
@@ -1179,10 +1331,7 @@ def staff_order_details(request, order_id):
     # Assuming your template is named 'orders/staff_order_details.html'
     return render(request, 'orders/staff_order_details.html', context)
 
-    def is_managing_director(user):
-        return user.is_authenticated and (user.is_superuser or user.groups.filter(name='Managing Director').exists())
-
-@user_passes_test(is_managing_director)
+@managing_director_required
 def customer_management(request):
     customers = Customer.objects.select_related('user').all().order_by('user__first_name')
     
@@ -1192,7 +1341,7 @@ def customer_management(request):
     }
     return render(request, 'orders/customer_management.html', context)
 
-@user_passes_test(is_managing_director)
+@managing_director_required
 def export_customers_csv(request):
     """Export customer contacts ranked by total spending"""
     response = HttpResponse(content_type='text/csv')
@@ -1217,18 +1366,30 @@ def export_customers_csv(request):
     
     customers = Customer.objects.select_related('user').prefetch_related('order_set').all()
     
+    # Orders moved to the archive still count towards each customer's history
+    archived = archived_customer_totals()
+    
     # Calculate customer data with rankings
     customer_data = []
     for customer in customers:
-        customer_orders = customer.order_set.filter(finalized=True)
-        total_orders = customer_orders.count()
+        customer_orders = customer.order_set.filter(status__in=FINALIZED_STATUSES)
+        past = archived.get(customer.id)
+        total_orders = customer_orders.count() + (past['orders'] if past else 0)
         total_spent = sum(order.grand_total for order in customer_orders if order.grand_total)
+        if past:
+            total_spent += past['spent'] or 0
         avg_order_value = total_spent / total_orders if total_orders > 0 else 0
         last_order = customer_orders.order_by('-date_placed').first()
+        if last_order:
+            last_order_date = last_order.date_placed
+        elif past:
+            last_order_date = timezone.localtime(past['last_placed']).date()
+        else:
+            last_order_date = None
         
         # Calculate days since last order
-        if last_order:
-            days_since_last = (date.today() - last_order.date_placed).days
+        if last_order_date:
+            days_since_last = (date.today() - last_order_date).days
         else:
             days_since_last = 999  # Large number for customers with no orders
         
@@ -1237,7 +1398,7 @@ def export_customers_csv(request):
             'total_orders': total_orders,
             'total_spent': total_spent,
             'avg_order_value': avg_order_value,
-            'last_order_date': last_order.date_placed if last_order else 'Never',
+            'last_order_date': last_order_date or 'Never',
             'days_since_last': days_since_last,
         })
     
@@ -1279,7 +1440,7 @@ def export_customers_csv(request):
     
     return response
 
-@user_passes_test(is_managing_director)
+@managing_director_required
 def customer_analytics(request):
     # Basic analytics
     total_customers = Customer.objects.count()
@@ -1304,7 +1465,7 @@ def customer_analytics(request):
     }
     return render(request, 'orders/customer_analytics.html', context)
 
-@user_passes_test(is_managing_director)
+@managing_director_required
 def export_analytics_csv(request):
     """Export customer analytics and behavior data"""
     response = HttpResponse(content_type='text/csv')
@@ -1330,20 +1491,29 @@ def export_analytics_csv(request):
     
     customers = Customer.objects.select_related('user').prefetch_related('order_set').all()
     
+    # Orders moved to the archive still count towards each customer's history
+    archived = archived_customer_totals()
+    
     customer_analytics = []
     for customer in customers:
-        customer_orders = customer.order_set.filter(finalized=True).order_by('date_placed')
-        total_orders = customer_orders.count()
+        customer_orders = customer.order_set.filter(status__in=FINALIZED_STATUSES).order_by('date_placed')
+        past = archived.get(customer.id)
+        total_orders = customer_orders.count() + (past['orders'] if past else 0)
         total_spent = sum(order.grand_total for order in customer_orders if order.grand_total)
+        if past:
+            total_spent += past['spent'] or 0
         
         # Calculate customer metrics
         customer_age = (date.today() - customer.user.date_joined.date()).days
         avg_order_value = total_spent / total_orders if total_orders > 0 else 0
         
         # Calculate order frequency
-        if total_orders > 1:
-            first_order = customer_orders.first().date_placed
-            last_order = customer_orders.last().date_placed
+        order_dates = [order.date_placed for order in customer_orders if order.date_placed]
+        if past:
+            order_dates += [timezone.localtime(past['first_placed']).date(), timezone.localtime(past['last_placed']).date()]
+        if total_orders > 1 and order_dates:
+            first_order = min(order_dates)
+            last_order = max(order_dates)
             order_frequency = (last_order - first_order).days / total_orders
         else:
             order_frequency = 0
@@ -1398,16 +1568,24 @@ def export_analytics_csv(request):
 def all_transactions(request):
     """View all finalized transactions across all time"""
     # Get all finalized orders, ordered by most recent first
-    all_orders = Order.objects.filter(finalized=True).select_related('customer__user').order_by('-date_placed', '-time_placed')
-    
-    # Calculate statistics
-    total_orders = all_orders.count()
-    total_revenue = all_orders.aggregate(total=Sum('grand_total'))['total'] or Decimal('0.00')
-    delivered_orders = all_orders.filter(delivered=True).count()
-    pending_orders = all_orders.filter(delivered=False).count()
+    all_orders = Order.objects.filter(status__in=FINALIZED_STATUSES).select_related('customer__user').order_by('-placed_at')
+    
+    # Calculate statistics (one GROUP BY status), including archived orders
+    archived = archived_status_rollup()
+    by_status = merge_rollups(
+        {
+            row['status']: row
+            for row in all_orders.order_by().values('status').annotate(n=Count('id'), total=Sum('grand_total'))
+        },
+        archived,
+    )
+    total_orders = sum(row['n'] for row in by_status.values())
+    total_revenue = sum((row['total'] or Decimal('0.00') for row in by_status.values()), Decimal('0.00'))
+    delivered_orders = by_status[STATUS_DELIVERED]['n'] if STATUS_DELIVERED in by_status else 0
+    pending_orders = total_orders - delivered_orders
     
     # Pagination
-    paginator = Paginator(all_orders, 50)  # 50 orders per page
+    paginator = Paginator(all_orders.with_lines(), 50)  # 50 orders per page
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     
@@ -1419,6 +1597,7 @@ def all_transactions(request):
         'total_revenue': total_revenue,
         'delivered_orders': delivered_orders,
         'pending_orders': pending_orders,
+        'archived_orders': sum(row['n'] for row in archived.values()),
     }
     return render(request, 'orders/all_transactions.html', context)
 
@@ -1436,26 +1615,41 @@ def daily_report(request):
         report_date = date.today()
     
     # Get orders for the specific date
+    day_start, day_end = local_day_bounds(report_date)
     daily_orders = Order.objects.filter(
-        date_placed=report_date,
-        finalized=True
-    ).select_related('customer__user').order_by('time_placed')
-    
-    # Calculate daily statistics
-    total_orders = daily_orders.count()
-    total_revenue = daily_orders.aggregate(total=Sum('grand_total'))['total'] or Decimal('0.00')
-    delivered_orders = daily_orders.filter(delivered=True).count()
+        placed_at__gte=day_start,
+        placed_at__lt=day_end,
+        status__in=FINALIZED_STATUSES
+    ).select_related('customer__user').order_by('placed_at')
+    
+    # Calculate daily statistics (one GROUP BY status), including archived orders
+    archived_orders = list(
+        ArchivedOrder.objects.filter(placed_at__gte=day_start, placed_at__lt=day_end)
+        .select_related('customer__user').order_by('placed_at')
+    )
+    by_status = merge_rollups(
+        {
+            row['status']: row
+            for row in daily_orders.order_by().values('status').annotate(n=Count('id'), total=Sum('grand_total'))
+        },
+        archived_status_rollup(day_start, day_end),
+    )
+    total_orders = sum(row['n'] for row in by_status.values())
+    total_revenue = sum((row['total'] or Decimal('0.00') for row in by_status.values()), Decimal('0.00'))
+    delivered_orders = by_status[STATUS_DELIVERED]['n'] if STATUS_DELIVERED in by_status else 0
     average_order_value = total_revenue / total_orders if total_orders > 0 else Decimal('0.00')
     
     # Get top selling items for the day
     ordered_items = OrderedItem.objects.filter(
-        order__date_placed=report_date,
-        order__finalized=True
-    )
+        order__placed_at__gte=day_start,
+        order__placed_at__lt=day_end,
+        order__status__in=FINALIZED_STATUSES
+    ).for_display()
+    archived_items = [line for order in archived_orders for line in order.lines]
     
     # Item sales breakdown
     item_sales = {}
-    for item in ordered_items:
+    for item in list(ordered_items) + archived_items:
         if item.item:
             item_name = item.item.name
         elif item.combo:
@@ -1474,7 +1668,7 @@ def daily_report(request):
     
     context = {
         'report_date': report_date,
-        'daily_orders': daily_orders,
+        'daily_orders': archived_orders + list(daily_orders),
         'total_orders': total_orders,
         'total_revenue': total_revenue,
         'delivered_orders': delivered_orders,
@@ -1485,6 +1679,10 @@ def daily_report(request):
     }
     return render(request, 'orders/daily_report.html', context)
 
-@user_passes_test(is_managing_director)
+@managing_director_required
 def mg_dashboard(request):
-    return render(request, 'orders/mg_dashboard.html')
\ No newline at end of file
+    context = {
+        'cart_stats': abandonment_stats(),
+        'combo_suggestions': combo_suggestions(),
+    }
+    return render(request, 'orders/mg_dashboard.html', context)
\ No newline at end of file
@@ -0,0 +1,114 @@
+# orders/zones.py
+
+import threading
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Value, When
+from django.db.models.functions import Greatest
+
+from juiceville.cache import bump_version, current_version
+from orders.models import DeliveryLocation, Order, STATUS_PENDING
+
+VERSION_KEY = 'delivery_zones_version'
+
+# Each worker reloads the zones at least this often, even if an
+# invalidation never reached the shared cache
+REFRESH_SECONDS = getattr(settings, 'DELIVERY_ZONES_REFRESH_SECONDS', 300)
+
+# Order.calculate_totals' loyalty discount
+LOYALTY_DISCOUNT = Decimal('2500.00')
+
+_zones = None
+_zones_lock = threading.Lock()
+
+
+def invalidate_zones():
+    """
+    Bump the registry version (once the current transaction commits) so
+    every process reloads the zones on next use.
+    """
+    transaction.on_commit(lambda: bump_version(VERSION_KEY))
+
+
+class ZoneRegistry:
+    """
+    Every DeliveryLocation, loaded with one query and shared by the whole
+    process until a zone is saved or deleted, or REFRESH_SECONDS pass. The
+    instances are shared, so treat them as read-only.
+    """
+
+    def __init__(self, version):
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.zones = list(DeliveryLocation.objects.order_by('fee', 'name'))
+        self.by_id = {zone.id: zone for zone in self.zones}
+        self.active = [zone for zone in self.zones if zone.is_active]
+
+    def is_current(self, version):
+        return self.version == version and time.monotonic() - self.loaded_at < REFRESH_SECONDS
+
+
+def registry():
+    global _zones
+    version = current_version(VERSION_KEY)
+    zones = _zones
+    if zones is None or not zones.is_current(version):
+        with _zones_lock:
+            if _zones is None or not _zones.is_current(version):
+                _zones = ZoneRegistry(version)
+            zones = _zones
+    return zones
+
+
+def get_zone(location_id):
+    """The DeliveryLocation with this id (active or not), or None."""
+    return registry().by_id.get(location_id) if location_id else None
+
+
+def active_zones():
+    """Zones customers can pick, cheapest first."""
+    return registry().active
+
+
+def zone_fee(location_id):
+    """Delivery fee for a zone id; 0.00 when the customer has no zone."""
+    zone = get_zone(location_id)
+    return zone.fee if zone is not None else Decimal('0.00')
+
+
+def customer_zone_fee(customer_id):
+    """
+    The fee for a customer's zone read straight from the database, for the
+    amount actually charged at payment; 0.00 when they have no zone.
+    """
+    fee = DeliveryLocation.objects.filter(customer=customer_id).values_list('fee', flat=True).first()
+    return fee if fee is not None else Decimal('0.00')
+
+
+def reprice_open_orders(*location_ids):
+    """
+    Set delivery_fee and grand_total on every unpaid cart whose customer
+    is in one of these zones to the zone's current fee, with one UPDATE per
+    zone (paid orders keep the fee they were charged). Returns the number
+    of orders changed.
+    """
+    changed = 0
+    for zone in DeliveryLocation.objects.filter(id__in=location_ids):
+        fee = Value(zone.fee, output_field=DecimalField(max_digits=10, decimal_places=2))
+        discount = Case(
+            When(used_loyalty_points=True, then=Value(LOYALTY_DISCOUNT)),
+            default=Value(Decimal('0.00')),
+            output_field=DecimalField(max_digits=10, decimal_places=2),
+        )
+        changed += (
+            Order.objects.filter(status=STATUS_PENDING, customer__delivery_location_id=zone.id)
+            .exclude(delivery_fee=zone.fee)
+            .update(
+                delivery_fee=fee,
+                grand_total=Greatest(F('subtotal') + fee - discount, Value(Decimal('0.00'))),
+            )
+        )
+    return changed
@@ -1,6 +1,21 @@
 from django.contrib import admin
-from users.models import Customer, Staff
+from users.models import Customer, LoyaltyEntry, Staff
 
 admin.site.register([Customer, Staff])
 
+
+@admin.register(LoyaltyEntry)
+class LoyaltyEntryAdmin(admin.ModelAdmin):
+    # The ledger is append-only; balances change through users/loyalty.py
+    list_display = ('customer', 'kind', 'points', 'balance_after', 'order', 'created_at')
+    list_filter = ('kind',)
+    search_fields = ('customer__name', 'customer__user__username')
+    raw_id_fields = ('customer', 'order')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
 # Register your models here.
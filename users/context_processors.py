@@ -0,0 +1,11 @@
+from users.roles import get_staff_role
+
+
+def staff_role(request):
+    """
+    Makes the cached StaffRole available to every template as 'staff_role'.
+    Passed as a callable so it is only resolved when a template uses it.
+    """
+    return {
+        'staff_role': lambda: get_staff_role(request),
+    }
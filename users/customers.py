@@ -0,0 +1,63 @@
+# users/customers.py
+
+from asgiref.sync import iscoroutinefunction
+from django.contrib.auth.models import User
+from django.utils.decorators import sync_and_async_middleware
+from django.utils.functional import SimpleLazyObject
+
+from orders.zones import get_zone
+from users.models import Customer
+
+# Where the resolved customer lives on the request
+REQUEST_ATTR = '_customer'
+
+_MISSING = object()
+
+
+def get_customer(request):
+    """
+    Return the Customer for request.user (with user and delivery_location
+    loaded), or None for anonymous users and staff without a profile.
+
+    Resolved with one query per request; delivery_location comes from the
+    zone registry (orders/zones.py). request.user.customer is filled in as
+    well, so code and templates using it don't query again.
+    """
+    cached = getattr(request, REQUEST_ATTR, _MISSING)
+    if cached is not _MISSING:
+        return cached
+
+    user = request.user
+    customer = None
+    if user.is_authenticated:
+        customer = Customer.objects.filter(user_id=user.pk).first()
+        # Prime the reverse one-to-one cache (None makes .customer raise
+        # DoesNotExist, as before)
+        User.customer.related.set_cached_value(user, customer)
+        if customer is not None:
+            # The auth middleware already loaded the user
+            customer.user = user
+            zone = get_zone(customer.delivery_location_id)
+            if zone is not None or customer.delivery_location_id is None:
+                Customer.delivery_location.field.set_cached_value(customer, zone)
+
+    setattr(request, REQUEST_ATTR, customer)
+    return customer
+
+
+@sync_and_async_middleware
+def customer_middleware(get_response):
+    """
+    Sets request.customer to a lazy get_customer(request), so pages that
+    never look at the customer don't pay for the query. Async-capable so
+    the async payment views stay async.
+    """
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            request.customer = SimpleLazyObject(lambda: get_customer(request))
+            return await get_response(request)
+    else:
+        def middleware(request):
+            request.customer = SimpleLazyObject(lambda: get_customer(request))
+            return get_response(request)
+    return middleware
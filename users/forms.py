@@ -2,7 +2,29 @@ from django import forms
 from users.models import Customer, Staff
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
+from django.forms.models import ModelChoiceIterator
 from orders.models import DeliveryLocation
+from orders.zones import active_zones
+
+
+class ZoneChoiceIterator(ModelChoiceIterator):
+    """Renders the active zones from the zone registry instead of querying on every render."""
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ("", self.field.empty_label)
+        for zone in active_zones():
+            yield self.choice(zone)
+
+    def __len__(self):
+        return len(active_zones()) + (1 if self.field.empty_label is not None else 0)
+
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(active_zones())
+
+
+class ZoneChoiceField(forms.ModelChoiceField):
+    iterator = ZoneChoiceIterator
 
 class UserRegistrationForm(UserCreationForm):
     
@@ -13,7 +35,7 @@ class UserRegistrationForm(UserCreationForm):
 class CustomerProfileForm(forms.ModelForm):
     
     # 1. Define the mandatory ModelChoiceField for Delivery Region
-    delivery_location = forms.ModelChoiceField(
+    delivery_location = ZoneChoiceField(
         queryset=DeliveryLocation.objects.filter(is_active=True).order_by('fee'),
         label='Select Delivery Region (Fee Zone)',
         required=True, # ENFORCES selection
@@ -0,0 +1,113 @@
+# users/loyalty.py
+
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from users.models import Customer, LoyaltyEntry
+
+# Redeeming this many points takes REDEEM_DISCOUNT off an order
+REDEEM_POINTS = 50
+REDEEM_DISCOUNT = Decimal('2500.00')
+
+# One point is earned per this many Naira of subtotal
+NAIRA_PER_POINT = 1000
+
+
+class InsufficientPoints(ValueError):
+    """Raised when a redemption would take a balance below zero."""
+
+
+def _record(customer_id, kind, points, order=None, **counters):
+    """
+    Change a balance by `points` and log it, in one transaction.
+
+    The balance and any Customer counters (e.g. points_earned=5) are moved
+    with a single F() UPDATE, which also locks the customer row until the
+    entry is written, so concurrent finalizations can't lose points.
+    If `order` already has an entry of this kind, that entry is returned
+    and nothing changes. Returns (entry, created).
+    """
+    if order is not None:
+        existing = LoyaltyEntry.objects.filter(order=order, kind=kind).first()
+        if existing is not None:
+            return existing, False
+
+    updates = {'loyalty_points': F('loyalty_points') + points}
+    updates.update({field: F(field) + value for field, value in counters.items()})
+    balance_check = {'loyalty_points__gte': -points} if points < 0 else {}
+
+    try:
+        with transaction.atomic():
+            if not Customer.objects.filter(pk=customer_id, **balance_check).update(**updates):
+                raise InsufficientPoints(f"Customer #{customer_id} does not have {-points} points")
+            balance = Customer.objects.filter(pk=customer_id).values_list('loyalty_points', flat=True).get()
+            entry = LoyaltyEntry.objects.create(
+                customer_id=customer_id, order=order, kind=kind, points=points, balance_after=balance,
+            )
+    except IntegrityError:
+        # Another request settled this order first; its changes stand, ours were rolled back
+        if order is None:
+            raise
+        return LoyaltyEntry.objects.get(order=order, kind=kind), False
+    return entry, True
+
+
+def earn_points(customer_id, points, order=None, **counters):
+    return _record(customer_id, LoyaltyEntry.EARN, points, order, points_earned=points, **counters)
+
+
+def redeem_points(customer_id, points, order=None, **counters):
+    """Raises InsufficientPoints if the balance is too low."""
+    return _record(customer_id, LoyaltyEntry.REDEEM, -points, order, points_redeemed=points, **counters)
+
+
+def adjust_points(customer_id, points):
+    """Manual correction (e.g. goodwill points); does not count as earned or redeemed."""
+    return _record(customer_id, LoyaltyEntry.ADJUSTMENT, points)
+
+
+def settle_order(order, subtotal):
+    """
+    Apply a paid order's loyalty effect, once per order.
+
+    If the customer asked to use their points and still has enough,
+    REDEEM_POINTS are redeemed for REDEEM_DISCOUNT; otherwise the order
+    earns a point per NAIRA_PER_POINT of subtotal. The order is counted in
+    Customer.orders_count in the same update. Returns (discount, entry).
+    """
+    if order.used_loyalty_points:
+        try:
+            entry, created = redeem_points(order.customer_id, REDEEM_POINTS, order, orders_count=1)
+            return REDEEM_DISCOUNT, entry
+        except InsufficientPoints:
+            pass
+
+    points = int(subtotal) // NAIRA_PER_POINT
+    entry, created = earn_points(order.customer_id, points, order, orders_count=1)
+    return Decimal('0.00'), entry
+
+
+def reverse_order(order):
+    """
+    Undo a cancelled order's loyalty effect, once per order: redeemed
+    points are given back, earned points taken back (as far as the
+    balance allows; points already spent stay spent), and the order no
+    longer counts in orders_count. Returns the REVERSAL entry, or None if
+    the order never settled.
+    """
+    settled = LoyaltyEntry.objects.filter(order=order, kind__in=(LoyaltyEntry.EARN, LoyaltyEntry.REDEEM)).first()
+    if settled is None:
+        return None
+
+    points = -settled.points
+    if settled.kind == LoyaltyEntry.EARN:
+        balance = Customer.objects.filter(pk=settled.customer_id).values_list('loyalty_points', flat=True).get()
+        points = max(points, -balance)
+        counters = {'points_earned': -settled.points}
+    else:
+        counters = {'points_redeemed': settled.points}
+
+    entry, created = _record(settled.customer_id, LoyaltyEntry.REVERSAL, points, order, orders_count=-1, **counters)
+    return entry
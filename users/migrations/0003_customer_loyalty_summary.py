@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0002_customer_created_at_customer_date_of_birth_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="customer",
+            name="orders_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="customer",
+            name="points_redeemed",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Backfill Customer.orders_count / points_redeemed from paid orders,
+# live and archived.
+
+from collections import Counter
+
+from django.db import migrations
+from django.db.models import Count, Q
+
+BATCH_SIZE = 500
+
+# orders.models.FINALIZED_STATUSES at the time of writing
+FINALIZED_STATUSES = ["PAID", "PREPARED", "DISPATCHED", "DELIVERED"]
+
+# Points spent on each loyalty redemption
+POINTS_PER_REDEMPTION = 50
+
+
+def backfill_loyalty_summary(apps, schema_editor):
+    Customer = apps.get_model("users", "Customer")
+    Order = apps.get_model("orders", "Order")
+    ArchivedOrder = apps.get_model("orders", "ArchivedOrder")
+
+    orders, redemptions = Counter(), Counter()
+    for model, rows in (
+        (Order, Order.objects.filter(status__in=FINALIZED_STATUSES)),
+        (ArchivedOrder, ArchivedOrder.objects.all()),
+    ):
+        for customer_id, n, redeemed in (
+            rows.values_list("customer_id")
+            .annotate(
+                n=Count("id"), redeemed=Count("id", filter=Q(used_loyalty_points=True))
+            )
+            .values_list("customer_id", "n", "redeemed")
+            .order_by()
+        ):
+            orders[customer_id] += n
+            redemptions[customer_id] += redeemed
+
+    batch = []
+    for customer_id, n in orders.items():
+        batch.append(
+            Customer(
+                id=customer_id,
+                orders_count=n,
+                points_redeemed=redemptions[customer_id] * POINTS_PER_REDEMPTION,
+            )
+        )
+        if len(batch) >= BATCH_SIZE:
+            Customer.objects.bulk_update(batch, ["orders_count", "points_redeemed"])
+            batch = []
+    if batch:
+        Customer.objects.bulk_update(batch, ["orders_count", "points_redeemed"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0003_customer_loyalty_summary"),
+        ("orders", "0012_remove_order_ordered_items"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_loyalty_summary, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0012_remove_order_ordered_items"),
+        ("users", "0004_backfill_loyalty_summary"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="customer",
+            name="points_earned",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name="LoyaltyEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("ERN", "Earned"),
+                            ("RDM", "Redeemed"),
+                            ("ADJ", "Adjustment"),
+                        ],
+                        max_length=3,
+                    ),
+                ),
+                (
+                    "points",
+                    models.IntegerField(
+                        help_text="Change to the balance (negative for redemptions)"
+                    ),
+                ),
+                ("balance_after", models.IntegerField()),
+                ("created_at", models.DateTimeField(auto_now_add=True, db_index=True)),
+                (
+                    "customer",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="loyalty_entries",
+                        to="users.customer",
+                    ),
+                ),
+                (
+                    "order",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="loyalty_entries",
+                        to="orders.order",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "loyalty entries",
+                "ordering": ["-created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["customer", "created_at"],
+                        name="loyalty_customer_created_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        condition=models.Q(("order__isnull", False)),
+                        fields=("order", "kind"),
+                        name="loyalty_entry_once_per_order",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Start the loyalty ledger from the balances customers already have:
+# one ADJUSTMENT entry per non-zero balance, and points_earned set to
+# everything ever credited (current balance + points redeemed).
+
+from django.db import migrations
+from django.db.models import F
+
+BATCH_SIZE = 500
+
+
+def open_ledger(apps, schema_editor):
+    Customer = apps.get_model("users", "Customer")
+    LoyaltyEntry = apps.get_model("users", "LoyaltyEntry")
+
+    Customer.objects.update(points_earned=F("loyalty_points") + F("points_redeemed"))
+
+    batch = []
+    for customer_id, balance in (
+        Customer.objects.exclude(loyalty_points=0)
+        .values_list("id", "loyalty_points")
+        .iterator(chunk_size=BATCH_SIZE)
+    ):
+        batch.append(
+            LoyaltyEntry(
+                customer_id=customer_id,
+                kind="ADJ",
+                points=balance,
+                balance_after=balance,
+            )
+        )
+        if len(batch) >= BATCH_SIZE:
+            LoyaltyEntry.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        LoyaltyEntry.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0005_loyalty_ledger"),
+    ]
+
+    operations = [
+        migrations.RunPython(open_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0006_loyalty_opening_balances"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="loyaltyentry",
+            name="kind",
+            field=models.CharField(
+                choices=[
+                    ("ERN", "Earned"),
+                    ("RDM", "Redeemed"),
+                    ("ADJ", "Adjustment"),
+                    ("REV", "Reversed (order cancelled)"),
+                ],
+                max_length=3,
+            ),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-19 15:18
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def detach_duplicate_entries(apps, schema_editor):
+    # MySQL skipped the old conditional constraint, so an order may have been
+    # settled twice there. Keep the first entry on the order; later ones stay
+    # in the ledger (the balance already includes them) but lose the order.
+    LoyaltyEntry = apps.get_model("users", "LoyaltyEntry")
+    duplicates = (
+        LoyaltyEntry.objects.filter(order__isnull=False)
+        .values("order_id", "kind")
+        .annotate(n=Count("id"), first=Min("id"))
+        .filter(n__gt=1)
+    )
+    for row in duplicates:
+        LoyaltyEntry.objects.filter(order_id=row["order_id"], kind=row["kind"]).exclude(
+            id=row["first"]
+        ).update(order=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0018_clear_cancelled_finalized"),
+        ("users", "0007_alter_loyaltyentry_kind"),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name="loyaltyentry",
+            name="loyalty_entry_once_per_order",
+        ),
+        migrations.RunPython(detach_duplicate_entries, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="loyaltyentry",
+            constraint=models.UniqueConstraint(
+                fields=("order", "kind"), name="loyalty_entry_once_per_order"
+            ),
+        ),
+    ]
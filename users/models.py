@@ -15,6 +15,10 @@ class Customer(models.Model):
     phone = models.CharField(verbose_name = "Mobile", max_length=14)
     email = models.EmailField(max_length=254)
     loyalty_points = models.IntegerField(default=0)
+    # Loyalty summary, kept in step with the LoyaltyEntry ledger (users/loyalty.py)
+    orders_count = models.PositiveIntegerField(default=0)
+    points_earned = models.PositiveIntegerField(default=0)
+    points_redeemed = models.PositiveIntegerField(default=0)
     
     image = models.ImageField(verbose_name="Profile Picture", upload_to="customer_pics", default="media/default_user.png")
 
@@ -45,6 +49,49 @@ class Customer(models.Model):
             img.thumbnail(output_size)
             img.save(self.image.path)
             
+
+
+class LoyaltyEntry(models.Model):
+    """
+    Append-only ledger of loyalty point changes. Customer.loyalty_points
+    stays the live balance and is only changed by an F() update made in the
+    same transaction as a new entry (users/loyalty.py), so Customer.save()
+    is never needed. An order earns or redeems at most once, and a cancelled
+    order's entry is reversed at most once.
+    """
+    EARN = 'ERN'
+    REDEEM = 'RDM'
+    ADJUSTMENT = 'ADJ'
+    REVERSAL = 'REV'
+    KINDS = [
+        (EARN, 'Earned'),
+        (REDEEM, 'Redeemed'),
+        (ADJUSTMENT, 'Adjustment'),
+        (REVERSAL, 'Reversed (order cancelled)'),
+    ]
+
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='loyalty_entries')
+    order = models.ForeignKey('orders.Order', on_delete=models.SET_NULL, null=True, blank=True, related_name='loyalty_entries')
+    kind = models.CharField(max_length=3, choices=KINDS)
+    points = models.IntegerField(help_text="Change to the balance (negative for redemptions)")
+    balance_after = models.IntegerField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name_plural = 'loyalty entries'
+        constraints = [
+            # Entries without an order still repeat freely: NULLs never
+            # clash in a unique index. No condition, so MySQL enforces it too
+            models.UniqueConstraint(fields=['order', 'kind'], name='loyalty_entry_once_per_order'),
+        ]
+        indexes = [
+            models.Index(fields=['customer', 'created_at'], name='loyalty_customer_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.customer}: {self.points:+d} ({self.get_kind_display()})"
+
             
 class Staff(models.Model):
     """
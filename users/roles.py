@@ -0,0 +1,184 @@
+# users/roles.py
+
+import time
+from functools import wraps
+
+from django.contrib import messages
+from django.contrib.auth.models import User
+from django.contrib.auth.views import redirect_to_login
+from django.shortcuts import redirect
+
+from juiceville.cache import bump_version, current_version
+from users.constants import DESIGNATIONS
+
+# Where the resolved role lives on the request and in the session
+REQUEST_ATTR = '_staff_role'
+SESSION_KEY = 'staff_role'
+
+# Roles are re-read from the database at least this often, even without an
+# explicit invalidation (the version counter lives in the shared cache).
+ROLE_SESSION_TTL = 300  # seconds
+
+# The shared version counter is a cache-table read, so a session checks it
+# at most this often; an invalidation can take this long to be noticed
+ROLE_VERSION_CHECK_SECONDS = 30
+
+
+def _version_key(user_id):
+    return f'staff_role_version:{user_id}'
+
+
+def _current_version(user_id):
+    return current_version(_version_key(user_id))
+
+
+def invalidate_staff_role(user_id):
+    """Bump the role version so every cached copy for this user (on every worker) is reloaded."""
+    bump_version(_version_key(user_id))
+
+
+class StaffRole:
+    """
+    Lightweight snapshot of a user's Staff designation and auth groups.
+    Exposes the same attributes templates use on Staff (name, designation,
+    get_designation_display) so it can be passed to them as 'staff'.
+    """
+
+    def __init__(self, user_id, staff_id=None, name='', designation=None,
+                 groups=(), is_superuser=False, version=0, loaded_at=None, checked_at=None):
+        self.user_id = user_id
+        self.staff_id = staff_id
+        self.name = name
+        self.designation = designation
+        self.groups = list(groups)
+        self.is_superuser = is_superuser
+        self.version = version
+        self.loaded_at = loaded_at if loaded_at is not None else time.time()
+        self.checked_at = checked_at if checked_at is not None else self.loaded_at
+
+    def __bool__(self):
+        return self.staff_id is not None or self.is_superuser
+
+    def get_designation_display(self):
+        return dict(DESIGNATIONS).get(self.designation, self.designation or '')
+
+    def has_designation(self, *designations):
+        return self.designation in designations
+
+    def in_group(self, *groups):
+        return any(group in self.groups for group in groups)
+
+    def is_stale(self):
+        now = time.time()
+        if now - self.loaded_at > ROLE_SESSION_TTL:
+            return True
+        if now - self.checked_at < ROLE_VERSION_CHECK_SECONDS:
+            return False
+        if self.version != _current_version(self.user_id):
+            return True
+        self.checked_at = now
+        return False
+
+    def to_session(self):
+        return {
+            'user_id': self.user_id,
+            'staff_id': self.staff_id,
+            'name': self.name,
+            'designation': self.designation,
+            'groups': self.groups,
+            'is_superuser': self.is_superuser,
+            'version': self.version,
+            'loaded_at': self.loaded_at,
+            'checked_at': self.checked_at,
+        }
+
+    @classmethod
+    def from_session(cls, data):
+        return cls(**data)
+
+    @classmethod
+    def load(cls, user):
+        """Load designation and groups for a user in a single query."""
+        version = _current_version(user.pk)
+        rows = User.objects.filter(pk=user.pk).values_list(
+            'staff__id', 'staff__name', 'staff__designation', 'groups__name'
+        )
+
+        staff_id, name, designation, groups = None, '', None, []
+        for row_staff_id, row_name, row_designation, group_name in rows:
+            staff_id, name, designation = row_staff_id, row_name, row_designation
+            if group_name:
+                groups.append(group_name)
+
+        return cls(
+            user_id=user.pk,
+            staff_id=staff_id,
+            name=name or '',
+            designation=designation,
+            groups=groups,
+            is_superuser=user.is_superuser,
+            version=version,
+        )
+
+
+def get_staff_role(request):
+    """
+    Return the StaffRole for request.user, or None for anonymous users.
+    Resolved once per request and kept in the session until invalidated.
+    """
+    user = request.user
+    if not user.is_authenticated:
+        return None
+
+    role = getattr(request, REQUEST_ATTR, None)
+    if role is not None and role.user_id == user.pk:
+        return role
+
+    data = request.session.get(SESSION_KEY)
+    if data and data.get('user_id') == user.pk:
+        role = StaffRole.from_session(data)
+        if role.is_stale():
+            role = None
+        elif role.checked_at != data.get('checked_at'):
+            # Version confirmed just now; don't check again for a while
+            request.session[SESSION_KEY] = role.to_session()
+    else:
+        role = None
+
+    if role is None:
+        role = StaffRole.load(user)
+        request.session[SESSION_KEY] = role.to_session()
+
+    setattr(request, REQUEST_ATTR, role)
+    return role
+
+
+def designation_required(*designations, groups=(), allow_superuser=False,
+                         message=None, redirect_url='staff_dashboard'):
+    """
+    View decorator that only lets through staff whose designation is one of
+    `designations` (or who belong to one of `groups`). Other users get an
+    error message and are redirected to `redirect_url`.
+
+        @designation_required('MD', 'MG')
+        def my_view(request): ...
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            if not request.user.is_authenticated:
+                return redirect_to_login(request.get_full_path())
+
+            role = get_staff_role(request)
+            allowed = (
+                role.has_designation(*designations)
+                or role.in_group(*groups)
+                or (allow_superuser and role.is_superuser)
+            )
+            if not allowed:
+                messages.error(request, message or 'You do not have permission to access this page.')
+                return redirect(redirect_url)
+
+            return view_func(request, *args, **kwargs)
+        return _wrapped_view
+    return decorator
@@ -22,4 +22,42 @@ def social_account_added_handler(sender, request, sociallogin, **kwargs):
 def social_account_added_handler(sender, request, sociallogin, **kwargs):
     user = sociallogin.user
     if not hasattr(user, 'customer'):
-        Customer.objects.create(user=user)
\ No newline at end of file
+        Customer.objects.create(user=user)
+
+# --- Staff role cache invalidation (see users/roles.py) ---
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from .models import Staff
+from .roles import invalidate_staff_role
+
+@receiver(post_save, sender=Staff)
+@receiver(post_delete, sender=Staff)
+def staff_changed_handler(sender, instance, **kwargs):
+    invalidate_staff_role(instance.user_id)
+
+@receiver(post_save, sender=User)
+def user_changed_handler(sender, instance, update_fields=None, **kwargs):
+    # is_superuser / is_staff are part of the cached role; the last_login
+    # write on every login is not
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    invalidate_staff_role(instance.pk)
+
+@receiver(m2m_changed, sender=User.groups.through)
+def user_groups_changed_handler(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        # group.user_set.clear() passes no pk_set and the group is empty
+        # by post_clear, so note who is about to lose it
+        instance._role_cleared_user_ids = list(instance.user_set.values_list('pk', flat=True))
+        return
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        # instance is a Group; pk_set holds the affected users
+        if action == 'post_clear':
+            user_ids = getattr(instance, '_role_cleared_user_ids', ())
+        else:
+            user_ids = pk_set or ()
+        for user_id in user_ids:
+            invalidate_staff_role(user_id)
+    else:
+        invalidate_staff_role(instance.pk)
@@ -1,3 +1,94 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import Group, User
 from django.test import TestCase
 
-# Create your tests here.
+from orders.models import Order
+from users.loyalty import InsufficientPoints, REDEEM_DISCOUNT, adjust_points, redeem_points, settle_order
+from users.models import Customer, LoyaltyEntry, Staff
+from users.roles import ROLE_VERSION_CHECK_SECONDS, StaffRole, _current_version
+
+
+class StaffRoleTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('manager', password='pw', is_staff=True)
+        self.staff = Staff.objects.create(user=self.user, emp_id='E1', name='Manager', designation='MG')
+
+    def aged(self, role):
+        # Pretend the last version check was long enough ago to repeat it
+        role.checked_at -= ROLE_VERSION_CHECK_SECONDS
+        return role
+
+    def test_load_reads_designation(self):
+        role = StaffRole.load(self.user)
+        self.assertTrue(role)
+        self.assertTrue(role.has_designation('MG'))
+        self.assertFalse(role.is_stale())
+
+    def test_staff_change_makes_role_stale(self):
+        role = StaffRole.load(self.user)
+        self.staff.designation = 'CS'
+        self.staff.save()
+        # Not noticed until the next version check is due
+        self.assertFalse(role.is_stale())
+        self.assertTrue(self.aged(role).is_stale())
+        self.assertTrue(StaffRole.load(self.user).has_designation('CS'))
+
+    def test_last_login_save_keeps_role(self):
+        role = StaffRole.load(self.user)
+        self.user.save(update_fields=['last_login'])
+        self.assertFalse(self.aged(role).is_stale())
+        self.user.is_superuser = True
+        self.user.save()
+        self.assertTrue(self.aged(role).is_stale())
+
+    def test_clearing_a_group_makes_role_stale(self):
+        group = Group.objects.create(name='Kitchen')
+        self.user.groups.add(group)
+        role = StaffRole.load(self.user)
+        group.user_set.clear()
+        self.assertTrue(self.aged(role).is_stale())
+
+    def test_login_keeps_role(self):
+        version = _current_version(self.user.pk)
+        self.assertTrue(self.client.login(username='manager', password='pw'))
+        self.assertEqual(_current_version(self.user.pk), version)
+
+
+class LoyaltyLedgerTests(TestCase):
+
+    def setUp(self):
+        # bulk_create skips Customer.save(), which needs an image on disk
+        self.customer, = Customer.objects.bulk_create([Customer(user=User.objects.create_user('buyer'))])
+        self.order = Order.objects.create(customer=self.customer)
+
+    def balance(self):
+        self.customer.refresh_from_db()
+        return self.customer.loyalty_points
+
+    def test_settling_twice_earns_once(self):
+        discount, first = settle_order(self.order, Decimal('5500.00'))
+        _, second = settle_order(self.order, Decimal('5500.00'))
+        self.assertEqual(discount, Decimal('0.00'))
+        self.assertEqual(first, second)
+        self.assertEqual(first.points, 5)
+        self.assertEqual(self.balance(), 5)
+        self.assertEqual(self.customer.orders_count, 1)
+        self.assertEqual(LoyaltyEntry.objects.count(), 1)
+
+    def test_redeem_when_asked_and_covered(self):
+        adjust_points(self.customer.id, 60)
+        self.order.used_loyalty_points = True
+        discount, entry = settle_order(self.order, Decimal('5000.00'))
+        self.assertEqual(discount, REDEEM_DISCOUNT)
+        self.assertEqual(entry.kind, LoyaltyEntry.REDEEM)
+        self.assertEqual((self.balance(), entry.balance_after), (10, 10))
+
+    def test_redeem_falls_back_to_earning(self):
+        self.order.used_loyalty_points = True
+        discount, entry = settle_order(self.order, Decimal('3000.00'))
+        self.assertEqual((discount, entry.kind), (Decimal('0.00'), LoyaltyEntry.EARN))
+        with self.assertRaises(InsufficientPoints):
+            redeem_points(self.customer.id, 50)
+        self.assertEqual(self.balance(), 3)
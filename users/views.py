@@ -4,7 +4,8 @@ from allauth.socialaccount.models import SocialAccount
 from django.contrib.auth.decorators import login_required
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
-from orders.models import Order
+from orders.models import Order, ACTIVE_STATUSES
+from orders.dispatch import DISPATCH_DESIGNATIONS
 
 from users.models import Customer, Staff
 from users.forms import UserRegistrationForm, CustomerProfileForm, StaffProfileForm
@@ -141,17 +142,14 @@ def staff_dashboard(request):
 
     # The original logic (from the helper function):
     if staff.designation in ['CS', 'KS', 'DL', 'AD', 'MG', 'MD']:
-        pending_orders = Order.objects.filter(finalized=True, delivered=False)
-    elif staff.designation == 'KS':
-        pending_orders = Order.objects.filter(finalized=True, delivered=False) # Redundant
-    elif staff.designation == 'DL':
-        pending_orders = Order.objects.filter(finalized=True, delivered=False) # Redundant
+        pending_orders = Order.objects.filter(status__in=ACTIVE_STATUSES).order_by('placed_at')
     else:
         pending_orders = Order.objects.none()
 
     context = {
         'staff' : staff,
-        'pending_orders': pending_orders
+        'pending_orders': pending_orders,
+        'can_dispatch': staff.designation in DISPATCH_DESIGNATIONS,
     }
     
     return render(request, 'users/staff_dashboard.html', context)